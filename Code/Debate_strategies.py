@@ -4,6 +4,7 @@
     The debate process aims to iteratively refine and evaluate candidate solutions,
     based on cognitive (readability) and time complexity, until a consensus is reached.
 """
+import ast
 import json
 
 from tabulate import tabulate
@@ -13,9 +14,16 @@ from LLM_definition import (
     get_self_refinement_prompt, get_refined_agreement, get_refined_debate_prompt
 )
 
-from metrics import get_cognitive_complexity
+from metrics import get_module_cognitive_complexity_batch, get_module_cognitive_complexity_details
+from metric_cache import metric_cache
+from metric_store import metric_store
+from code_rules import check_code_rules, RULES_VERSION
+from timing_harness import time_candidates_parallel
+from complexity_estimation import find_function, generate_calls
 from utility_function import equals_cognitive_complexity, equals_time_complexity, \
-    get_random_element, get_k_responses, get_feedback_value, get_formatted_responses
+    get_fastest_element, get_declared_time_complexity, get_k_responses, get_feedback_value, \
+    get_formatted_responses, format_benchmark, get_formatted_code_solution, get_smoke_test_code, \
+    get_declared_test_inputs, evaluate_candidates_with_tests
 
 # Number of LLM agents participating in the debate
 AGENTS_NO = 2
@@ -23,8 +31,29 @@ AGENTS_NO = 2
 # Maximum number of allowed debate rounds before falling back to majority voting
 MAXROUNDS_NO = 4
 
+# Run the candidates against the available tests before each vote (execution-guided consensus).
+# Off by default: the tests are the BigCodeBench ones behind 'tests_success', so runs that enable it
+# are not comparable with the logged results
+EXECUTION_GUIDED_CONSENSUS = False
 
-def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chosen, max_rounds=MAXROUNDS_NO):
+# Measure runtime and peak memory of the candidates before each vote (shown to the voters, used for tie-breaking)
+BENCHMARK_CANDIDATES = False
+
+# Run the rule engine on the candidates before each vote (bugs, vulnerabilities and code smells shown to the voters).
+# Off by default: it changes the voting prompt of the logged runs
+STATIC_ANALYSIS_CANDIDATES = False
+
+# Input size generated from the function signature when the candidates declare no test inputs
+BENCHMARK_INPUT_SIZE = 1000
+
+# Repeated measurements per input and minimum duration (seconds) of each measurement
+BENCHMARK_REPEAT = 7
+BENCHMARK_MIN_TIME = 0.01
+
+
+def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chosen, max_rounds=MAXROUNDS_NO,
+                      test_code=None, execution_guided=EXECUTION_GUIDED_CONSENSUS,
+                      benchmark=BENCHMARK_CANDIDATES, static_analysis=STATIC_ANALYSIS_CANDIDATES):
     """
     Coordinates a structured debate among multiple AI agents (programmers) to collaboratively generate and refine
     source code in response to a user prompt.
@@ -38,6 +67,10 @@ def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chos
         programmer_prompt: Template for initial model prompt with placeholder for user input.
         strategy_chosen: Debate strategy ('0' for self-refinement, '1' for instant runoff voting).
         max_rounds: Maximum number of debate rounds allowed.
+        test_code: Optional unittest suite of the task (e.g. from BigCodeBench) used for execution-guided consensus.
+        execution_guided: Run the candidates against the available tests before each vote.
+        benchmark: Measure runtime and peak memory of the candidates before each vote.
+        static_analysis: Show the bugs, vulnerabilities and code smells of the candidates to the voters.
 
     Returns:
         The final code solution as a string, or "-1" if no valid solution was reached.
@@ -60,12 +93,11 @@ def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chos
     while current_round <= max_rounds:
         # === Measure readability (cognitive complexity) of each response ===
         readability_complexity = []  # Stores total cognitive complexity for each response
-        details_readability_complexity = []  # Stores node-level breakdown of complexity
+        details_readability_complexity = []  # Stores per-function breakdown of complexity
 
-        for i in range(AGENTS_NO):
-            response_json = json.loads(responses[i])  # Parse JSON response
-            total, details = get_cognitive_complexity(response_json["code"])
-            print(tabulate(details, headers=["Complexity", "Node"], tablefmt="fancy_grid"))
+        codes = [json.loads(responses[i])["code"] for i in range(AGENTS_NO)]  # Parse JSON responses
+        for total, details, table in get_candidates_cognitive_complexity(codes):
+            print(table)
             readability_complexity.append(total)
             details_readability_complexity.append(details)
 
@@ -80,10 +112,33 @@ def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chos
                 responses_allowed[i] = responses[i]
                 readability_complexity_allowed[i] = readability_complexity[i]
 
+        # ====== Execution-guided consensus ========
+
+        if execution_guided:
+            winner = execution_guided_consensus(responses_allowed, readability_complexity_allowed, test_code)
+            if winner is not None:
+                record_round(current_round, responses_allowed, readability_complexity_allowed)
+                print("Agreement through execution: only solution " + str(winner) + " passes all the tests")
+                print("\nFinal answer:")
+
+                solution = responses[winner]
+                print(solution)
+                return solution
+            counter = len(responses_allowed)
+
+        # ====== Runtime and memory benchmark ========
+
+        benchmarks = benchmark_candidates(responses_allowed) if benchmark else None
+
+        # ====== Static analysis (bugs, vulnerabilities, code smells) ========
+
+        code_issues = get_candidates_code_issues(responses_allowed) if static_analysis else None
+
         # ====== Construct debate prompt ========
 
-        formatted_responses = get_formatted_responses(responses_allowed, readability_complexity_allowed)
-        debate_prompt = get_refined_debate_prompt(counter, user_prompt, formatted_responses)
+        formatted_responses = get_formatted_responses(responses_allowed, readability_complexity_allowed, benchmarks,
+                                                      code_issues)
+        debate_prompt = get_refined_debate_prompt(counter, user_prompt, formatted_responses, static_analysis)
 
         print("DEBATE_PROMPT OBTAINED: " + debate_prompt)
 
@@ -96,6 +151,8 @@ def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chos
         print(f"\nRound {current_round} - Voting")
         for i in range(0, AGENTS_NO):
             print(f"Feedback model {i}: {debate_response[i]}\n")
+        record_round(current_round, responses_allowed, readability_complexity_allowed, benchmarks, code_issues,
+                     debate_response)
 
         # All agents have chosen the same solution
         possible_solutions = set(debate_response)  # Unique solutions selected by the agents
@@ -139,7 +196,7 @@ def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chos
                     print(f"Response self-refined developer {i}: {response}")
                     i += 1
             else:
-                response = do_instant_runoff_voting(debate_response, responses_allowed)
+                response = do_instant_runoff_voting(debate_response, responses_allowed, benchmarks)
                 print(f"Response instant_runoff_voting : {response}")
                 return response
 
@@ -150,7 +207,10 @@ def developers_debate(programmers, user_prompt, programmer_prompt, strategy_chos
     return responses[int(vote_index)]
 
 
-def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt, max_rounds=MAXROUNDS_NO):
+def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt, max_rounds=MAXROUNDS_NO,
+                                     test_code=None, execution_guided=EXECUTION_GUIDED_CONSENSUS,
+                                     benchmark=BENCHMARK_CANDIDATES,
+                                     static_analysis=STATIC_ANALYSIS_CANDIDATES):
     """
     Executes a multi-agent debate process with a mixed strategy that dynamically switches
     between self-refinement and instant runoff voting based on agreement and complexity metrics.
@@ -163,6 +223,10 @@ def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt
         user_prompt: The user-defined coding prompt.
         programmer_prompt: Prompt template used to initialize agents.
         max_rounds: Max number of debate iterations allowed.
+        test_code: Optional unittest suite of the task (e.g. from BigCodeBench) used for execution-guided consensus.
+        execution_guided: Run the candidates against the available tests before each vote.
+        benchmark: Measure runtime and peak memory of the candidates before each vote.
+        static_analysis: Show the bugs, vulnerabilities and code smells of the candidates to the voters.
 
     Returns:
         The final agreed-upon or selected code solution.
@@ -186,12 +250,11 @@ def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt
     while current_round <= max_rounds:
         # === Measure readability (cognitive complexity) of each response ===
         readability_complexity = []  # Stores total cognitive complexity for each response
-        details_readability_complexity = []  # Stores node-level breakdown of complexity
+        details_readability_complexity = []  # Stores per-function breakdown of complexity
 
-        for i in range(AGENTS_NO):
-            response_json = json.loads(responses[i])  # Parse JSON response
-            total, details = get_cognitive_complexity(response_json["code"])
-            print(tabulate(details, headers=["Complexity", "Node"], tablefmt="fancy_grid"))
+        codes = [json.loads(responses[i])["code"] for i in range(AGENTS_NO)]  # Parse JSON responses
+        for total, details, table in get_candidates_cognitive_complexity(codes):
+            print(table)
             readability_complexity.append(total)
             details_readability_complexity.append(details)
 
@@ -206,10 +269,33 @@ def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt
                 responses_allowed[i] = responses[i]
                 readability_complexity_allowed[i] = readability_complexity[i]
 
+        # ====== Execution-guided consensus ========
+
+        if execution_guided:
+            winner = execution_guided_consensus(responses_allowed, readability_complexity_allowed, test_code)
+            if winner is not None:
+                record_round(current_round, responses_allowed, readability_complexity_allowed)
+                print("Agreement through execution: only solution " + str(winner) + " passes all the tests")
+                print("\nFinal answer:")
+
+                solution = responses[winner]
+                print(solution)
+                return solution
+            counter = len(responses_allowed)
+
+        # ====== Runtime and memory benchmark ========
+
+        benchmarks = benchmark_candidates(responses_allowed) if benchmark else None
+
+        # ====== Static analysis (bugs, vulnerabilities, code smells) ========
+
+        code_issues = get_candidates_code_issues(responses_allowed) if static_analysis else None
+
         # ====== Construct debate prompt ========
 
-        formatted_responses = get_formatted_responses(responses_allowed, readability_complexity_allowed)
-        debate_prompt = get_refined_debate_prompt(counter, user_prompt, formatted_responses)
+        formatted_responses = get_formatted_responses(responses_allowed, readability_complexity_allowed, benchmarks,
+                                                      code_issues)
+        debate_prompt = get_refined_debate_prompt(counter, user_prompt, formatted_responses, static_analysis)
 
         print("# ============= DEBATE_PROMPT OBTAINED =================\n" + debate_prompt)
 
@@ -222,6 +308,8 @@ def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt
         print(f"\nRound {current_round} - Voting")
         for i in range(0, AGENTS_NO):
             print(f"Feedback model {i}: {debate_response[i]}\n")
+        record_round(current_round, responses_allowed, readability_complexity_allowed, benchmarks, code_issues,
+                     debate_response)
 
         # All agents have chosen the same solution
         possible_solutions = set(debate_response)  # Unique solutions selected by the agents
@@ -262,7 +350,8 @@ def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt
                 k_readability_complexity[i] = readability_complexity[int(i)]
 
             if equals_time_complexity(k_responses) and equals_cognitive_complexity(k_readability_complexity):
-                solution = str(get_random_element(k_responses))
+                # Tie-break on the measured performance instead of a random pick
+                solution = str(responses[get_fastest_element(sorted(set(debate_response)), benchmarks)])
                 print("Agreement between equivalent solution")
                 print("\nFinal answer:")
 
@@ -270,7 +359,7 @@ def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt
                 return solution  # Return the agreed-upon solution
             else:
                 # INSTANT RUNOFF VOTING
-                response = do_instant_runoff_voting(debate_response, responses_allowed)
+                response = do_instant_runoff_voting(debate_response, responses_allowed, benchmarks)
                 return response
 
         else:
@@ -292,6 +381,209 @@ def developers_debate_mixed_strategy(programmers, user_prompt, programmer_prompt
     return responses[int(vote_index)]
 
 
+# === Round log ===
+
+# Rounds of the debates since the last clear (read by the main scripts to log them with the task results)
+debate_rounds = []
+
+
+def record_round(round_no, responses_allowed, readability_complexity_allowed, benchmarks=None, code_issues=None,
+                 votes=None):
+    """
+    Appends a round to debate_rounds: the votes of the agents and the metrics of every allowed candidate.
+
+    Args:
+        round_no: Number of the round in its debate.
+        responses_allowed: Dictionary of syntactically valid responses (agent index -> JSON response).
+        readability_complexity_allowed: Cognitive complexity of the allowed responses.
+        benchmarks: Optional measured runtime and peak memory of each solution.
+        code_issues: Optional bugs, vulnerabilities and code smells of each solution.
+        votes: Solution chosen by each agent (None if the round ended without a vote).
+    """
+    candidates = []
+    for i, response in responses_allowed.items():
+        benchmark = (benchmarks or {}).get(i) or {}
+        issues = (code_issues or {}).get(i) or {}
+        candidates.append({
+            "agent": i,
+            "code": get_formatted_code_solution(response),
+            "cognitive_complexity": readability_complexity_allowed.get(i),
+            "time_complexity": get_declared_time_complexity(response),
+            "median_runtime": benchmark.get("median"),
+            "peak_memory": benchmark.get("peak_memory"),
+            "bugs": issues.get("bugs"),
+            "vulnerabilities": issues.get("vulnerabilities"),
+            "code_smells": issues.get("code_smells")
+        })
+    debate_rounds.append({"round": round_no, "votes": list(votes) if votes is not None else None,
+                          "candidates": candidates})
+
+
+# === Candidate metrics ===
+
+def get_candidates_cognitive_complexity(codes):
+    """
+    Computes the module-wide cognitive complexity of the candidates (helpers, methods and
+    module-level code included) and renders their breakdown. Candidates whose code did not
+    change since a previous round are not analyzed again; the others are analyzed as one batch.
+
+    Args:
+        codes: Source code of each candidate.
+
+    Returns:
+        List of (total cognitive complexity, per-function details, rendered details table), one per candidate.
+    """
+    keys = [metric_cache.make_key("cognitive_complexity", code) for code in codes]
+    pending = {key: code for key, code in zip(keys, codes) if key not in metric_cache}
+
+    for key, result in zip(pending, get_module_cognitive_complexity_batch(list(pending.values()))):
+        details = get_module_cognitive_complexity_details(result)
+        metric_cache.put(key, (result["total"], details,
+                               tabulate(details, headers=["Complexity", "Function"], tablefmt="fancy_grid")))
+
+    return [metric_cache.get(key) for key in keys]
+
+
+def get_candidates_code_issues(responses_allowed):
+    """
+    Finds the bugs, vulnerabilities and code smells of each allowed candidate with the embedded
+    rule engine. Code analyzed in a previous round or run is not analyzed again (see metric_store).
+
+    Args:
+        responses_allowed: Dictionary of syntactically valid responses (agent index -> JSON response).
+
+    Returns:
+        Dictionary mapping each solution index to its issues (see code_rules.check_code_rules).
+    """
+    code_issues = {}
+    for i, response in responses_allowed.items():
+        code = get_formatted_code_solution(response) or ""
+        code_issues[i] = metric_cache.get_or_compute(
+            metric_cache.make_key("code_issues", code),
+            lambda: metric_store.get_or_compute("code_rules", RULES_VERSION, code, check_code_rules, normalize=False))
+        print(f"Static analysis solution {i}: {code_issues[i]['bugs']} bug(s), "
+              f"{code_issues[i]['vulnerabilities']} vulnerability(ies), {code_issues[i]['code_smells']} code smell(s)")
+    return code_issues
+
+
+# === Execution-guided consensus ===
+
+def execution_guided_consensus(responses_allowed, readability_complexity_allowed, test_code=None):
+    """
+    Runs the allowed candidates against the available tests, in parallel sandboxes.
+
+    The tests are the task's unittest suite when given, otherwise a smoke test built from
+    the 'test_inputs' declared by the candidates. A candidate that passes every test while
+    all the others fail wins immediately. If several candidates pass, the failing ones are
+    removed (in place) from the allowed responses, so that agents only vote among passing solutions.
+
+    Args:
+        responses_allowed: Dictionary of syntactically valid responses (agent index -> JSON response).
+        readability_complexity_allowed: Cognitive complexity of the allowed responses (filtered in place too).
+        test_code: Optional unittest suite of the task.
+
+    Returns:
+        The index of the winning response, or None if the tests do not single out a solution.
+    """
+    if test_code is None:
+        test_code = get_smoke_test_code(list(responses_allowed.values()))
+    if test_code is None or len(responses_allowed) < 2:
+        return None
+
+    candidates = list(responses_allowed.keys())
+    codes = {i: get_formatted_code_solution(responses_allowed[i]) or "" for i in candidates}
+
+    # Only candidates that changed since the previous rounds are run again
+    keys = {i: metric_cache.make_key("tests", codes[i], test_code) for i in candidates}
+    pending = [i for i in candidates if keys[i] not in metric_cache]
+    if pending:
+        results = evaluate_candidates_with_tests([(codes[i], test_code) for i in pending], failfast=True)
+        for i, result in zip(pending, results):
+            metric_cache.put(keys[i], result)
+
+    passing = [i for i in candidates if metric_cache.get(keys[i])["passed"]]
+    print(f"Solutions passing all the tests: {passing}")
+
+    if len(passing) == 1:
+        return passing[0]
+
+    if passing:
+        for i in candidates:
+            if i not in passing:
+                del responses_allowed[i]
+                del readability_complexity_allowed[i]
+
+    return None
+
+
+# === Runtime and memory benchmark ===
+
+def benchmark_candidates(responses_allowed):
+    """
+    Measures the median runtime and the peak memory of each allowed candidate, in parallel sandboxes.
+
+    The inputs are the 'test_inputs' declared by the candidates when available, otherwise
+    an input of size BENCHMARK_INPUT_SIZE generated from the function signature.
+
+    Args:
+        responses_allowed: Dictionary of syntactically valid responses (agent index -> JSON response).
+
+    Returns:
+        Dictionary mapping each measured solution index to its total median runtime over the inputs
+        (seconds, with confidence interval), peak memory (bytes) and number of inputs.
+        Candidates that cannot be measured (e.g. they raise on the inputs) are left out.
+    """
+    candidates = list(responses_allowed.keys())
+    codes = [get_formatted_code_solution(responses_allowed[i]) or "" for i in candidates]
+
+    func_names = []
+    for code in codes:
+        try:
+            funcdef = find_function(ast.parse(code))
+        except SyntaxError:
+            funcdef = None
+        func_names.append(funcdef.name if funcdef else "task_func")
+
+    calls = get_declared_test_inputs(list(responses_allowed.values()))
+    if not calls:
+        for code in codes:
+            _, calls = generate_calls(code, BENCHMARK_INPUT_SIZE)
+            if calls:
+                break
+    if not calls:
+        print("[!] Benchmark not available: no test inputs")
+        return {}
+
+    # Only candidates that changed since the previous rounds are measured again
+    keys = [metric_cache.make_key("benchmark", code, name, calls) for code, name in zip(codes, func_names)]
+    pending = [j for j, key in enumerate(keys) if key not in metric_cache]
+    reports = time_candidates_parallel([codes[j] for j in pending], calls, [func_names[j] for j in pending],
+                                       repeat=BENCHMARK_REPEAT, min_time=BENCHMARK_MIN_TIME)
+
+    for j, report in zip(pending, reports):
+        results = report["results"]
+        if report["error"] or not results or any(result["error"] for result in results):
+            metric_cache.put(keys[j], None)
+            continue
+        metric_cache.put(keys[j], {
+            "median": sum(result["median"] for result in results),
+            "ci_low": sum(result["ci_low"] for result in results),
+            "ci_high": sum(result["ci_high"] for result in results),
+            "peak_memory": max(result["peak_memory"] for result in results),
+            "inputs": len(results)
+        })
+
+    benchmarks = {}
+    for i, key in zip(candidates, keys):
+        benchmark = metric_cache.get(key)
+        if benchmark is not None:
+            benchmarks[i] = benchmark
+
+    for i in candidates:
+        print(f"Benchmark solution {i}:{format_benchmark(benchmarks.get(i))}")
+    return benchmarks
+
+
 # === Self-refinement ===
 
 def do_self_refinement(agents, responses, readability_complexity, user_prompt):
@@ -401,7 +693,8 @@ def majority_voting(feedback):
 '''
 
 
-def after_evaluation_debate(user_prompt, feedback_evaluator, previous_code, programmers, strategy_debate):
+def after_evaluation_debate(user_prompt, feedback_evaluator, previous_code, programmers, strategy_debate,
+                            test_code=None):
     """
         Starts a post-evaluation debate process among agents to improve a previously generated solution.
 
@@ -414,6 +707,7 @@ def after_evaluation_debate(user_prompt, feedback_evaluator, previous_code, prog
             previous_code: The code previously generated that needs refinement.
             programmers: List of LLM agents for refinement debate.
             strategy_debate: Strategy to apply (standard, mixed, or specific voting mechanism).
+            test_code: Optional unittest suite of the task, used for execution-guided consensus.
 
         Returns:
             The final refined solution after the debate process.
@@ -495,17 +789,17 @@ def after_evaluation_debate(user_prompt, feedback_evaluator, previous_code, prog
 
     debate_response = ""
     if strategy_debate == "0":
-        debate_response += str(developers_debate(programmers, user_prompt, refinement_prompt, strategy_debate, max_rounds=MAXROUNDS_NO))
+        debate_response += str(developers_debate(programmers, user_prompt, refinement_prompt, strategy_debate, max_rounds=MAXROUNDS_NO, test_code=test_code))
     elif strategy_debate == '1':
-        debate_response += str(developers_debate(programmers, user_prompt, refinement_prompt, strategy_debate, max_rounds=MAXROUNDS_NO))
+        debate_response += str(developers_debate(programmers, user_prompt, refinement_prompt, strategy_debate, max_rounds=MAXROUNDS_NO, test_code=test_code))
     else:
-        debate_response += str(developers_debate_mixed_strategy(programmers, user_prompt, refinement_prompt, max_rounds=MAXROUNDS_NO))
+        debate_response += str(developers_debate_mixed_strategy(programmers, user_prompt, refinement_prompt, max_rounds=MAXROUNDS_NO, test_code=test_code))
 
     return debate_response
 
 
 # === INSTANT RUNOFF VOTING ===
-def do_instant_runoff_voting(debate_response, responses_allowed):
+def do_instant_runoff_voting(debate_response, responses_allowed, benchmarks=None):
     """
         Resolves disagreement among agents using instant runoff voting (IRV).
 
@@ -515,11 +809,12 @@ def do_instant_runoff_voting(debate_response, responses_allowed):
         Args:
             debate_response: List of votes from agents for preferred solutions.
             responses_allowed: Dictionary of syntactically valid solutions.
+            benchmarks: Optional measured runtime and peak memory of the solutions, used to break ties.
 
         Returns:
-            The winning solution string, or one randomly selected in case of a tie.
+            The winning solution string, or in case of a tie the one with the best declared time
+            complexity (then lowest measured runtime, peak memory and index).
         """
-    import random
     winner = instant_runoff_voting(debate_response, responses_allowed.keys())
 
     if isinstance(winner, int):
@@ -534,9 +829,10 @@ def do_instant_runoff_voting(debate_response, responses_allowed):
         for w in winner:
             print(f"Candidate {w}: {responses_allowed[w]}")
 
-        # Choose randomly a candidate
-        chosen = random.choice(winner)
-        print(f"Randomly selected winner: Candidate {chosen}")
+        # Choose the candidate with the best declared time complexity, then the fastest one (deterministic)
+        time_complexities = {w: get_declared_time_complexity(responses_allowed[w]) for w in winner}
+        chosen = get_fastest_element(sorted(winner), benchmarks, time_complexities)
+        print(f"Selected winner by time complexity, measured runtime and memory: Candidate {chosen}")
         return responses_allowed[chosen]
 
     return None
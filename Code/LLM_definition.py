@@ -246,17 +246,27 @@ def get_self_refinement_prompt(pers_response, user_prompt, other_answers):
     return deb_prompt
 
 
-def get_refined_debate_prompt(AGENTS_NO, user_prompt, formatted_responses):
+# Lines of the voting prompt describing the static analysis issues, when they are shown (see get_refined_debate_prompt)
+STATIC_ANALYSIS_ATTRIBUTE = """
+        - the bugs, vulnerabilities and code smells found by static analysis, with their line: 
+            fewer and less severe they are, better the code solution is."""
+STATIC_ANALYSIS_STEP = """
+            - discard, when possible, solutions with bugs or vulnerabilities found by static analysis."""
+
+
+def get_refined_debate_prompt(AGENTS_NO, user_prompt, formatted_responses, static_analysis=False):
     """
         Builds a comprehensive debate prompt tailored for a source code evaluator agent.
 
         It combines the user task with all AI-generated responses and their metrics
-        (cognitive and time complexity) to enable comparative evaluation.
+        (cognitive and time complexity, measured runtime and memory and, if enabled,
+        static analysis issues) to enable comparative evaluation.
 
         Args:
             AGENTS_NO: Number of participating agents.
             user_prompt: Original code generation prompt.
             formatted_responses: Formatted string versions of each response.
+            static_analysis: Whether the responses include their static analysis issues.
 
         Returns:
             A fully constructed debate prompt string for evaluation.
@@ -273,6 +283,8 @@ def get_refined_debate_prompt(AGENTS_NO, user_prompt, formatted_responses):
             as the input size increases. More lower it is (e.g., O(N) is better than O(N^2)), better the code solution is.
         - a cognitive complexity: it quantifies the difficulty for a human to understand a piece of code or a function.
             More lower it is (e.g., a flat structure is better than deeply nested loops), better the code solution is. 
+        - a median runtime and a peak memory, when available: they are measured by running the code solution 
+            on the test inputs of the task. More lower they are, better the code solution is.{static_analysis_attribute}
 
     Your task is to analyze the list of the code solutions and select the best one following these steps:
 
@@ -281,6 +293,7 @@ def get_refined_debate_prompt(AGENTS_NO, user_prompt, formatted_responses):
     STEP 3: Select the best code solution in this way: 
             - prioritize solutions with lower time complexity first. 
             - if time complexities are equal, then prioritize lower cognitive complexity.
+            - if both are equal, then prioritize lower measured median runtime and peak memory.{static_analysis_step}
     STEP 4: Answer with only a single integer which corresponds to the unique number of the best code solution choosen.
             Your response must be a single integer with **no explanation**, **no text**, and **no punctuation**.
             Responding with anything other than a number will be considered an error.
@@ -299,6 +312,8 @@ def get_refined_debate_prompt(AGENTS_NO, user_prompt, formatted_responses):
     prompt = refine_debate
     prompt = prompt.replace("{AGENTS_NO}", str(AGENTS_NO))
     prompt = prompt.replace("{_AGENTS_NO-1}", str(AGENTS_NO-1))
+    prompt = prompt.replace("{static_analysis_attribute}", STATIC_ANALYSIS_ATTRIBUTE if static_analysis else "")
+    prompt = prompt.replace("{static_analysis_step}", STATIC_ANALYSIS_STEP if static_analysis else "")
     prompt = prompt.replace("{user_prompt}", user_prompt)
     ai_responses = ""
 
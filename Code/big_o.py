@@ -0,0 +1,554 @@
+'''
+This file contains a parser and comparator for asymptotic time complexities written in Big-O notation:
+    - Parses the 'time_complexity' field of a response: O(n log n), o(nlogn), O(N*log(N)), O(V + E), O(2^n), O(n!), ...
+    - Handles several variables, logarithms (nested too), powers (symbolic exponents too), roots,
+      exponentials (2^n, e^n, exp(n)) and factorials
+    - Normalizes a complexity to a canonical form, so equivalent spellings compare equal
+    - Orders complexities by growth (a partial order: O(n) and O(m) are not comparable)
+
+Constant factors, log bases and dominated terms are dropped: O(3n^2 + n log n) is O(n^2).
+Subtraction is read as addition (an upper bound) and max(a, b) as a + b.
+'''
+
+import re
+import math
+from functools import lru_cache
+
+# Keywords of the notation (everything else made of letters is a variable)
+LOG_KEYWORDS = ("log", "lg", "ln")
+FUNCTION_KEYWORDS = ("sqrt", "max", "len", "exp")
+
+# Complexities written in words
+COMPLEXITY_WORDS = {
+    "constant": "1",
+    "logarithmic": "log n",
+    "linear": "n",
+    "linearithmic": "n log n",
+    "loglinear": "n log n",
+    "quadratic": "n^2",
+    "cubic": "n^3",
+    "exponential": "2^n",
+    "factorial": "n!"
+}
+
+# Characters replaced before tokenization
+REPLACEMENTS = {"²": "^2", "³": "^3", "·": "*", "×": "*", "⋅": "*", "−": "-", "**": "^", "√": "sqrt"}
+
+# Start of the Big-O expression inside a longer text, e.g. "O(n) where n is the length of the list"
+BIG_O_PATTERN = re.compile(r"(?<![a-z0-9_])(?:big[- ]?)?[oθωΘΩ]\s*\(")
+
+# Growth of a term in one variable: (factorial power, exponential base, polynomial power, log power, log log power).
+# Tuples compare lexicographically, which matches their asymptotic order.
+NO_GROWTH = (0, 1, 0, 0, 0)
+LINEAR = (0, 1, 1, 0, 0)
+
+# Variable read as Euler's number when raised to a non-constant power (e^n); otherwise it is a variable (O(V + E))
+EULER_VARIABLE = "e"
+
+TOKEN_PATTERN = re.compile(r"\s*(?:(\d+(?:\.\d+)?)|([a-z_][a-z0-9_]*)|(\S))")
+
+
+# ----------------------------- Terms -----------------------------
+
+
+def make_term(coefficient, growths):
+    """
+    Builds a term: a constant coefficient times a product of growths, one per variable.
+    Terms are tuples (coefficient, ((variable, growth), ...)) with variables sorted and
+    neutral growths removed, so that equal terms are equal tuples.
+    """
+    growths = tuple(sorted((var, tuple(round_growth(value) for value in growth))
+                           for var, growth in growths.items() if growth != NO_GROWTH))
+    return coefficient, growths
+
+
+def round_growth(value):
+    """
+    Rounds away floating-point noise (2^0.5^2 is 2.0000000000000004) to 12 significant digits,
+    so that a base close to 1 (1.0000001^n) stays an exponential.
+    """
+    return float(f"{value:.12g}")
+
+
+def multiply_terms(a, b):
+    growths = dict(a[1])
+    for var, (fact, base, poly, log, loglog) in b[1]:
+        f, e, p, l, ll = growths.get(var, NO_GROWTH)
+        growths[var] = (f + fact, e * base, p + poly, l + log, ll + loglog)
+    return make_term(a[0] * b[0], growths)
+
+
+def power_term(term, exponent):
+    growths = {var: (fact * exponent, base ** exponent, poly * exponent, log * exponent, loglog * exponent)
+               for var, (fact, base, poly, log, loglog) in term[1]}
+    return make_term(abs(term[0]) ** exponent if term[0] else 0, growths)
+
+
+def term_leq(a, b):
+    """
+    True if term a grows at most as fast as term b in every variable.
+    """
+    variables = {var for var, _ in a[1]} | {var for var, _ in b[1]}
+    growths_a, growths_b = dict(a[1]), dict(b[1])
+    return all(growths_a.get(var, NO_GROWTH) <= growths_b.get(var, NO_GROWTH) for var in variables)
+
+
+def simplify(terms):
+    """
+    Drops constant factors and dominated terms (and duplicates).
+    """
+    terms = list(dict.fromkeys(make_term(1, dict(growths)) for _, growths in terms))
+    kept = [t for t in terms if not any(u != t and term_leq(t, u) for u in terms)]
+    return tuple(sorted(kept, key=format_term))
+
+
+# ----------------------------- Formatting -----------------------------
+
+
+def format_number(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:.12g}"
+
+
+def format_term(term):
+    """
+    Formats a term: the factors of each variable, variables separated by '*' (e.g. "n log n * m").
+    """
+    parts = []
+    for var, (fact, base, poly, log, loglog) in term[1]:
+        factors = []
+        if fact:
+            factors.append(f"{var}!" if fact == 1 else f"({var}!)^{format_number(fact)}")
+        if base != 1:
+            name = "e" if math.isclose(base, math.e, rel_tol=1e-6) else format_number(base)
+            factors.append(f"{name}^{var}")
+        if poly == 0.5:
+            factors.append(f"sqrt({var})")
+        elif poly:
+            factors.append(var if poly == 1 else f"{var}^{format_number(poly)}")
+        if log:
+            factors.append(f"log {var}" if log == 1 else f"log^{format_number(log)} {var}")
+        if loglog:
+            factors.append(f"log log {var}" if loglog == 1 else f"(log log {var})^{format_number(loglog)}")
+        parts.append(" ".join(factors))
+    return " * ".join(parts) or "1"
+
+
+# ----------------------------- Complexity -----------------------------
+
+
+class Complexity:
+    """
+    A time complexity in canonical form: a sum of non-dominated terms.
+
+    Complexities are partially ordered by growth: `a <= b` means a is O(b).
+    Two complexities can be incomparable (e.g. O(n) and O(m)).
+    """
+
+    def __init__(self, terms):
+        self.terms = simplify(terms)
+
+    def __str__(self):
+        if not self.terms or self.terms == ((1, ()),):
+            return "O(1)"
+        ordered = sorted(self.terms, key=lambda term: sorted((g for _, g in term[1]), reverse=True), reverse=True)
+        return "O(" + " + ".join(format_term(term) for term in ordered) + ")"
+
+    def __repr__(self):
+        return f"Complexity({str(self)!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, Complexity) and self.terms == other.terms
+
+    def __hash__(self):
+        return hash(self.terms)
+
+    def __le__(self, other):
+        return all(any(term_leq(t, u) for u in other.terms) for t in self.terms)
+
+    def __lt__(self, other):
+        return self <= other and self != other
+
+    def __ge__(self, other):
+        return other <= self
+
+    def __gt__(self, other):
+        return other < self
+
+    def compare(self, other):
+        """
+        Returns -1 if self grows slower than other, 0 if they are equivalent,
+        1 if it grows faster, None if they are not comparable.
+        """
+        if self == other:
+            return 0
+        if self <= other:
+            return -1
+        if other <= self:
+            return 1
+        return None
+
+
+# ----------------------------- Parser -----------------------------
+
+
+class ComplexityParser:
+    """
+    Recursive-descent parser of Big-O expressions.
+
+    Grammar (implicit multiplication between adjacent factors):
+        expression := product (("+" | "-" | ",") product)*
+        product    := factor (("*" | "/")? factor)*
+        factor     := unary ("^" exponent | "!")*
+        exponent   := "-" exponent | unary ["^" exponent]          (right-associative: 2^n^2 is 2^(n^2))
+        unary      := LOG ["^" exponent] ("(" expression ")" | factor) | "sqrt" primary | primary
+        primary    := NUMBER | VARIABLE | "(" expression ")" | "|" expression "|" | FUNCTION "(" expression ")"
+
+    A non-constant exponent makes an exponential when the base is a constant (2^n, e^n, exp(n)),
+    and a symbolic power otherwise (n^k, b^d), kept as a variable of its own.
+    """
+
+    def __init__(self, text):
+        self.tokens = self.tokenize(text)
+        self.position = 0
+        self.inside_bars = False  # inside |...|, a '|' closes the size instead of opening a factor
+
+    @staticmethod
+    def tokenize(text):
+        tokens = []
+        for number, word, symbol in TOKEN_PATTERN.findall(text):
+            if number:
+                tokens.append(("number", float(number)))
+            elif word:
+                tokens.extend(ComplexityParser.split_word(word))
+            elif symbol:
+                tokens.append(("symbol", symbol))
+        return tokens
+
+    @staticmethod
+    def split_word(word):
+        """
+        Splits a run of letters into keywords and variables: "nlogn" -> n, log, n; "nm" -> n, m.
+        """
+        tokens = []
+        keywords = LOG_KEYWORDS + FUNCTION_KEYWORDS
+        pattern = "|".join(sorted(keywords, key=len, reverse=True))
+        parts = [part for part in re.split(f"({pattern})", word) if part]
+
+        # A longer name that only contains a keyword (e.g. "length") is a variable
+        if len(parts) > 1 and any(part not in keywords and len(re.sub(r"[^a-z]", "", part)) > 2 for part in parts):
+            return [("variable", word)]
+
+        for part in parts:
+            if part in LOG_KEYWORDS:
+                tokens.append(("log", part))
+            elif part in FUNCTION_KEYWORDS:
+                tokens.append(("function", part))
+            elif tokens and tokens[-1][0] == "log" and re.fullmatch(r"_?\d+|_[a-z]", part):
+                continue  # log base (log2, log_2, log_b): irrelevant asymptotically
+            elif tokens and tokens[-1][0] == "log" and re.fullmatch(r"_?\d+[a-z_][a-z0-9_]*", part):
+                tokens.extend(ComplexityParser.split_word(re.sub(r"^_?\d+", "", part)))  # "log2n": base 2, then n
+            elif re.fullmatch(r"[a-z]{2}", part):
+                tokens.extend(("variable", letter) for letter in part)  # "nm": product of two variables
+            else:
+                match = re.fullmatch(r"_?(\d+)([a-z_][a-z0-9_]*)", part)
+                if match:  # "2n" after a keyword (e.g. "sqrt2n"): coefficient then variable
+                    tokens.extend([("number", float(match.group(1))), ("variable", match.group(2))])
+                else:
+                    tokens.append(("variable", part.strip("_") or part))
+        return tokens
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def next(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expect(self, symbol):
+        if self.next() != ("symbol", symbol):
+            raise ValueError(f"Expected '{symbol}'")
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty complexity")
+        terms = self.expression()
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected token {self.peek()[1]!r}")
+        return terms
+
+    def expression(self):
+        terms = list(self.product())
+        while self.peek() in (("symbol", "+"), ("symbol", "-"), ("symbol", ",")):
+            self.next()
+            terms.extend(self.product())
+        return terms
+
+    def starts_factor(self):
+        kind, value = self.peek()
+        if (kind, value) == ("symbol", "|"):
+            return not self.inside_bars
+        return kind in ("number", "variable", "log", "function") or (kind, value) == ("symbol", "(")
+
+    def product(self):
+        terms = self.factor()
+        while True:
+            if self.peek() == ("symbol", "*"):
+                self.next()
+                terms = [multiply_terms(a, b) for a in terms for b in self.factor()]
+            elif self.peek() == ("symbol", "/"):
+                self.next()
+                divisor = self.factor()
+                if len(divisor) != 1:
+                    raise ValueError("Division by a sum")
+                inverse = power_term(divisor[0], -1)
+                terms = [multiply_terms(a, inverse) for a in terms]
+            elif self.starts_factor():
+                terms = [multiply_terms(a, b) for a in terms for b in self.factor()]
+            else:
+                return terms
+
+    def factor(self):
+        terms = self.unary()
+        while True:
+            if self.peek() == ("symbol", "^"):
+                self.next()
+                terms = self.raise_to(terms, self.exponent())
+            elif self.peek() == ("symbol", "!"):
+                self.next()
+                terms = [self.factorial(terms)]
+            else:
+                return terms
+
+    def exponent(self):
+        if self.peek() == ("symbol", "-"):
+            self.next()
+            return self.negate(self.exponent())
+        terms = self.unary()
+        if self.peek() == ("symbol", "^"):
+            self.next()
+            terms = self.raise_to(terms, self.exponent())
+        return terms
+
+    @staticmethod
+    def negate(terms):
+        return [(-coefficient, growths) for coefficient, growths in terms]
+
+    def unary(self):
+        kind, value = self.peek()
+        if kind == "log":
+            self.next()
+            power = None
+            if self.peek() == ("symbol", "^"):  # log^2 n
+                self.next()
+                power = self.constant(self.exponent())
+            # log(n)^2 is (log n)^2, while log n^2 and log 2^n take the whole factor as argument
+            argument = self.primary() if self.peek() == ("symbol", "(") else self.factor()
+            terms = self.logarithm(argument)
+            return [power_term(term, power) for term in terms] if power is not None else terms
+        if (kind, value) == ("function", "sqrt"):
+            self.next()
+            return self.raise_to(self.primary(), [make_term(0.5, {})])
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.next()
+        if kind == "number":
+            return [make_term(value, {})]
+        if kind == "variable":
+            return [make_term(1, {value: LINEAR})]
+        if kind == "function":
+            self.expect("(")
+            if value == "len":  # len(items): the size of items is a variable
+                name = self.next()
+                self.expect(")")
+                return [make_term(1, {str(name[1]): LINEAR})]
+            terms = self.expression()  # max(a, b) = Θ(a + b)
+            self.expect(")")
+            return self.raise_to([make_term(math.e, {})], terms) if value == "exp" else terms
+        if (kind, value) == ("symbol", "("):
+            terms = self.expression()
+            self.expect(")")
+            return terms
+        if (kind, value) == ("symbol", "|"):  # |V|: size of V
+            self.inside_bars = True
+            terms = self.expression()
+            self.expect("|")
+            self.inside_bars = False
+            return terms
+        raise ValueError(f"Unexpected token {value!r}")
+
+    @staticmethod
+    def constant(terms):
+        if len(terms) != 1 or terms[0][1]:
+            raise ValueError("Expected a constant exponent")
+        return terms[0][0]
+
+    def raise_to(self, base, exponent):
+        if len(exponent) == 1 and not exponent[0][1]:
+            power = exponent[0][0]
+            if power <= 0 and len(base) > 1:
+                raise ValueError("Non-positive power of a sum")
+            # (a + b)^p = Θ(a^p + b^p) for p > 0
+            return [power_term(term, power) for term in base]
+        if self.is_variable(base, EULER_VARIABLE):
+            base = [make_term(math.e, {})]
+        if len(base) != 1 or base[0][1]:
+            return [self.symbolic_power(base, exponent)]
+        # Exponential: the base is a constant, the exponent linear in its variables
+        base_value = self.constant(base)
+        if base_value <= 0:
+            raise ValueError("Invalid exponential base")
+        result = make_term(1, {})
+        for coefficient, growths in exponent:
+            if not growths:
+                continue
+            if len(growths) != 1 or growths[0][1] != LINEAR:
+                raise ValueError("Unsupported exponent")
+            var = growths[0][0]
+            result = multiply_terms(result, make_term(1, {var: (0, base_value ** coefficient, 0, 0, 0)}))
+        return [result]
+
+    @staticmethod
+    def is_variable(terms, name=None):
+        """True if the terms are a single variable (the given one, if any)."""
+        return (len(terms) == 1 and len(terms[0][1]) == 1 and terms[0][1][0][1] == LINEAR
+                and name in (None, terms[0][1][0][0]))
+
+    def symbolic_power(self, base, exponent):
+        """
+        n^k with a variable exponent: its order against other powers of n depends on k,
+        so it is a variable of its own ("n^k"), comparable only with itself.
+        """
+        if not self.is_variable(base) or not self.is_variable(exponent):
+            raise ValueError("Unsupported exponent")
+        return make_term(1, {f"{base[0][1][0][0]}^{exponent[0][1][0][0]}": LINEAR})
+
+    @staticmethod
+    def factorial(terms):
+        if not ComplexityParser.is_variable(terms):
+            raise ValueError("Unsupported factorial")
+        return make_term(1, {terms[0][1][0][0]: (1, 1, 0, 0, 0)})
+
+    @staticmethod
+    def logarithm(terms):
+        """
+        log of a sum is Θ(sum of the logs of its terms); the log of a term is dominated,
+        in each variable, by its fastest-growing factor.
+        """
+        result = []
+        for _, growths in terms:
+            for var, (fact, base, poly, log, loglog) in growths:
+                if fact > 0:
+                    result.append(make_term(1, {var: (0, 1, 1, 1, 0)}))  # log n! = Θ(n log n)
+                elif base > 1:
+                    result.append(make_term(1, {var: LINEAR}))  # log 2^n = Θ(n)
+                elif poly > 0:
+                    result.append(make_term(1, {var: (0, 1, 0, 1, 0)}))
+                elif log > 0:
+                    result.append(make_term(1, {var: (0, 1, 0, 0, 1)}))  # log log n
+                elif fact or base != 1 or poly or log or loglog:
+                    raise ValueError("Unsupported logarithm")
+        return result or [make_term(1, {})]
+
+
+# ----------------------------- Public API -----------------------------
+
+
+def extract_big_o(text: str) -> str:
+    """
+    Extracts the expression inside O(...) from a declared complexity (or the whole text if there is no O).
+    """
+    text = text.strip().lower()
+    for old, new in REPLACEMENTS.items():
+        text = text.replace(old, new)
+    if text in COMPLEXITY_WORDS:
+        return COMPLEXITY_WORDS[text]
+
+    matches = list(BIG_O_PATTERN.finditer(text))
+    if not matches:
+        return text
+    match = matches[0]
+    if len(matches) > 1 and "time" in text:  # e.g. "O(1) space and O(n) time": keep the one closest to "time"
+        position = text.index("time")
+        match = min(matches, key=lambda m: abs(m.start() - position))
+    depth, start = 1, match.end()
+    for i in range(start, len(text)):
+        depth += {"(": 1, ")": -1}.get(text[i], 0)
+        if depth == 0:
+            return text[start:i]
+    return text[start:]
+
+
+@lru_cache(maxsize=4096)
+def parse_complexity(text: str) -> Complexity:
+    """
+    Parses a declared time complexity.
+
+    Args:
+        text (str): E.g. "O(n log n)", "o(n*log(n))", "O(V + E)", "O(2^n)", "O(n^k)", "O(log log n)", "linear".
+
+    Returns:
+        Complexity: The complexity in canonical form.
+
+    Raises:
+        ValueError: If the text is not a supported Big-O expression (or overflows, e.g. O(10^1000),
+        or nests too deeply).
+    """
+    try:
+        return Complexity(ComplexityParser(extract_big_o(text)).parse())
+    except (OverflowError, RecursionError) as e:
+        raise ValueError(f"Unsupported complexity: {type(e).__name__}") from e
+
+
+def normalize_complexity(text: str) -> str:
+    """
+    Returns the canonical form of a declared time complexity (e.g. "o(nlogn)" -> "O(n log n)"),
+    or the lowercased text without spaces if it cannot be parsed.
+    """
+    try:
+        return str(parse_complexity(text))
+    except ValueError:
+        return text.lower().replace(" ", "")
+
+
+def compare_complexities(a: str, b: str):
+    """
+    Compares two declared time complexities.
+
+    Returns:
+        int | None: -1 if a grows slower than b, 0 if equivalent, 1 if faster,
+        None if they are not comparable or cannot be parsed.
+    """
+    try:
+        return parse_complexity(a).compare(parse_complexity(b))
+    except ValueError:
+        return None
+
+
+def get_dominance_ranks(complexities: dict) -> dict:
+    """
+    Ranks declared time complexities by growth: the rank of each key is the number of
+    other complexities that are strictly better (0 for the best, non-dominated ones).
+    Complexities that cannot be parsed are ranked after all the others.
+
+    Args:
+        complexities (dict): Key (e.g. solution index) -> declared time complexity.
+
+    Returns:
+        dict: Key -> rank.
+    """
+    parsed = {}
+    for key, text in complexities.items():
+        try:
+            parsed[key] = parse_complexity(text)
+        except (ValueError, TypeError, AttributeError):  # also not a string
+            parsed[key] = None
+
+    ranks = {}
+    for key, complexity in parsed.items():
+        if complexity is None:
+            ranks[key] = len(parsed)
+        else:
+            ranks[key] = sum(other is not None and other < complexity for other in parsed.values())
+    return ranks
@@ -0,0 +1,368 @@
+'''
+This file contains a content-addressed store for the large text artifacts of the experiments
+(prompts, canonical solutions, generated code, documentation, evaluator feedback, transcripts):
+    - Every text is stored once, compressed, under the SHA-256 of its content; the results
+      (see results_db and results_store) keep only that digest, so storage grows with the unique
+      content and not with the number of runs
+    - Long texts with repeated parts (the transcripts of Analysis/) are split into chunks at line
+      boundaries chosen by their content, so the parts shared by several transcripts are stored once too
+    - Texts are read only when accessed (Blob), through an LRU cache of the decompressed texts
+    - A single SQLite file (WAL journal) shared by concurrent runs, with one connection per thread
+Usage:
+    python blob_store.py archive ../Analysis
+    python blob_store.py restore <target folder> [path prefix]
+    python blob_store.py stats
+'''
+
+import os
+import sys
+import zlib
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+# ----------------------------- Configuration -----------------------------
+
+# Blob store shared by the results of the multi-agent and single-LLM runs
+BLOB_STORE_PATH = "results_blobs.sqlite"
+
+# Seconds a writer waits for the lock held by another process
+BUSY_TIMEOUT = 60
+
+# zlib compression level of the stored blobs
+COMPRESSION_LEVEL = 6
+
+# Decompressed texts kept in memory
+BLOB_CACHE_SIZE = 1024
+
+# Chunking of long texts: a chunk ends after a line whose hash is a multiple of CHUNK_MASK + 1
+# (about 8 lines per chunk), or when it reaches MAX_CHUNK_SIZE characters.
+# Lines of at least LONG_LINE characters (e.g. a logged task with its prompt) are chunks on their own.
+CHUNK_MASK = 7
+LONG_LINE = 512
+MAX_CHUNK_SIZE = 1 << 16
+
+# Bytes of a SHA-256 digest (the manifest of a chunked text is the concatenation of the digests of its chunks)
+DIGEST_SIZE = 32
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    compression TEXT NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL REFERENCES blobs (digest),
+    size INTEGER NOT NULL
+);
+"""
+
+# Kinds of blobs: a text, or the manifest of a chunked text
+TEXT = "text"
+CHUNKS = "chunks"
+
+# ----------------------------- Helpers -----------------------------
+
+
+def get_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def split_chunks(text: str) -> list:
+    """
+    Splits a text into chunks at line boundaries that depend only on the lines themselves,
+    so the same run of lines gives the same chunks wherever it appears.
+
+    Returns:
+        list: The chunks, whose concatenation is the text.
+    """
+    chunks, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        if len(line) >= LONG_LINE:
+            if current:
+                chunks.append("".join(current))
+                current, size = [], 0
+            chunks.append(line)
+            continue
+        current.append(line)
+        size += len(line)
+        if zlib.crc32(line.encode("utf-8")) & CHUNK_MASK == 0 or size >= MAX_CHUNK_SIZE:
+            chunks.append("".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def compress(data: bytes):
+    """
+    Returns:
+        tuple: (compression, stored data); data that zlib does not shrink is stored as is.
+    """
+    compressed = zlib.compress(data, COMPRESSION_LEVEL)
+    return ("zlib", compressed) if len(compressed) < len(data) else ("none", data)
+
+
+def decompress(compression: str, data: bytes) -> bytes:
+    return zlib.decompress(data) if compression == "zlib" else bytes(data)
+
+
+# ----------------------------- Store -----------------------------
+
+
+class ThreadConnections:
+    """
+    One SQLite connection per thread (a connection cannot be used by several threads), opened on first use.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect  # opens and configures a connection
+        self.local = threading.local()
+        self.connections = []
+        self.lock = threading.Lock()
+
+    def get(self) -> sqlite3.Connection:
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self.connect()
+            with self.lock:
+                self.connections.append(connection)
+        return connection
+
+    def close(self):
+        """Closes the connections of every thread (opened with check_same_thread=False)."""
+        with self.lock:
+            for connection in self.connections:
+                connection.close()
+            self.connections.clear()
+            self.local = threading.local()
+
+
+class Blob:
+    """
+    Lazy reference to a text of the blob store: the text is read on first access (str(blob) or blob.text).
+    """
+
+    __slots__ = ("digest", "store")
+
+    def __init__(self, digest: str, store):
+        self.digest = digest
+        self.store = store
+
+    @property
+    def text(self) -> str:
+        return self.store.get(self.digest)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Blob({self.digest[:12]})"
+
+    def __eq__(self, other):
+        return isinstance(other, Blob) and other.digest == self.digest
+
+    def __hash__(self):
+        return hash(self.digest)
+
+
+class BlobStore:
+    """
+    Connection of one process to the blob store (one SQLite connection per thread, see ThreadConnections).
+    """
+
+    def __init__(self, path=BLOB_STORE_PATH, cache_size=BLOB_CACHE_SIZE):
+        self.path = path
+        self.connections = ThreadConnections(self.connect)
+        with self.transaction():
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self.connection.execute(statement)
+        # Blobs never change once stored, so their texts can be cached for the lifetime of the connection
+        self.get = lru_cache(maxsize=cache_size)(self.read)
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread."""
+        return self.connections.get()
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction (BEGIN IMMEDIATE, see results_db.Transaction)."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def close(self):
+        self.connections.close()
+
+    def contains(self, digest: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def write(self, digest: str, kind: str, data: bytes, size: int):
+        compression, stored = compress(data)
+        self.connection.execute(
+            "INSERT OR IGNORE INTO blobs (digest, kind, size, compression, data) VALUES (?, ?, ?, ?, ?)",
+            (digest, kind, size, compression, stored))
+
+    def insert(self, text: str, digest: str, chunked: bool):
+        if self.contains(digest):
+            return
+        data = text.encode("utf-8")
+        chunks = split_chunks(text) if chunked else [text]
+        if len(chunks) < 2:
+            self.write(digest, TEXT, data, len(data))
+            return
+        chunk_digests = [get_digest(chunk) for chunk in chunks]
+        for chunk, chunk_digest in zip(chunks, chunk_digests):
+            self.insert(chunk, chunk_digest, False)
+        self.write(digest, CHUNKS, b"".join(bytes.fromhex(chunk_digest) for chunk_digest in chunk_digests),
+                   len(data))
+
+    def put_many(self, texts: list, chunked=False) -> list:
+        """
+        Stores texts, in a single transaction; the texts already stored are not written again.
+
+        Args:
+            texts (list): The texts (None values are kept as None).
+            chunked (bool): Split long texts into chunks (for texts with parts repeated in other texts).
+
+        Returns:
+            list: The digest of each text.
+        """
+        digests = [None if text is None else get_digest(text) for text in texts]
+        pending = {digest: text for digest, text in zip(digests, texts) if digest is not None}
+        if pending:
+            with self.transaction():
+                for digest, text in pending.items():
+                    self.insert(text, digest, chunked)
+        return digests
+
+    def put(self, text, chunked=False):
+        """
+        Stores a text and returns its digest (None for None).
+        """
+        return self.put_many([text], chunked)[0]
+
+    def read(self, digest: str) -> str:
+        """
+        Reads and decompresses a text (use get, its cached version).
+        """
+        row = self.connection.execute("SELECT kind, compression, data FROM blobs WHERE digest = ?",
+                                      (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"Blob {digest} not found in {self.path}")
+        kind, compression, data = row
+        data = decompress(compression, data)
+        if kind == CHUNKS:
+            return "".join(self.get(data[i:i + DIGEST_SIZE].hex()) for i in range(0, len(data), DIGEST_SIZE))
+        return data.decode("utf-8")
+
+    def ref(self, digest):
+        """
+        Returns the lazy reference to a stored text (None for None).
+        """
+        return None if digest is None else Blob(digest, self)
+
+    # ----------------------------- Files -----------------------------
+
+    def archive_files(self, root: str, prefix=None) -> int:
+        """
+        Stores the text files under a folder (e.g. the Analysis/ transcripts), chunked,
+        under their path relative to the folder.
+
+        Args:
+            root (str): The folder.
+            prefix (str | None): Prefix of the stored paths (default: the name of the folder).
+
+        Returns:
+            int: Number of archived files.
+        """
+        prefix = os.path.basename(os.path.normpath(root)) if prefix is None else prefix
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                with open(path, encoding="utf-8", newline="") as f:
+                    relative_path = os.path.relpath(path, root).replace(os.sep, "/")
+                    files[f"{prefix}/{relative_path}" if prefix else relative_path] = f.read()
+
+        digests = self.put_many(list(files.values()), chunked=True)
+        with self.transaction():
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files (path, digest, size) VALUES (?, ?, ?)",
+                [(path, digest, len(text.encode("utf-8"))) for (path, text), digest in zip(files.items(), digests)])
+        return len(files)
+
+    def list_files(self, prefix="") -> dict:
+        """
+        Returns:
+            dict: Path -> Blob of the archived files whose path starts with the prefix.
+        """
+        rows = self.connection.execute("SELECT path, digest FROM files WHERE substr(path, 1, ?) = ? ORDER BY path",
+                                       (len(prefix), prefix))
+        return {path: Blob(digest, self) for path, digest in rows}
+
+    def restore_files(self, target: str, prefix="") -> int:
+        """
+        Writes the archived files whose path starts with the prefix under a folder.
+
+        Returns:
+            int: Number of restored files.
+        """
+        files = self.list_files(prefix)
+        for path, blob in files.items():
+            destination = os.path.join(target, *path.split("/"))
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            with open(destination, "w", encoding="utf-8", newline="") as f:
+                f.write(blob.text)
+        return len(files)
+
+    def get_stats(self) -> dict:
+        """
+        Returns:
+            dict: Number of blobs, bytes stored, bytes of the unique texts and bytes of the archived files.
+        """
+        blobs, stored, unique = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0) FROM blobs "
+            "WHERE kind = ?", (TEXT,)).fetchone()
+        manifests, manifest_bytes = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs WHERE kind = ?", (CHUNKS,)).fetchone()
+        files, file_bytes = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        return {"blobs": blobs + manifests, "stored_bytes": stored + manifest_bytes, "unique_text_bytes": unique,
+                "files": files, "file_bytes": file_bytes}
+
+
+@lru_cache(maxsize=None)
+def get_blob_store(path=BLOB_STORE_PATH) -> BlobStore:
+    """
+    Returns the connection of this process to the blob store, opened on first use.
+    """
+    return BlobStore(path)
+
+
+if __name__ == "__main__":
+    store = get_blob_store()
+    if len(sys.argv) > 2 and sys.argv[1] == "archive":
+        print(f"{store.archive_files(sys.argv[2])} files archived into {store.path}")
+    elif len(sys.argv) > 2 and sys.argv[1] == "restore":
+        print(f"{store.restore_files(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else '')} files restored")
+    elif len(sys.argv) > 1 and sys.argv[1] == "stats":
+        print(store.get_stats())
+    else:
+        print(__doc__)
@@ -0,0 +1,509 @@
+'''
+This file contains an embedded rule engine that finds bugs, vulnerabilities and code smells
+in generated code, a local alternative to the SonarQube issue counts:
+    - Every rule is checked in a single traversal of the AST of the file
+    - Each issue has a rule, a type (bug, vulnerability, code smell), a severity and a location
+    - The counts use the SonarQube keys (bugs, vulnerabilities, code_smells), and the reliability
+      and security ratings follow the SonarQube definition (worst severity of the bugs / vulnerabilities)
+'''
+
+import ast
+import builtins
+
+# ----------------------------- Rules -----------------------------
+
+BUG = "bug"
+VULNERABILITY = "vulnerability"
+CODE_SMELL = "code smell"
+
+# Severities in increasing order; the rating of a file is given by its worst issue ("1.0" = A ... "5.0" = E)
+SEVERITIES = ["minor", "major", "critical", "blocker"]
+
+# Rule id -> (type, severity, message)
+RULES = {
+    "unreachable-code": (BUG, "major", "Unreachable code after '{statement}'"),
+    "mutable-default-argument": (BUG, "major", "Mutable default value for parameter '{name}'"),
+    "self-assignment": (BUG, "major", "Variable '{name}' is assigned to itself"),
+    "identity-comparison-with-literal": (BUG, "major", "Identity operator '{op}' used with a literal"),
+    "assert-on-tuple": (BUG, "major", "Assertion on a tuple is always true"),
+    "duplicate-dict-key": (BUG, "major", "Duplicate key {key!r} in dictionary literal"),
+    "eval-exec": (VULNERABILITY, "critical", "Dynamic code execution with '{name}'"),
+    "shell-command": (VULNERABILITY, "critical", "Command executed through a shell with '{name}'"),
+    "unsafe-deserialization": (VULNERABILITY, "major", "Untrusted data deserialized with '{name}'"),
+    "insecure-temp-file": (VULNERABILITY, "major", "Insecure temporary file created with '{name}'"),
+    "disabled-certificate-check": (VULNERABILITY, "major", "Certificate verification disabled in '{name}'"),
+    "hardcoded-credential": (VULNERABILITY, "blocker", "Hard-coded credential in '{name}'"),
+    "bare-except": (CODE_SMELL, "major", "Bare 'except:' also catches SystemExit and KeyboardInterrupt"),
+    "empty-except": (CODE_SMELL, "minor", "Exception silently ignored"),
+    "unused-variable": (CODE_SMELL, "minor", "Local variable '{name}' is assigned but never used"),
+    "unused-argument": (CODE_SMELL, "major", "Parameter '{name}' is never used"),
+    "unused-import": (CODE_SMELL, "minor", "Import '{name}' is never used"),
+    "wildcard-import": (CODE_SMELL, "major", "Wildcard import from '{name}'"),
+    "shadowed-builtin": (CODE_SMELL, "major", "'{name}' shadows a built-in name"),
+    "global-statement": (CODE_SMELL, "minor", "Global variable '{name}' modified in a function"),
+    "comparison-to-none": (CODE_SMELL, "minor", "Comparison to None with '{op}' instead of 'is'"),
+    "too-many-parameters": (CODE_SMELL, "major", "Function '{name}' has {count} parameters (max {limit})"),
+}
+
+# Maximum number of parameters of a function
+MAX_PARAMETERS = 7
+
+# Bump when the rules or their results change (invalidates the metric store)
+RULES_VERSION = 2
+
+BUILTIN_NAMES = {name for name in dir(builtins) if not name.startswith("_")}
+
+MUTABLE_DEFAULTS = (ast.List, ast.Dict, ast.Set, ast.ListComp, ast.DictComp, ast.SetComp)
+MUTABLE_FACTORIES = {"list", "dict", "set", "bytearray", "defaultdict", "OrderedDict", "deque", "Counter"}
+
+SHELL_FUNCTIONS = {"os.system", "os.popen", "subprocess.getoutput", "subprocess.getstatusoutput"}
+SUBPROCESS_FUNCTIONS = {"subprocess.run", "subprocess.call", "subprocess.check_call",
+                        "subprocess.check_output", "subprocess.Popen"}
+DESERIALIZATION_FUNCTIONS = {"pickle.load", "pickle.loads", "marshal.load", "marshal.loads",
+                             "shelve.open", "dill.load", "dill.loads"}
+YAML_LOADERS = {"yaml.load", "yaml.load_all"}
+REQUESTS_FUNCTIONS = {"requests.get", "requests.post", "requests.put", "requests.patch", "requests.delete",
+                      "requests.head", "requests.request"}
+CREDENTIAL_WORDS = ("password", "passwd", "pwd", "passphrase", "secret_key", "api_key", "apikey")
+
+TERMINATORS = (ast.Return, ast.Raise, ast.Continue, ast.Break)
+
+# ----------------------------- Analysis -----------------------------
+
+
+def get_call_name(node):
+    """
+    Returns the dotted name of a called function ('subprocess.run', 'eval'), or None.
+    """
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def get_keyword(node, name):
+    for keyword in node.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+def is_literal(node):
+    return isinstance(node, (ast.Constant, ast.List, ast.Tuple, ast.Dict, ast.Set, ast.JoinedStr)) \
+        and not (isinstance(node, ast.Constant) and (node.value is None or isinstance(node.value, bool)
+                                                      or node.value is Ellipsis))
+
+
+def get_all_arguments(arguments):
+    """
+    Returns the parameters of a function: positional, keyword-only, *args and **kwargs.
+    """
+    all_arguments = arguments.posonlyargs + arguments.args + arguments.kwonlyargs
+    return all_arguments + [argument for argument in (arguments.vararg, arguments.kwarg) if argument]
+
+
+class Scope:
+    """
+    Names bound and read inside a function (nested functions included), to find unused names.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        self.arguments = {}  # name -> node
+        self.assigned = {}  # name -> first node storing it
+        self.loaded = set()
+        self.declared = set()  # global / nonlocal names
+
+
+class ClassScope:
+    """
+    Marker for a class body on the scope stack (its names are attributes, not local variables).
+    """
+
+    def __init__(self, node):
+        self.node = node
+
+
+class RuleChecker(ast.NodeVisitor):
+    """
+    Checks every rule of RULES in one traversal of a module.
+    """
+
+    def __init__(self):
+        self.issues = []
+        self.scopes = []  # enclosing functions (Scope) and classes (ClassScope)
+        self.imports = {}  # bound name -> (import node, imported name)
+        self.module_loads = set()
+        self.shadowed = set()  # (scope, name) of the built-in names already reported
+
+    def report(self, rule, node, **details):
+        rule_type, severity, message = RULES[rule]
+        self.issues.append({
+            "rule": rule,
+            "type": rule_type,
+            "severity": severity,
+            "line": getattr(node, "lineno", 0),
+            "column": getattr(node, "col_offset", 0),
+            "message": message.format(**details)
+        })
+
+    # === Statement lists (unreachable code) ===
+
+    def generic_visit(self, node):
+        self.check_statement_lists(node)
+        super().generic_visit(node)
+
+    def check_statement_lists(self, node):
+        """Reports the first statement following a return, raise, continue or break in each block of the node."""
+        for _, value in ast.iter_fields(node):
+            if not (isinstance(value, list) and value and isinstance(value[0], ast.stmt)):
+                continue
+            for statement, following in zip(value, value[1:]):
+                if isinstance(statement, TERMINATORS):
+                    self.report("unreachable-code", following, statement=type(statement).__name__.lower())
+                    break
+
+    # === Functions ===
+
+    def visit_FunctionDef(self, node):
+        self.check_shadowing(node.name, node)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.check_arguments(node)
+        if node.returns:
+            self.visit_annotation(node.returns)
+
+        scope = Scope(node)
+        for argument in get_all_arguments(node.args):
+            scope.arguments[argument.arg] = argument
+            self.check_shadowing(argument.arg, argument)
+
+        self.scopes.append(scope)
+        for statement in node.body:
+            self.visit(statement)
+        self.check_statement_lists(node)
+        self.scopes.pop()
+        self.close_scope(scope)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        self.check_arguments(node)
+        self.visit(node.body)
+
+    def check_arguments(self, node):
+        arguments = node.args
+        for default in arguments.defaults + [d for d in arguments.kw_defaults if d is not None]:
+            self.visit(default)
+        for argument in get_all_arguments(arguments):
+            if argument.annotation:
+                self.visit_annotation(argument.annotation)
+        positional = arguments.posonlyargs + arguments.args
+        pairs = list(zip(positional[len(positional) - len(arguments.defaults):], arguments.defaults))
+        pairs += [(a, d) for a, d in zip(arguments.kwonlyargs, arguments.kw_defaults) if d is not None]
+        for argument, default in pairs:
+            if isinstance(default, MUTABLE_DEFAULTS) or (isinstance(default, ast.Call) and
+                                                         (get_call_name(default.func) or "").split(".")[-1]
+                                                         in MUTABLE_FACTORIES):
+                self.report("mutable-default-argument", default, name=argument.arg)
+
+        count = len(positional) + len(arguments.kwonlyargs)
+        if positional and positional[0].arg in ("self", "cls"):
+            count -= 1
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and count > MAX_PARAMETERS:
+            self.report("too-many-parameters", node, name=node.name, count=count, limit=MAX_PARAMETERS)
+
+    def visit_annotation(self, annotation):
+        """Visits a type annotation; a string annotation (forward reference) is parsed first."""
+        if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+            try:
+                annotation = ast.parse(annotation.value, mode="eval").body
+            except SyntaxError:
+                return
+        self.visit(annotation)
+
+    def close_scope(self, scope):
+        """Reports the unused names of a function and passes its reads to the enclosing function."""
+        node = scope.node
+        # Stubs, methods (overrides) and decorated functions (callbacks) may ignore their parameters
+        is_stub = all(isinstance(statement, (ast.Pass, ast.Expr, ast.Raise)) for statement in node.body)
+        is_method = bool(self.scopes) and isinstance(self.scopes[-1], ClassScope)
+        if not is_stub and not is_method and not node.decorator_list:
+            for name, argument in scope.arguments.items():
+                if name not in scope.loaded and not name.startswith("_"):
+                    self.report("unused-argument", argument, name=name)
+        for name, target in scope.assigned.items():
+            if name not in scope.loaded and name not in scope.declared and not name.startswith("_"):
+                self.report("unused-variable", target, name=name)
+
+        # Names read by a nested function are used by the enclosing one too
+        if self.scopes and isinstance(self.scopes[-1], Scope):
+            self.scopes[-1].loaded.update(scope.loaded)
+
+    # === Classes ===
+
+    def visit_ClassDef(self, node):
+        self.check_shadowing(node.name, node)
+        for child in node.bases + node.keywords + node.decorator_list:
+            self.visit(child)
+        self.scopes.append(ClassScope(node))
+        for statement in node.body:
+            self.visit(statement)
+        self.check_statement_lists(node)
+        self.scopes.pop()
+
+    # === Names ===
+
+    def current_function(self):
+        return self.scopes[-1] if self.scopes and isinstance(self.scopes[-1], Scope) else None
+
+    def visit_Name(self, node):
+        scope = self.current_function()
+        if isinstance(node.ctx, ast.Load):
+            self.module_loads.add(node.id)
+            if scope:
+                scope.loaded.add(node.id)
+        elif isinstance(node.ctx, ast.Store):
+            self.check_shadowing(node.id, node)
+            if scope and node.id not in scope.arguments:
+                scope.assigned.setdefault(node.id, node)
+        elif isinstance(node.ctx, ast.Del) and scope:
+            scope.loaded.add(node.id)
+
+    def check_shadowing(self, name, node):
+        if name not in BUILTIN_NAMES:
+            return
+        scope = id(self.scopes[-1]) if self.scopes else None
+        if (scope, name) not in self.shadowed:
+            self.shadowed.add((scope, name))
+            self.report("shadowed-builtin", node, name=name)
+
+    def visit_Global(self, node):
+        scope = self.current_function()
+        if scope:
+            scope.declared.update(node.names)
+            if isinstance(node, ast.Global):
+                for name in node.names:
+                    self.report("global-statement", node, name=name)
+
+    visit_Nonlocal = visit_Global
+
+    def visit_AugAssign(self, node):
+        # The target is read before being written
+        if isinstance(node.target, ast.Name):
+            scope = self.current_function()
+            self.module_loads.add(node.target.id)
+            if scope:
+                scope.loaded.add(node.target.id)
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        for target in node.targets:
+            if isinstance(target, ast.Name) and isinstance(node.value, ast.Name) and target.id == node.value.id:
+                self.report("self-assignment", node, name=target.id)
+            if isinstance(target, (ast.Name, ast.Attribute)) and isinstance(node.value, ast.Constant) \
+                    and isinstance(node.value.value, str) and node.value.value:
+                name = target.id if isinstance(target, ast.Name) else target.attr
+                if any(word in name.lower() for word in CREDENTIAL_WORDS):
+                    self.report("hardcoded-credential", node, name=name)
+        # Unpacked targets are often partly unused on purpose: only plain names are tracked
+        for target in node.targets:
+            if isinstance(target, (ast.Tuple, ast.List)):
+                self.visit_unpacking(target)
+            else:
+                self.visit(target)
+        self.visit(node.value)
+
+    def visit_AnnAssign(self, node):
+        self.visit(node.target)
+        self.visit_annotation(node.annotation)
+        if node.value:
+            self.visit(node.value)
+
+    def visit_unpacking(self, target):
+        scope = self.current_function()
+        for element in ast.walk(target):
+            if isinstance(element, ast.Name):
+                self.check_shadowing(element.id, element)
+                if scope:
+                    scope.loaded.add(element.id)
+            elif isinstance(element, (ast.Attribute, ast.Subscript)):
+                self.visit(element)
+
+    def visit_For(self, node):
+        if isinstance(node.target, (ast.Tuple, ast.List)):
+            self.visit_unpacking(node.target)
+        else:
+            self.visit_loop_target(node.target)
+        for child in [node.iter] + node.body + node.orelse:
+            self.visit(child)
+        self.check_statement_lists(node)
+
+    visit_AsyncFor = visit_For
+
+    def visit_comprehension(self, node):
+        if isinstance(node.target, (ast.Tuple, ast.List)):
+            self.visit_unpacking(node.target)
+        else:
+            self.visit_loop_target(node.target)
+        self.visit(node.iter)
+        for condition in node.ifs:
+            self.visit(condition)
+
+    def visit_loop_target(self, target):
+        # Loop variables are allowed to be unused (e.g. 'for i in range(n)')
+        if isinstance(target, ast.Name):
+            self.check_shadowing(target.id, target)
+            scope = self.current_function()
+            if scope:
+                scope.loaded.add(target.id)
+        else:
+            self.visit(target)
+
+    def visit_withitem(self, node):
+        self.visit(node.context_expr)
+        if node.optional_vars is not None:
+            self.visit_loop_target(node.optional_vars)
+
+    # === Imports ===
+
+    def visit_Import(self, node):
+        for alias in node.names:
+            name = alias.asname or alias.name.split(".")[0]
+            self.imports.setdefault(name, (node, alias.asname or alias.name))
+
+    def visit_ImportFrom(self, node):
+        for alias in node.names:
+            if alias.name == "*":
+                self.report("wildcard-import", node, name=node.module or ".")
+            else:
+                self.imports.setdefault(alias.asname or alias.name, (node, alias.asname or alias.name))
+
+    # === Exceptions ===
+
+    def visit_ExceptHandler(self, node):
+        if node.type is None:
+            self.report("bare-except", node)
+        if all(isinstance(statement, ast.Pass) for statement in node.body):
+            self.report("empty-except", node)
+        if node.name:
+            scope = self.current_function()
+            if scope:
+                scope.loaded.add(node.name)
+        self.generic_visit(node)
+
+    # === Expressions ===
+
+    def visit_Compare(self, node):
+        operands = [node.left] + node.comparators
+        for op, left, right in zip(node.ops, operands, operands[1:]):
+            if isinstance(op, (ast.Is, ast.IsNot)) and (is_literal(left) or is_literal(right)):
+                self.report("identity-comparison-with-literal", node, op="is" if isinstance(op, ast.Is) else "is not")
+            if isinstance(op, (ast.Eq, ast.NotEq)) and any(
+                    isinstance(side, ast.Constant) and side.value is None for side in (left, right)):
+                self.report("comparison-to-none", node, op="==" if isinstance(op, ast.Eq) else "!=")
+        self.generic_visit(node)
+
+    def visit_Assert(self, node):
+        if isinstance(node.test, ast.Tuple) and node.test.elts:
+            self.report("assert-on-tuple", node)
+        self.generic_visit(node)
+
+    def visit_Dict(self, node):
+        seen = set()
+        for key in node.keys:
+            if isinstance(key, ast.Constant):
+                marker = (type(key.value), key.value)
+                if marker in seen:
+                    self.report("duplicate-dict-key", key, key=key.value)
+                seen.add(marker)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        name = get_call_name(node.func)
+        if name in ("eval", "exec"):
+            self.report("eval-exec", node, name=name)
+        elif name in SHELL_FUNCTIONS:
+            self.report("shell-command", node, name=name)
+        elif name in SUBPROCESS_FUNCTIONS:
+            shell = get_keyword(node, "shell")
+            if shell is not None and not (isinstance(shell, ast.Constant) and not shell.value):
+                self.report("shell-command", node, name=name)
+        elif name in DESERIALIZATION_FUNCTIONS:
+            self.report("unsafe-deserialization", node, name=name)
+        elif name in YAML_LOADERS and get_keyword(node, "Loader") is None and len(node.args) < 2:
+            self.report("unsafe-deserialization", node, name=name)
+        elif name == "tempfile.mktemp":
+            self.report("insecure-temp-file", node, name=name)
+        elif name in REQUESTS_FUNCTIONS:
+            verify = get_keyword(node, "verify")
+            if isinstance(verify, ast.Constant) and verify.value is False:
+                self.report("disabled-certificate-check", node, name=name)
+        self.generic_visit(node)
+
+    # === Module ===
+
+    def check_module(self, tree):
+        self.visit(tree)
+        exported = set()
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+                if isinstance(node.value, (ast.List, ast.Tuple)):
+                    exported.update(e.value for e in node.value.elts if isinstance(e, ast.Constant))
+        for name, (node, label) in self.imports.items():
+            if name not in self.module_loads and name not in exported:
+                self.report("unused-import", node, name=label)
+        self.issues.sort(key=lambda issue: (issue["line"], issue["column"], issue["rule"]))
+        return self.issues
+
+
+def get_rating(issues, issue_type):
+    """
+    Rating of a file in the SonarQube format, from the worst severity of its issues of the given type.
+    """
+    severities = [SEVERITIES.index(issue["severity"]) for issue in issues if issue["type"] == issue_type]
+    return f"{max(severities) + 2 if severities else 1}.0"
+
+
+def check_code_rules(code: str, tree=None) -> dict:
+    """
+    Finds the bugs, vulnerabilities and code smells of a file (see RULES).
+
+    Args:
+        code (str): Python source code to analyze.
+        tree (ast.Module | None): The already parsed code, if available.
+
+    Returns:
+        dict:
+            - bugs, vulnerabilities, code_smells (int): Number of issues of each type.
+            - reliability_rating, security_rating (str): Ratings from the bugs / vulnerabilities ("1.0" = A ... "5.0" = E).
+            - rules (dict): Number of issues of each rule found.
+            - issues (list): One dict per issue: rule, type, severity, line, column, message.
+            - error (str | None): Error message (the code does not parse).
+    """
+    try:
+        tree = tree or ast.parse(code)
+    except (SyntaxError, ValueError) as e:
+        return {"bugs": -1, "vulnerabilities": -1, "code_smells": -1, "reliability_rating": None,
+                "security_rating": None, "rules": {}, "issues": [], "error": f"Syntax error: {e}"}
+
+    issues = RuleChecker().check_module(tree)
+
+    rules = {}
+    for issue in issues:
+        rules[issue["rule"]] = rules.get(issue["rule"], 0) + 1
+
+    return {
+        "bugs": sum(issue["type"] == BUG for issue in issues),
+        "vulnerabilities": sum(issue["type"] == VULNERABILITY for issue in issues),
+        "code_smells": sum(issue["type"] == CODE_SMELL for issue in issues),
+        "reliability_rating": get_rating(issues, BUG),
+        "security_rating": get_rating(issues, VULNERABILITY),
+        "rules": rules,
+        "issues": issues,
+        "error": None
+    }
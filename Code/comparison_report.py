@@ -0,0 +1,465 @@
+'''
+This file contains the comparison report between the multi-agent system and the single LLM:
+    - Loads the results of both pipelines: the results CSVs, or the results database (see results_db),
+      which also knows how many debate rounds each task took
+    - Per-task and overall deltas (multi-agent minus single LLM) of correctness, wall time, tokens,
+      rounds and code quality, for every debate strategy and for the multi-agent runs as a whole,
+      computed on whole columns with pandas and NumPy
+    - Static-analysis metrics are compared per analyzer (SonarQube or the in-process engine, as recorded with
+      each row): one block per analyzer present on both sides; tasks whose two sides were measured by
+      different analyzers have no static-analysis delta
+    - Bootstrap confidence intervals of the mean deltas over the tasks, resampled in batches of index arrays
+    - The per-task sums are cached (a single Parquet file, replaced atomically together with the read
+      positions of the sources): regenerating the report after new runs reads only the rows added since
+Usage:
+    python comparison_report.py [--db]
+'''
+
+import io
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from results_store import EVALUATION_CRITERIA, EVALUATION_COLUMNS, ANALYZER_PATTERN, SONARQUBE_ANALYZER
+from results_db import RESULTS_DB_PATH, ANALYSIS_SOURCES, EVALUATOR
+from utility_function import locked_file
+
+# ----------------------------- Configuration -----------------------------
+
+MULTI_AGENT = "multi-agent"
+SINGLE_LLM = "single-LLM"
+
+# Results of each pipeline
+RESULTS_SOURCES = [(MULTI_AGENT, "multi-agent_csv_results.csv"), (SINGLE_LLM, "single-agent_csv_results.csv")]
+
+# Names of the debate strategies (see main_multi-agent_debate.py)
+DEBATE_STRATEGIES = {"0": "self-refinement", "1": "instant runoff voting", "2": "mixed"}
+
+# Static-analysis metrics compared (keys of the 'metrics_sonarqube' field)
+STATIC_METRICS = ["bugs", "vulnerabilities", "code_smells", "reliability_rating", "security_rating", "sqale_rating",
+                  "ncloc"]
+
+# Analyzers of the static-analysis metrics. SonarQube and the in-process engine do not rate code the same way:
+# each metric is compared per analyzer, i.e. only between rows measured by the same one
+ANALYZERS = list(ANALYSIS_SOURCES)
+
+# Compared metric -> (static-analysis metric, analyzer)
+ANALYZER_METRICS = {f"{key} ({analyzer})": (key, analyzer) for analyzer in ANALYZERS for key in STATIC_METRICS}
+
+# Compared metrics, one value per results row ('tokens' only when the results record it)
+REPORT_METRICS = (["tests_pass_rate", "all_tests_passed"] + list(EVALUATION_COLUMNS.values())
+                  + ["time", "tokens", "rounds", "cognitive_complexity"] + list(ANALYZER_METRICS))
+
+REPORT_PATH = "comparison_report.csv"
+REPORT_TASKS_PATH = "comparison_report_tasks.csv"
+REPORT_CACHE_PATH = "comparison_report_cache.parquet"
+
+# Bump when the cached sums change meaning (the cache is then rebuilt)
+REPORT_CACHE_VERSION = 3
+
+# Bootstrap resamples, resamples drawn per batch (bounds the memory), confidence level, seed (reproducible reports)
+BOOTSTRAP_SAMPLES = 10000
+BOOTSTRAP_BATCH_SIZE = 1000
+CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 0
+
+# Statistics cached per source, system, task and metric
+STATISTICS = ["count", "sum", "sumsq"]
+KEYS = ["source", "system", "task_id"]
+
+# ----------------------------- Row Metrics -----------------------------
+
+
+def to_numeric(values):
+    return pd.to_numeric(values, errors="coerce").astype(float)
+
+
+def get_system(pipeline, strategies: pd.Series) -> pd.Series:
+    """
+    System of each row: the single LLM, or the multi-agent system with its debate strategy.
+    """
+    if pipeline != MULTI_AGENT:
+        return pd.Series(SINGLE_LLM, index=strategies.index)
+    names = strategies.astype("string").str.replace(r"\.0$", "", regex=True)
+    return MULTI_AGENT + "/" + names.map(lambda name: DEBATE_STRATEGIES.get(name, name)).fillna("unknown")
+
+
+def get_test_metrics(metrics: pd.DataFrame, tests_success, test_fails):
+    tests_success, test_fails = to_numeric(tests_success), to_numeric(test_fails)
+    total = tests_success + test_fails
+    metrics["tests_pass_rate"] = tests_success / total.where(total > 0)
+    metrics["all_tests_passed"] = ((test_fails == 0) & (tests_success > 0)).astype(float).where(total > 0)
+
+
+def get_csv_row_metrics(results: pd.DataFrame, pipeline: str) -> pd.DataFrame:
+    """
+    Compared metrics of the rows of a results CSV (see save_task_data_to_csv).
+
+    Args:
+        results (pd.DataFrame): The rows.
+        pipeline (str): MULTI_AGENT or SINGLE_LLM.
+
+    Returns:
+        pd.DataFrame: 'system', 'task_id' and one column per metric of REPORT_METRICS (NaN if unknown).
+    """
+    metrics = pd.DataFrame({"system": get_system(pipeline, results["debate_strategy"]),
+                            "task_id": to_numeric(results["task_id"])}, index=results.index)
+    get_test_metrics(metrics, results["tests_success"], results["test_fails"])
+
+    feedback = results["evaluation_feedback"].astype("string")
+    for criterion in EVALUATION_CRITERIA:
+        metrics[EVALUATION_COLUMNS[criterion]] = to_numeric(
+            feedback.str.extract(rf'"{criterion}"\s*:\s*(-?\d+)', expand=False))
+
+    metrics["time"] = to_numeric(results["time"])
+    metrics["tokens"] = to_numeric(results["tokens"]) if "tokens" in results else np.nan
+    metrics["rounds"] = to_numeric(results["rounds"]) if "rounds" in results else np.nan
+
+    # int, or the (total, details) tuple of metrics.get_cognitive_complexity; -1 when the analysis failed
+    cognitive_complexity = to_numeric(
+        results["cognitive_complexity"].astype("string").str.extract(r"^\(?\s*(-?\d+)", expand=False))
+    metrics["cognitive_complexity"] = cognitive_complexity.where(cognitive_complexity >= 0)
+
+    # Fields without an analyzer line come from SonarQube (see results_store.ANALYZER_KEY)
+    static_metrics = results["metrics_sonarqube"].astype("string")
+    analyzers = static_metrics.str.extract(ANALYZER_PATTERN, expand=False).fillna(SONARQUBE_ANALYZER)
+    for key in STATIC_METRICS:
+        values = to_numeric(static_metrics.str.extract(rf"(?m)^\s*{key}\s*:\s*(-?[\d.]+)", expand=False))
+        for analyzer in ANALYZERS:
+            metrics[f"{key} ({analyzer})"] = values.where(analyzers == analyzer)
+    return metrics[["system", "task_id"] + REPORT_METRICS]
+
+
+def get_db_row_metrics(connection, last_result_id: int) -> pd.DataFrame:
+    """
+    Compared metrics of the tasks of the results database recorded after `last_result_id`,
+    with the number of debate rounds of each task.
+
+    Returns:
+        pd.DataFrame: 'result_id', 'system', 'task_id' and one column per metric of REPORT_METRICS.
+    """
+    tasks = pd.read_sql_query(
+        "SELECT result_id, task_id, time, tests_success, test_fails, number_agents, debate_strategy, "
+        "(SELECT COUNT(*) FROM rounds WHERE rounds.result_id = tasks.result_id) AS rounds "
+        "FROM tasks JOIN runs USING (run_id) WHERE result_id > ? ORDER BY result_id",
+        connection, params=(last_result_id,)).set_index("result_id")
+    values = pd.read_sql_query("SELECT result_id, source, name, value FROM metrics WHERE result_id > ?",
+                               connection, params=(last_result_id,))
+    values = values.pivot_table(index="result_id", columns=["source", "name"], values="value", aggfunc="last")
+
+    def get_values(source, name):
+        return values[(source, name)].reindex(tasks.index) if (source, name) in values else np.nan
+
+    multi_agent = to_numeric(tasks["number_agents"]) > 1
+    metrics = pd.DataFrame({"system": get_system(MULTI_AGENT, tasks["debate_strategy"]).where(multi_agent, SINGLE_LLM),
+                            "task_id": to_numeric(tasks["task_id"])}, index=tasks.index)
+    get_test_metrics(metrics, tasks["tests_success"], tasks["test_fails"])
+    for criterion in EVALUATION_CRITERIA:
+        metrics[EVALUATION_COLUMNS[criterion]] = get_values(EVALUATOR, criterion)
+    metrics["time"] = to_numeric(tasks["time"])
+    metrics["tokens"] = np.nan
+    # Tasks without recorded rounds (single LLM, imported CSVs) have no round count
+    metrics["rounds"] = to_numeric(tasks["rounds"]).where(tasks["rounds"] > 0)
+    metrics["cognitive_complexity"] = get_values("readability", "cognitive_complexity")
+    for metric, (key, analyzer) in ANALYZER_METRICS.items():
+        metrics[metric] = get_values(ANALYSIS_SOURCES[analyzer], key)
+    return metrics[["system", "task_id"] + REPORT_METRICS].reset_index()
+
+
+def aggregate(metrics: pd.DataFrame, source: str) -> pd.DataFrame:
+    """
+    Sums of the metrics per system and task: count of known values, sum and sum of squares.
+
+    Returns:
+        pd.DataFrame: Indexed by KEYS, one column per statistic and metric ("count:time", ...).
+    """
+    values = metrics[REPORT_METRICS]
+    keys = [metrics["system"], metrics["task_id"]]
+    statistics = {"count": values.notna().astype(float).groupby(keys).sum(),
+                  "sum": values.groupby(keys).sum(),
+                  "sumsq": (values ** 2).groupby(keys).sum()}
+    sums = pd.concat([statistics[name].add_prefix(f"{name}:") for name in STATISTICS], axis=1)
+    sums.index.names = ["system", "task_id"]
+    return pd.concat({source: sums}, names=["source"])
+
+
+# ----------------------------- Cache -----------------------------
+
+
+def get_prefix_digest(path: str, size: int):
+    """
+    SHA-256 of the first `size` bytes of a file (None if the file is shorter).
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = size
+        while remaining:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                return None
+            digest.update(block)
+            remaining -= len(block)
+    return digest
+
+
+def get_csv_source(csv_path: str) -> str:
+    return f"csv:{os.path.abspath(csv_path)}"
+
+
+def get_db_source(db_path: str) -> str:
+    return f"db:{os.path.abspath(db_path)}"
+
+
+class ReportCache:
+    """
+    Per-task sums of the metrics of every source, with how far each source was read.
+    Results CSVs are append-only: a CSV whose already-read part changed is read again from the start.
+    The CSVs and the results database hold the same rows: a report reads the sums of one of them only (select).
+    """
+
+    def __init__(self, path=REPORT_CACHE_PATH):
+        self.path = path
+        self.sums = pd.DataFrame(columns=[f"{name}:{metric}" for name in STATISTICS for metric in REPORT_METRICS],
+                                 index=pd.MultiIndex.from_tuples([], names=KEYS), dtype=float)
+        self.sources = {}
+        if os.path.isfile(path):
+            table = pq.read_table(path)
+            state = json.loads(table.schema.metadata[b"report_state"])
+            if state["version"] == REPORT_CACHE_VERSION:
+                self.sums = table.to_pandas()
+                self.sources = state["sources"]
+
+    def save(self):
+        """Writes the sums and the read positions in a single file, atomically."""
+        table = pa.Table.from_pandas(self.sums)
+        state = json.dumps({"version": REPORT_CACHE_VERSION, "sources": self.sources})
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"report_state": state.encode()})
+        tmp_path = f"{self.path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def drop_source(self, source: str):
+        self.sums = self.sums.drop(source, level="source", errors="ignore")
+        self.sources.pop(source, None)
+
+    def add(self, sums: pd.DataFrame):
+        self.sums = self.sums.add(sums, fill_value=0) if len(self.sums) else sums
+
+    def select(self, sources: list) -> pd.DataFrame:
+        """Sums of the given sources only."""
+        return self.sums[self.sums.index.get_level_values("source").isin(sources)]
+
+    def update_csv(self, pipeline: str, csv_path: str) -> int:
+        """
+        Adds the rows of a results CSV appended since the last update.
+
+        Returns:
+            int: Number of new rows.
+        """
+        source = get_csv_source(csv_path)
+        state = self.sources.get(source)
+        digest = None
+        if state is not None and os.path.getsize(csv_path) >= state["offset"]:
+            digest = get_prefix_digest(csv_path, state["offset"])
+        if digest is None or digest.hexdigest() != state["digest"]:
+            self.drop_source(source)
+            state, digest = {"offset": 0, "rows": 0, "columns": None}, hashlib.sha256()
+
+        # Rows are appended under this lock (see save_task_data_to_csv): the new bytes end with a complete row
+        with open(f"{csv_path}.lock", "a") as lock_file, locked_file(lock_file), open(csv_path, "rb") as f:
+            f.seek(state["offset"])
+            data = f.read()
+        if not data.strip():
+            return 0
+
+        if state["columns"] is None:
+            results = pd.read_csv(io.BytesIO(data))
+            state["columns"] = list(results.columns)
+        else:
+            results = pd.read_csv(io.BytesIO(data), header=None, names=state["columns"])
+        self.add(aggregate(get_csv_row_metrics(results, pipeline), source))
+
+        digest.update(data)
+        self.sources[source] = {"offset": state["offset"] + len(data), "digest": digest.hexdigest(),
+                                "rows": state["rows"] + len(results), "columns": state["columns"]}
+        return len(results)
+
+    def update_db(self, db_path=RESULTS_DB_PATH) -> int:
+        """
+        Adds the tasks of the results database recorded since the last update.
+
+        Returns:
+            int: Number of new tasks.
+        """
+        source = get_db_source(db_path)
+        state = self.sources.get(source, {"last_result_id": 0})
+        connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            metrics = get_db_row_metrics(connection, state["last_result_id"])
+        finally:
+            connection.close()
+        if metrics.empty:
+            return 0
+        self.add(aggregate(metrics, source))
+        self.sources[source] = {"last_result_id": int(metrics["result_id"].max())}
+        return len(metrics)
+
+
+# ----------------------------- Report -----------------------------
+
+
+def get_task_means(sums: pd.DataFrame, systems: list) -> pd.DataFrame:
+    """
+    Mean of each metric per task over the rows of the given systems (all sources together).
+
+    Returns:
+        pd.DataFrame: Indexed by task_id, one column per metric (NaN if no row has the metric).
+    """
+    selected = sums[sums.index.get_level_values("system").isin(systems)].groupby(level="task_id").sum()
+    counts = selected[[f"count:{metric}" for metric in REPORT_METRICS]].to_numpy()
+    totals = selected[[f"sum:{metric}" for metric in REPORT_METRICS]].to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, totals / counts, np.nan)
+    return pd.DataFrame(means, index=selected.index, columns=REPORT_METRICS)
+
+
+def bootstrap_mean_ci(deltas: np.ndarray, samples=BOOTSTRAP_SAMPLES, batch_size=BOOTSTRAP_BATCH_SIZE,
+                      confidence=CONFIDENCE, seed=BOOTSTRAP_SEED):
+    """
+    Bootstrap confidence interval of the mean of each column, resampling the rows (tasks).
+    Each batch draws a (batch, tasks) array of row indices and takes the means of all its resamples at once;
+    missing values (NaN) are left out of the means.
+
+    Args:
+        deltas (np.ndarray): (tasks, metrics) array.
+
+    Returns:
+        tuple: (lower bounds, upper bounds), one per metric.
+    """
+    tasks, columns = deltas.shape
+    if tasks == 0:
+        return np.full(columns, np.nan), np.full(columns, np.nan)
+    rng = np.random.default_rng(seed)
+    known = ~np.isnan(deltas)
+    values = np.where(known, deltas, 0.0)
+    means = np.empty((samples, columns))
+    for start in range(0, samples, batch_size):
+        indices = rng.integers(0, tasks, size=(min(batch_size, samples - start), tasks))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means[start:start + len(indices)] = values[indices].sum(axis=1) / known[indices].sum(axis=1)
+    alpha = (1 - confidence) / 2
+    lower, upper = np.full(columns, np.nan), np.full(columns, np.nan)
+    # Metrics no task has a value for have no interval
+    known_columns = np.isfinite(means).any(axis=0)
+    if known_columns.any():
+        lower[known_columns], upper[known_columns] = np.nanpercentile(
+            means[:, known_columns], [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return lower, upper
+
+
+def build_report(sums: pd.DataFrame):
+    """
+    Compares every multi-agent system (each debate strategy, and all of them together) with the single LLM
+    on the tasks both solved. The means of a metric are taken over the tasks having it on both sides: for the
+    static-analysis metrics, tasks whose two sides were measured by different analyzers are dropped, and
+    analyzers that measured no task on both sides are left out of the summary.
+
+    Returns:
+        tuple: (summary, one row per system, metric and analyzer with the mean delta and its confidence interval;
+                per-task means and deltas, one row per system, task, metric and analyzer).
+    """
+    all_systems = sorted(set(sums.index.get_level_values("system")))
+    multi_agent_systems = [system for system in all_systems if system.startswith(MULTI_AGENT + "/")]
+    baseline = get_task_means(sums, [SINGLE_LLM])
+
+    summary, per_task = [], []
+    for system, systems in [(MULTI_AGENT, multi_agent_systems)] + [(system, [system]) for system in
+                                                                    multi_agent_systems]:
+        means = get_task_means(sums, systems)
+        tasks = means.index.intersection(baseline.index)
+        deltas = means.loc[tasks] - baseline.loc[tasks]
+        paired = deltas.notna()
+        system_means, baseline_means = means.loc[tasks].where(paired), baseline.loc[tasks].where(paired)
+        lower, upper = bootstrap_mean_ci(deltas.to_numpy())
+
+        block = split_analyzers(pd.DataFrame({
+            "system": system,
+            "metric": REPORT_METRICS,
+            "tasks": paired.sum().to_numpy(),
+            "system_mean": system_means.mean().to_numpy(),
+            "single_llm_mean": baseline_means.mean().to_numpy(),
+            "delta": deltas.mean().to_numpy(),
+            "ci_low": lower,
+            "ci_high": upper
+        }))
+        analyzer_tasks = block.groupby("analyzer")["tasks"].transform("sum")
+        summary.append(block[block["analyzer"].isna() | (analyzer_tasks > 0)])
+        task_block = split_analyzers(pd.concat({"system_mean": system_means.stack(),
+                                                "single_llm_mean": baseline_means.stack(),
+                                                "delta": deltas.stack()}, axis=1)
+                                     .rename_axis(["task_id", "metric"]).reset_index().assign(system=system))
+        per_task.append(task_block[task_block["analyzer"].isna() | task_block["delta"].notna()])
+
+    summary = pd.concat(summary, ignore_index=True) if summary else pd.DataFrame()
+    per_task = pd.concat(per_task, ignore_index=True) if per_task else pd.DataFrame()
+    if len(summary):
+        summary = summary[["system", "metric", "analyzer", "tasks", "system_mean", "single_llm_mean", "delta",
+                           "ci_low", "ci_high"]]
+    if len(per_task):
+        per_task = per_task[["system", "task_id", "metric", "analyzer", "system_mean", "single_llm_mean", "delta"]]
+    return summary, per_task
+
+
+def split_analyzers(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Splits the per-analyzer metrics (see ANALYZER_METRICS) into the static-analysis metric and its 'analyzer'
+    (None for the other metrics).
+    """
+    names = table["metric"].map(lambda metric: ANALYZER_METRICS.get(metric, (metric, None)))
+    return table.assign(metric=names.str[0], analyzer=names.str[1])
+
+
+def update_report(sources=RESULTS_SOURCES, use_db=False, cache_path=REPORT_CACHE_PATH,
+                  report_path=REPORT_PATH, tasks_path=REPORT_TASKS_PATH):
+    """
+    Reads the rows added to the results since the last report, updates the cached sums and
+    writes the report (summary and per-task deltas).
+
+    Args:
+        sources (list): (pipeline, results CSV) pairs.
+        use_db (bool): Read the results database instead of the CSVs (it also has the debate rounds).
+        cache_path (str): Path of the cached sums.
+        report_path (str): Path of the summary CSV.
+        tasks_path (str): Path of the per-task CSV.
+
+    Returns:
+        tuple: (summary, per-task deltas), see build_report.
+    """
+    cache = ReportCache(cache_path)
+    if use_db:
+        new_rows = cache.update_db()
+        selected = [get_db_source(RESULTS_DB_PATH)]
+    else:
+        csv_paths = [(pipeline, csv_path) for pipeline, csv_path in sources if os.path.isfile(csv_path)]
+        new_rows = sum(cache.update_csv(pipeline, csv_path) for pipeline, csv_path in csv_paths)
+        selected = [get_csv_source(csv_path) for _, csv_path in csv_paths]
+    cache.save()
+    print(f"[i] {new_rows} new results rows")
+
+    # Every row is logged to both the CSVs and the database: the sums of the other mode are left out
+    summary, per_task = build_report(cache.select(selected))
+    summary.to_csv(report_path, index=False)
+    per_task.to_csv(tasks_path, index=False)
+    return summary, per_task
+
+
+if __name__ == "__main__":
+    report, _ = update_report(use_db="--db" in sys.argv[1:])
+    with pd.option_context("display.max_rows", None, "display.width", 200, "display.float_format", "{:.3f}".format):
+        print(report.dropna(subset=["delta"]))
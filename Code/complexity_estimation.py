@@ -0,0 +1,435 @@
+'''
+This file contains an engine that estimates the time complexity of a candidate solution empirically:
+    - Generates inputs of increasing size from the signature of the function under test
+    - Times the function on each size in an isolated sandbox process (warm-up + repetitions)
+    - Fits the measurements against standard complexity classes with NumPy least squares
+    - Compares the empirical class with the time complexity declared by the model
+'''
+
+import ast
+import json
+import random
+import numpy as np
+
+from sandbox import run_code
+from big_o import Complexity, parse_complexity
+
+# ----------------------------- Configuration -----------------------------
+
+# Input sizes tried, in increasing order (measurements stop at the first size that is too slow)
+DEFAULT_SIZES = [16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192]
+
+# Number of timed calls per size (the median is kept), after one warm-up call
+REPETITIONS = 5
+
+# A single call slower than this (seconds) stops the measurements; total wall-clock budget (seconds)
+MAX_CALL_TIME = 1.0
+TIME_BUDGET = 20
+
+# Minimum number of measured sizes required to fit a curve
+MIN_POINTS = 4
+
+# Runtimes growing less than this factor over the whole size range are classified as O(1)
+CONSTANT_RATIO = 2.0
+
+# A slower-growing class is preferred when its residual is at most this factor above the best one
+SIMPLICITY_TOLERANCE = 1.5
+
+# Minimum confidence of the fit for the declared complexity to be judged (agrees is None below)
+MIN_AGREEMENT_CONFIDENCE = 0.8
+
+# Parameter names that usually denote a size or a count
+SIZE_NAMES = {"n", "num", "number", "length", "size", "count", "k", "m", "limit", "steps", "rows", "cols"}
+LIST_NAMES = {"arr", "array", "nums", "numbers", "lst", "list", "data", "values", "items", "elements", "seq"}
+STR_NAMES = {"s", "text", "string", "word", "sentence", "password", "message"}
+VALUE_NAMES = {"target", "key", "x", "value", "val", "element", "item"}
+
+
+# Standard complexity classes: growth function of the input size n
+COMPLEXITY_CLASSES = {
+    "O(1)": lambda n: np.ones_like(n),
+    "O(log n)": lambda n: np.log2(n),
+    "O(n)": lambda n: n,
+    "O(n log n)": lambda n: n * np.log2(n),
+    "O(n^2)": lambda n: n ** 2,
+    "O(n^3)": lambda n: n ** 3,
+    "O(2^n)": lambda n: np.exp2(np.minimum(n, 1000))
+}
+
+# ----------------------------- Input Generation -----------------------------
+
+
+def find_function(tree, func_name=None):
+    """
+    Finds the function under test: `func_name` if given, otherwise `task_func`
+    (BigCodeBench convention), otherwise the first top-level function.
+
+    Args:
+        tree (ast.Module): Parsed candidate code.
+        func_name (str): Optional explicit function name.
+
+    Returns:
+        ast.FunctionDef | None: The function definition, or None if not found.
+    """
+    functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    if func_name is not None:
+        return next((node for node in functions if node.name == func_name), None)
+    return next((node for node in functions if node.name == "task_func"), functions[0] if functions else None)
+
+
+def get_kind(arg, default):
+    """
+    Infers the kind of value a parameter expects, from its annotation, default value or name.
+
+    Args:
+        arg (ast.arg): The parameter.
+        default (ast.expr | None): Its default value, if any.
+
+    Returns:
+        str | None: "int", "float", "list", "str", "dict", "set", or None if unknown.
+    """
+    kinds = {"int": "int", "float": "float", "list": "list", "List": "list", "tuple": "list",
+             "Sequence": "list", "str": "str", "dict": "dict", "Dict": "dict", "set": "set", "Set": "set"}
+
+    annotation = arg.annotation
+    if isinstance(annotation, ast.Subscript):
+        annotation = annotation.value
+    if isinstance(annotation, ast.Name) and annotation.id in kinds:
+        return kinds[annotation.id]
+
+    if default is not None:
+        try:
+            value = ast.literal_eval(default)
+            if not isinstance(value, bool):
+                return {int: "int", float: "float", list: "list", tuple: "list", str: "str",
+                        dict: "dict", set: "set"}.get(type(value))
+        except ValueError:
+            if isinstance(default, ast.Call) and isinstance(default.func, ast.Name) and default.func.id in kinds:
+                return kinds[default.func.id]
+            if isinstance(default, (ast.ListComp, ast.List)):
+                return "list"
+        return None
+
+    name = arg.arg.lower()
+    if name in SIZE_NAMES or name in VALUE_NAMES:
+        return "int"
+    if name in LIST_NAMES or name.endswith("s") and name[:-1] in LIST_NAMES | {"num", "value", "item"}:
+        return "list"
+    if name in STR_NAMES:
+        return "str"
+    return None
+
+
+def get_input_specs(funcdef):
+    """
+    Decides how each parameter is generated for an input size n:
+    containers and size-like integers grow with n ("scaled"), other integers are random
+    values in [0, n] ("value"), and parameters with an unknown kind keep their default.
+
+    Args:
+        funcdef (ast.FunctionDef): The function under test.
+
+    Returns:
+        list | None: [(parameter name, kind, role)], or None if inputs cannot be generated.
+    """
+    args = funcdef.args.posonlyargs + funcdef.args.args
+    defaults = [None] * (len(args) - len(funcdef.args.defaults)) + list(funcdef.args.defaults)
+
+    specs = []
+    for arg, default in zip(args, defaults):
+        kind = get_kind(arg, default)
+        if kind is None:
+            if default is None:
+                return None  # required parameter of unknown kind
+            continue  # keep the default value
+        specs.append([arg.arg, kind, None])
+
+    has_container = any(kind in ("list", "str", "dict", "set") for _, kind, _ in specs)
+    for spec in specs:
+        name, kind, _ = spec
+        if kind in ("int", "float") and has_container and name.lower() not in SIZE_NAMES:
+            spec[2] = "value"
+        else:
+            spec[2] = "scaled"
+
+    if not any(role == "scaled" for _, _, role in specs):
+        return None
+    return [tuple(spec) for spec in specs]
+
+
+def make_value(kind, role, n, rng):
+    """
+    Generates a value of the given kind for input size n.
+    """
+    if role == "value":
+        return rng.randint(0, n) if kind == "int" else rng.uniform(0, n)
+    if kind == "int":
+        return n
+    if kind == "float":
+        return float(n)
+    if kind == "list":
+        return [rng.randint(-n, n) for _ in range(n)]
+    if kind == "str":
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(n))
+    if kind == "dict":
+        return {str(i): rng.randint(-n, n) for i in range(n)}
+    return set(rng.sample(range(4 * n), n))
+
+
+def generate_inputs(specs, n) -> dict:
+    """
+    Generates the keyword arguments for input size n (seeded with n, so runs are reproducible).
+
+    Args:
+        specs (list): Input specs (see get_input_specs).
+        n (int): Input size.
+
+    Returns:
+        dict: Parameter name -> generated value.
+    """
+    rng = random.Random(n)
+    return {name: make_value(kind, role, n, rng) for name, kind, role in specs}
+
+
+def generate_calls(code: str, n: int, func_name=None):
+    """
+    Generates a call of size n for the function under test, from its signature.
+
+    Args:
+        code (str): Candidate code.
+        n (int): Input size.
+        func_name (str): Function under test (default: `task_func`, or the first function).
+
+    Returns:
+        tuple: (function name, [(args, kwargs)]), or (function name or None, []) if inputs cannot be generated.
+    """
+    try:
+        funcdef = find_function(ast.parse(code), func_name)
+    except SyntaxError:
+        return func_name, []
+    if funcdef is None:
+        return func_name, []
+    specs = get_input_specs(funcdef)
+    if specs is None:
+        return funcdef.name, []
+    return funcdef.name, [([], generate_inputs(specs, n))]
+
+
+# ----------------------------- Timing (sandboxed) -----------------------------
+
+TIMING_PROGRAM = """
+import os
+import sys
+import copy
+import json
+import time
+import signal
+import statistics
+
+SOURCE, FUNC_NAME, INPUTS = {source!r}, {func_name!r}, {inputs!r}
+REPETITIONS, MAX_CALL_TIME, TIME_BUDGET = {repetitions!r}, {max_call_time!r}, {time_budget!r}
+
+
+class CallTimeout(BaseException):
+    pass
+
+
+def on_alarm(signum, frame):
+    raise CallTimeout()
+
+
+# Only the report goes to the captured stdout: the candidate's prints could push it past the output limit
+report = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+namespace = {{"__name__": "candidate"}}
+exec(compile(SOURCE, "solution.py", "exec"), namespace)
+func = namespace.get(FUNC_NAME)
+if not callable(func):
+    print(json.dumps({{"error": f"Function {{FUNC_NAME}} not found", "measurements": []}}), file=report)
+    raise SystemExit(0)
+
+if hasattr(signal, "setitimer"):
+    signal.signal(signal.SIGALRM, on_alarm)
+
+measurements = []
+start = time.perf_counter()
+for n, kwargs in INPUTS:
+    calls = [copy.deepcopy(kwargs) for _ in range(REPETITIONS + 1)]  # the function may mutate its inputs
+    times = []
+    try:
+        for call_kwargs in calls:
+            if hasattr(signal, "setitimer"):
+                signal.setitimer(signal.ITIMER_REAL, MAX_CALL_TIME)
+            t0 = time.perf_counter()
+            func(**call_kwargs)
+            times.append(time.perf_counter() - t0)
+            if hasattr(signal, "setitimer"):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except CallTimeout:
+        break
+    except Exception as e:
+        print(json.dumps({{"error": f"{{type(e).__name__}}: {{e}}", "measurements": measurements}}), file=report)
+        raise SystemExit(0)
+    measurements.append([n, statistics.median(times[1:])])  # times[0] is the warm-up call
+    if max(times) > MAX_CALL_TIME or time.perf_counter() - start > TIME_BUDGET:
+        break
+
+print(json.dumps({{"error": None, "measurements": measurements}}), file=report)
+"""
+
+
+def measure_runtimes(code, func_name, specs, sizes=None):
+    """
+    Times the function under test on inputs of increasing size in a sandbox process.
+
+    Args:
+        code (str): Complete candidate code (imports + code).
+        func_name (str): Name of the function under test.
+        specs (list): Input specs (see get_input_specs).
+        sizes (list): Input sizes to try (default: DEFAULT_SIZES).
+
+    Returns:
+        tuple: (list of [size, median seconds], error message or None)
+    """
+    inputs = [[n, generate_inputs(specs, n)] for n in sizes or DEFAULT_SIZES]
+    program = TIMING_PROGRAM.format(source=code, func_name=func_name, inputs=inputs,
+                                    repetitions=REPETITIONS, max_call_time=MAX_CALL_TIME, time_budget=TIME_BUDGET)
+    outcome = run_code(program, timeout=TIME_BUDGET + 2 * MAX_CALL_TIME + 5)
+
+    lines = outcome["stdout"].strip().splitlines()
+    if outcome["returncode"] != 0 or not lines:
+        return [], (outcome["stderr"].strip().splitlines() or ["Timing run failed."])[-1]
+    try:
+        report = json.loads(lines[-1])
+        return report["measurements"], report["error"]
+    except (json.JSONDecodeError, KeyError):
+        return [], "Timing run produced no measurements."
+
+
+# ----------------------------- Curve Fitting -----------------------------
+
+
+def fit_complexity(sizes, times):
+    """
+    Fits t(n) = a * f(n) + b (a >= 0) for every growing complexity class with least squares.
+
+    Runtimes that stay within CONSTANT_RATIO over the whole size range are classified as O(1).
+    Otherwise the class with the lowest normalized residual wins, but a slower-growing class
+    is preferred when its residual is within SIMPLICITY_TOLERANCE of the best one.
+
+    Args:
+        sizes (list): Input sizes.
+        times (list): Measured median runtimes (seconds).
+
+    Returns:
+        tuple: (best class, confidence in [0, 1], dict of normalized residuals per class)
+
+        The confidence tells how clearly the classes outside the tolerance band are ruled out;
+        classes inside the band (e.g. O(n) and O(n log n) on short ranges) are not told apart.
+    """
+    n = np.asarray(sizes, dtype=float)
+    t = np.asarray(times, dtype=float)
+    scale = float(np.sum((t - t.mean()) ** 2)) or 1.0
+
+    residuals = {}
+    for name, growth in COMPLEXITY_CLASSES.items():
+        if name == "O(1)":
+            continue
+        f = growth(n)
+        design = np.column_stack([f / f.max(), np.ones_like(f)])
+        coefficients, _, _, _ = np.linalg.lstsq(design, t, rcond=None)
+        if coefficients[0] < 0:
+            continue  # decreasing runtime: this class does not describe the data
+        residuals[name] = float(np.sum((design @ coefficients - t) ** 2) / scale)
+
+    ratio = float(t.max() / t.min()) if t.min() > 0 else float("inf")
+    if ratio < CONSTANT_RATIO or not residuals:
+        confidence = 1.0 - (ratio - 1.0) / (CONSTANT_RATIO - 1.0) if ratio < CONSTANT_RATIO else 0.0
+        return "O(1)", round(confidence, 3), residuals
+
+    band = min(residuals.values()) * SIMPLICITY_TOLERANCE + 1e-9
+    best = next(name for name in residuals if residuals[name] <= band)
+
+    ruled_out = [value for value in residuals.values() if value > band]
+    confidence = 1.0 - residuals[best] / min(ruled_out) if ruled_out else 0.0
+    return best, round(max(0.0, confidence), 3), residuals
+
+
+# ----------------------------- Estimation -----------------------------
+
+
+def parse_declared_complexity(declared: str):
+    """
+    Parses a declared time complexity in terms of the input size n: a single variable is renamed n,
+    so that O(k) or O(len(nums)) compare with the empirical classes.
+
+    Returns:
+        Complexity | None: The complexity, or None if it cannot be parsed.
+    """
+    try:
+        complexity = parse_complexity(declared)
+    except ValueError:
+        return None
+    variables = {var for _, growths in complexity.terms for var, _ in growths}
+    if len(variables) != 1 or "^" in next(iter(variables)):  # several sizes, or a symbolic power (n^k)
+        return complexity
+    return Complexity([(1, tuple(("n", growth) for _, growth in growths)) for _, growths in complexity.terms])
+
+
+def estimate_time_complexity(code: str, func_name=None, declared=None, sizes=None):
+    """
+    Estimates the time complexity of a candidate from runtimes measured on inputs of increasing size.
+
+    Args:
+        code (str): Complete candidate code (imports + code).
+        func_name (str): Function under test (default: `task_func`, or the first function).
+        declared (str): Time complexity declared by the model, e.g. "O(n log n)" (optional).
+        sizes (list): Input sizes to try (default: DEFAULT_SIZES).
+
+    Returns:
+        dict: empirical_class, confidence, declared, agrees (None if nothing was declared, or if the
+        fit is below MIN_AGREEMENT_CONFIDENCE), measurements, residuals and error (None on success).
+    """
+    result = {"empirical_class": None, "confidence": 0.0, "declared": declared, "agrees": None,
+              "measurements": [], "residuals": {}, "error": None}
+
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        result["error"] = f"Syntax error: {e}"
+        return result
+
+    funcdef = find_function(tree, func_name)
+    if funcdef is None:
+        result["error"] = "No function definition found"
+        return result
+
+    specs = get_input_specs(funcdef)
+    if specs is None:
+        result["error"] = f"Cannot generate scalable inputs for {funcdef.name}"
+        return result
+
+    sizes = sizes or DEFAULT_SIZES
+    measurements, error = measure_runtimes(code, funcdef.name, specs, sizes)
+
+    if error is None and 0 < len(measurements) < MIN_POINTS and len(measurements) < len(sizes):
+        # Steep growth (e.g. exponential): retry with a finer progression below the first slow size
+        limit = sizes[len(measurements)]
+        finer = sorted({int(size) for size in np.linspace(2, limit, 2 * MIN_POINTS)})
+        measurements, error = measure_runtimes(code, funcdef.name, specs, finer)
+
+    result["measurements"] = measurements
+    if len(measurements) < MIN_POINTS:
+        result["error"] = error or f"Only {len(measurements)} input sizes could be measured"
+        return result
+
+    sizes_measured, times = zip(*measurements)
+    empirical, confidence, residuals = fit_complexity(sizes_measured, times)
+    result.update(empirical_class=empirical, confidence=confidence, residuals=residuals)
+
+    declared_complexity = parse_declared_complexity(declared) if declared else None
+    if declared and confidence >= MIN_AGREEMENT_CONFIDENCE:
+        result["agrees"] = declared_complexity is not None and declared_complexity == parse_complexity(empirical)
+
+    return result
@@ -7,18 +7,18 @@ import sys
 
 # === MODULE IMPORTS ===
 # Core utility and evaluation functions for code analysis and benchmarking
-from Code.utility_function import analyze_code_sonarqube
+from Code.utility_function import analyze_code_metrics
 from evaluation_bigcodebench import instruct_prompt_list, canonical_solution_list, test_list, libs_list
 from metrics import extract_time_complexity, get_cognitive_complexity
 
 # Debate strategy definitions and multi-agent configurations
 from Debate_strategies import AGENTS_NO, after_evaluation_debate, developers_debate, developers_debate_mixed_strategy, \
-    MAXROUNDS_NO
+    MAXROUNDS_NO, debate_rounds
 from LLM_definition import get_clone_agent
 
 # Helpers for formatting, execution, saving results, and documentation extraction
 from utility_function import get_formatted_code_solution, save_and_test_code, evaluate_code_with_tests, \
-    save_task_data_to_csv, extract_documentation
+    save_task_data_to_csv, extract_documentation, get_bigcodebench_test_code, format_metrics_text
 
 # Evaluation logic: scoring, feedback extraction, and result explanation
 from evaluator import eval_code, get_evaluator, extract_criteria_scores, calculate_score_code, extract_explanation
@@ -123,6 +123,15 @@ else:
 
 print(f"User prompt: {user_prompt}\n")
 
+# BigCodeBench unit tests, also used by the agents for execution-guided consensus (if EXECUTION_GUIDED_CONSENSUS)
+libs = []
+test_code = None
+if user_prompt_mode == 1:
+    import ast
+
+    libs = ast.literal_eval(libs_list[frame_no])  # From string to list
+    test_code = get_bigcodebench_test_code(libs, test_list[frame_no])
+
 # Initialize the list of agents using the selected model
 types_model = ['qwen2.5-coder-3b-instruct'] * AGENTS_NO # You can switch to a different model, e.g., 'codellama-13b-instruct', 'codellama-7b-instruct', 'deepseek-coder-v2-lite-instruct', 'qwen2.5-coder-3b-instruct'
 
@@ -139,12 +148,13 @@ debate_response = ""
 start = time.time() # calcolare il tempo di esecuzione del task
 
 # Simulate a multi-agent debate round with the user prompt and the few-shot examples
+debate_rounds.clear()  # rounds of this task, logged with its results
 if strategy_debate == "0":
-    debate_response = str(developers_debate(agents, user_prompt, role_programmer_prompt, strategy_debate))
+    debate_response = str(developers_debate(agents, user_prompt, role_programmer_prompt, strategy_debate, test_code=test_code))
 elif strategy_debate == '1':
-    debate_response = str(developers_debate(agents, user_prompt, role_programmer_prompt, strategy_debate))
+    debate_response = str(developers_debate(agents, user_prompt, role_programmer_prompt, strategy_debate, test_code=test_code))
 elif strategy_debate == '2':
-    debate_response = str(developers_debate_mixed_strategy(agents, user_prompt, role_programmer_prompt))
+    debate_response = str(developers_debate_mixed_strategy(agents, user_prompt, role_programmer_prompt, test_code=test_code))
 else:
     # input error
     print("INPUT ERROR: INSERT ONLY 0, 1, 2")
@@ -180,7 +190,7 @@ else:
 
         # If the score is below the acceptable threshold (e.g., 85), trigger another debate round
         if final_score < 85:
-            debate_response = str(after_evaluation_debate(user_prompt, evaluation_feedback, ai_response, agents, strategy_debate))
+            debate_response = str(after_evaluation_debate(user_prompt, evaluation_feedback, ai_response, agents, strategy_debate, test_code))
         else:
             print("================OUTPUT LLM MULTI-AGENT SYSTEM================\n" + ai_response)  # print the accepted final response
             if user_prompt_mode == 1:
@@ -206,15 +216,7 @@ else:
     if user_prompt_mode == 1:
 
         print("\n--- Running BigCodeBenchmark unit tests on output code ---")
-        imports_str = ""
-        import ast
-
-        libs = ast.literal_eval(libs_list[frame_no])  # From string to list
-        for value in libs:
-            imports_str += "import " + value + "\n"
-
-        test_code = imports_str + test_list[frame_no]
-        test_results = evaluate_code_with_tests(ai_response, test_code)
+        test_results = evaluate_code_with_tests(ai_response, test_code, libs=libs)
         print("All tests passed!" if test_results["passed"] else "Some tests failed.")
 
     # === METRICS COLLECTION ===
@@ -222,18 +224,17 @@ else:
     time_complexity = extract_time_complexity(debate_response)
     docs = extract_documentation(debate_response)
 
-    # === SONARQUBE STATIC ANALYSIS ===
-    project_key, all_metrics = analyze_code_sonarqube(ai_response)
-    metrics_sq_str = ""
-    print("#======= SonarQube metrics ==========")
+    # === STATIC ANALYSIS (in-process metric engine, or SonarQube if USE_SONARQUBE) ===
+    all_metrics = analyze_code_metrics(ai_response)
+    metrics_sq_str = format_metrics_text(all_metrics)  # tagged with the analyzer that computed the measures
+    print("#======= Static analysis metrics ==========")
     for metric, value in all_metrics.items():
         print(f"{metric}: {value}")
-        metrics_sq_str += f"{metric}: {value}\n"
 
     real_correctness = (100 * test_results["tests_passed"]) / test_results["tests_run"]
     print(f"Real correctness: {real_correctness}")
 
     # === LOG RESULTS TO CSV ===
     if user_prompt_mode == 1:
-        save_task_data_to_csv("multi-agent_csv_results.csv", frame_no, instruct_prompt_list[frame_no], canonical_solution_list[frame_no], ai_response, docs, cognitive_complexity, time_complexity, evaluation, metrics_sq_str, AGENTS_NO, f"programmers: {types_model[0]}; evaluator: {type_evaluator_model}", MAXROUNDS_NO, elapsed_multi, strategy_debate, test_results["tests_passed"], test_results["tests_failed"])
+        save_task_data_to_csv("multi-agent_csv_results.csv", frame_no, instruct_prompt_list[frame_no], canonical_solution_list[frame_no], ai_response, docs, cognitive_complexity, time_complexity, evaluation, metrics_sq_str, AGENTS_NO, f"programmers: {types_model[0]}; evaluator: {type_evaluator_model}", MAXROUNDS_NO, elapsed_multi, strategy_debate, test_results["tests_passed"], test_results["tests_failed"], rounds=list(debate_rounds))
         print("Results saved to multi-agent_csv_results.csv.")
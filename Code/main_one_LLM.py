@@ -43,7 +43,7 @@ from response_JSON_schema import schema_complexity
 
 from LLM_definition import get_clone_agent
 from utility_function import get_formatted_code_solution, save_and_test_code, evaluate_code_with_tests, \
-    extract_documentation, save_task_data_to_csv, analyze_code_sonarqube
+    extract_documentation, save_task_data_to_csv, analyze_code_metrics, format_metrics_text
 from evaluator import eval_code, get_evaluator, extract_criteria_scores, calculate_score_code, extract_explanation
 
 import time
@@ -290,7 +290,7 @@ else:
         test_code = imports_str + test_list[frame_no]
 
         # Valutazione
-        test_results = evaluate_code_with_tests(ai_response, test_code)
+        test_results = evaluate_code_with_tests(ai_response, test_code, libs=libs)
         print("All tests passed!" if test_results["passed"] else "Some tests failed.")
 
     # === STATIC ANALYSIS AND METRICS ===
@@ -299,15 +299,14 @@ else:
     docs = extract_documentation(response)
 
 
-    # Collect SonarQube metrics (e.g., maintainability, security issues, duplication, etc.)
+    # Collect static analysis metrics (e.g., maintainability, duplication, complexity; SonarQube if USE_SONARQUBE)
     metrics_sq_str = ""
 
-    project_key, all_metrics = analyze_code_sonarqube(ai_response)
-    metrics_sq_str = ""
-    print("#==== SonarQube metrics =====")
+    all_metrics = analyze_code_metrics(ai_response)
+    metrics_sq_str = format_metrics_text(all_metrics)  # tagged with the analyzer that computed the measures
+    print("#==== Static analysis metrics =====")
     for metric, value in all_metrics.items():
         print(f"{metric}: {value}")
-        metrics_sq_str += f"{metric} : {value}\n"
 
 
     real_correctness = (100*test_results["tests_passed"]) / test_results["tests_run"]
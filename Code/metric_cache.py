@@ -0,0 +1,78 @@
+"""
+    Bounded in-memory cache of the metrics computed on debate candidates.
+
+    In every debate round the metrics of all the candidates are computed again, even for
+    responses that did not change (the winner's code, answers left unchanged by a refinement).
+    Entries are keyed by a hash of the candidate's code and of whatever else the metric
+    depends on, and the least recently used ones are evicted once the cache is full.
+"""
+
+from collections import OrderedDict
+
+from result_cache import make_key
+
+# Maximum number of entries kept in memory
+METRIC_CACHE_SIZE = 1024
+
+
+class MetricCache:
+    """
+    A least-recently-used cache of metric values (cognitive complexity, declared time complexity,
+    formatted solution blocks, benchmarks, test outcomes).
+    """
+
+    def __init__(self, maxsize=METRIC_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(metric: str, *parts) -> str:
+        """
+        Builds the key of a metric from the candidate's code and the other inputs of the metric.
+        """
+        return make_key(metric, *parts)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for `key` (marking it as recently used), or `default` on a miss.
+        """
+        if key not in self.entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        """
+        Stores `value` under `key`, evicting the least recently used entry if the cache is full.
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for `key`, calling `compute()` and storing its result on a miss.
+        """
+        if key in self.entries:
+            return self.get(key)
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Cache shared by the debate loops and the prompt formatting
+metric_cache = MetricCache()
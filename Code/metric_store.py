@@ -0,0 +1,94 @@
+"""
+    Persistent on-disk store of static-analysis metrics (SonarQube measures, in-process metrics,
+    cognitive complexity, rule findings).
+
+    The same code is analyzed again across runs, debate strategies and the single-LLM baseline.
+    Entries are keyed by the analyzer, its version and a hash of the code, so only code that was
+    never analyzed by the current version of an analyzer reaches it. Formatting-insensitive analyzers
+    use the normalized code (see result_cache.normalize_code); the others, whose metrics depend on
+    comments and layout (lines of code, comment density), use the code with normalized line endings.
+"""
+
+from result_cache import ResultCache, CACHE_DIR, make_key, normalize_code
+
+# Namespace of the store inside the result cache folder
+METRIC_STORE_NAMESPACE = "static_analysis"
+
+
+def normalize_layout(code: str) -> str:
+    """
+    Normalizes line endings and trailing whitespace only, keeping comments and layout.
+    """
+    lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+    return "\n".join(lines).strip("\n")
+
+
+class MetricStore:
+    """
+    A persistent store of analysis results, shared by concurrent runs (see result_cache.ResultCache).
+    Failed analyses (None or empty results) are not stored, so they are retried.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.cache = ResultCache(METRIC_STORE_NAMESPACE, directory)
+
+    @staticmethod
+    def make_key(analyzer: str, version, code: str, normalize=True) -> str:
+        """
+        Builds the key of the analysis of `code` by the given version of an analyzer.
+
+        Args:
+            analyzer (str): Name of the analyzer (e.g. "sonarqube", "static_metrics").
+            version: Version of the analyzer (anything JSON-serializable); bump it when its results change.
+            code (str): Analyzed code.
+            normalize (bool): Ignore comments and formatting (for formatting-insensitive analyzers).
+        """
+        return make_key(analyzer, version, normalize_code(code) if normalize else normalize_layout(code))
+
+    def get(self, key: str):
+        return self.cache.get(key)
+
+    def put(self, key: str, value):
+        if value:
+            self.cache.put(key, value)
+
+    def get_or_compute(self, analyzer: str, version, code: str, compute, normalize=True):
+        """
+        Returns the stored analysis of `code`, calling `compute(code)` and storing its result on a miss.
+        """
+        key = self.make_key(analyzer, version, code, normalize)
+        value = self.get(key)
+        if value is None:
+            value = compute(code)
+            self.put(key, value)
+        return value
+
+    def get_or_compute_batch(self, analyzer: str, version, codes: list, compute_batch, normalize=True) -> list:
+        """
+        Returns the stored analysis of each code; the codes never analyzed are passed
+        to `compute_batch(codes)` in a single call (e.g. one scanner run) and stored.
+
+        Returns:
+            list: One result per code, in the same order as `codes`.
+        """
+        keys = [self.make_key(analyzer, version, code, normalize) for code in codes]
+        results = [self.get(key) for key in keys]
+
+        # Identical codes of the batch are analyzed once
+        pending = {}
+        for key, code, result in zip(keys, codes, results):
+            if result is None:
+                pending.setdefault(key, code)
+        if pending:
+            computed = dict(zip(pending, compute_batch(list(pending.values()))))
+            for key, value in computed.items():
+                self.put(key, value)
+            results = [computed[key] if result is None else result for key, result in zip(keys, results)]
+        return results
+
+    def clear(self):
+        self.cache.clear()
+
+
+# Store shared by the analyzers
+metric_store = MetricStore()
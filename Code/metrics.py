@@ -6,7 +6,9 @@ This file contains functions to calculate the following metrics about Python cod
 
 from tabulate import tabulate  # Used for nicely formatted table output
 import json
-import timeit
+
+from timing_harness import time_function
+from complexity_estimation import find_function
 
 # ----------------------------- Input Extraction -----------------------------
 
@@ -50,23 +52,24 @@ def extract_time_complexity(response_json):
     return time_compl.lower()
 
 
-def calculate_time_complexity(code_response_json: str, n_values: list):
+def calculate_time_complexity(code_response_json: str, n_values: list, func_name=None):
     """
-    Dynamically executes a provided function and calculates its average execution time
-    over a set of input values using the timeit module.
+    Measures the execution time of the function under test over a set of input values,
+    using the sandboxed timing harness (separate process, auto-ranged iterations,
+    repeated measurements).
 
     Args:
-        code_response_json (str): A dictionary-like string containing 'imports' and 'code' keys.
+        code_response_json (dict): A dictionary containing 'imports' and 'code' keys.
         n_values (list): A list of input argument tuples to test the function against.
+        func_name (str): Name of the function under test (default: `task_func`, or the first top-level function).
 
     Returns:
-        float: The average execution time across all input sets.
+        float: The average, across all input sets, of the median execution time per call
+        (-1 if the function could not be timed).
     """
 
-    # Check for keys and extract the relevant code and imports
-    if "imports" and "code" in code_response_json:
-        imports = code_response_json["imports"]
-        code = code_response_json["code"]
+    imports = code_response_json.get("imports", "")
+    code = code_response_json["code"]
 
     # Replace escaped newline characters with actual newlines
     code = code.replace("\\n", "\n")
@@ -74,38 +77,134 @@ def calculate_time_complexity(code_response_json: str, n_values: list):
     # Combine the imports and code into one executable string
     str_code = imports + "\n\n" + code
 
-    # Execute the code to define the function and prepare it for testing
-    local_ns = {}
-    exec(str_code, globals(), local_ns)
-
-    # Automatically detect the function name (assuming there's only one)
-    func_name = [name for name in local_ns if callable(local_ns[name])][0]
-    func = local_ns[func_name]
-
-    total_times = 0  # Accumulator for total execution time
-
-    # Measure the execution time of the function for each input
-    for args in n_values:
-        timed_call = lambda: func(*args)
-        time = timeit.timeit(timed_call, setup=imports, number=100)
-        total_times += time
-        print(f'Execution time for {func_name}{args} run 100 times: {time:.6f} s')
+    if func_name is None:
+        try:
+            funcdef = find_function(ast.parse(str_code))
+        except SyntaxError as e:
+            print(f"[!] Timing failed: {e}")
+            return -1
+        if funcdef is None:
+            print("[!] Timing failed: no function to time")
+            return -1
+        func_name = funcdef.name
+
+    report = time_function(str_code, [(args, {}) for args in n_values], func_name=func_name)
+    if report["error"]:
+        print(f"[!] Timing failed: {report['error']}")
+        return -1
+
+    medians = []
+    for args, result in zip(n_values, report["results"]):
+        if result["error"]:
+            print(f"[!] {func_name}{tuple(args)} raised {result['error']}")
+            continue
+        medians.append(result["median"])
+        print(f"Execution time for {func_name}{tuple(args)}: median {result['median']:.3e} s "
+              f"(95% CI {result['ci_low']:.3e} - {result['ci_high']:.3e} s, "
+              f"{result['repeat']} x {result['number']} runs)")
+
+    if not medians:
+        return -1
 
     # Compute the average time per input case
-    average_time = total_times / len(n_values)
-    print(f'\n\nAverage time across {len(n_values)} input values: {average_time :.6f} s')
+    average_time = sum(medians) / len(medians)
+    print(f'\n\nAverage time across {len(medians)} input values: {average_time :.6f} s')
 
     return average_time
 
 
 # ----------------------------- Readability (Cognitive Complexity) -----------------------------
 
+import os
 import ast
-import astunparse
+import atexit
+import textwrap
+import multiprocessing
+from functools import lru_cache
 from inspect import getsource
-from cognitive_complexity.api import get_cognitive_complexity_for_node
+from concurrent.futures import ProcessPoolExecutor
 from cognitive_complexity.utils.ast import is_decorator
 
+from metric_store import metric_store
+
+# Nodes that break the linear flow of the code: +1 for the structure, plus its nesting level
+CONTROL_FLOW_BREAKERS = (ast.If, ast.For, ast.While, ast.IfExp, ast.ExceptHandler)
+
+# Nodes that only increase the nesting level of their body
+NESTING_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+
+
+class NodeSource:
+    """
+    Source code of an analyzed node, identified by its line range.
+    The text is extracted only when it is displayed (e.g. by tabulate).
+    """
+
+    def __init__(self, source_lines, start, end):
+        self.source_lines = source_lines
+        self.start = start  # first line (1-based)
+        self.end = end  # last line (inclusive)
+
+    def __str__(self):
+        return textwrap.dedent("".join(self.source_lines[self.start - 1:self.end])).rstrip()
+
+    def __repr__(self):
+        return repr(str(self))
+
+
+def is_recursive_call(node, func_name):
+    """
+    Checks whether a node is a call to `func_name` (plain call or method call).
+    """
+    if not isinstance(node, ast.Call):
+        return False
+    if isinstance(node.func, ast.Name):
+        return node.func.id == func_name
+    return isinstance(node.func, ast.Attribute) and node.func.attr == func_name
+
+
+def walk_cognitive_complexity(node, func_name, increment_by=0):
+    """
+    Computes the cognitive complexity of a node and detects recursive calls in a single traversal,
+    following the rules of the cognitive_complexity library.
+
+    Args:
+        node (ast.AST): The node to analyze.
+        func_name (str): Name of the analyzed function (for recursion detection).
+        increment_by (int): Current nesting level.
+
+    Returns:
+        tuple:
+            - int: Cognitive complexity of the node and its children.
+            - bool: True if the node contains a call to `func_name`.
+    """
+    if isinstance(node, ast.BoolOp):
+        # Every sequence of boolean operators (nested ones included) counts 1; operands are not visited
+        inner_nodes = list(ast.walk(node))
+        return (sum(isinstance(inner, ast.BoolOp) for inner in inner_nodes),
+                any(is_recursive_call(inner, func_name) for inner in inner_nodes))
+
+    complexity = 0
+    if isinstance(node, CONTROL_FLOW_BREAKERS):
+        increment = 0
+        if isinstance(node, ast.If) and len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If):
+            pass  # elif: counted on the nested ast.If, without a further nesting level
+        else:
+            if isinstance(node, (ast.If, ast.For, ast.While)) and node.orelse:
+                increment = 1  # +1 for the else
+            increment_by += 1
+        complexity = max(1, increment_by) + increment
+    elif isinstance(node, NESTING_NODES):
+        increment_by += 1
+
+    recursive = is_recursive_call(node, func_name)
+    for child in ast.iter_child_nodes(node):
+        child_complexity, child_recursive = walk_cognitive_complexity(child, func_name, increment_by)
+        complexity += child_complexity
+        recursive = recursive or child_recursive
+    return complexity, recursive
+
+
 def get_cognitive_complexity(func):
     """
     Calculates the cognitive complexity of a Python function, including per-node breakdown.
@@ -116,7 +215,7 @@ def get_cognitive_complexity(func):
     Returns:
         tuple:
             - int: Total cognitive complexity score of the function.
-            - list: Per-node complexity breakdown as [complexity, code snippet].
+            - list: Per-node complexity breakdown as [complexity, node source (NodeSource, lines of the node)].
 
         Returns (-1, [[-1, <error message>]]) in case of parsing or syntax errors.
     """
@@ -134,30 +233,185 @@ def get_cognitive_complexity(func):
     if funcdef is None:
         return -1, [[-1, "No function definition found"]]
 
-    # Skip decorators if present
-    if is_decorator(funcdef):
-        return get_cognitive_complexity(funcdef.body[0])
+    # Skip decorators if present: analyze the wrapped function
+    while is_decorator(funcdef):
+        funcdef = funcdef.body[0]
 
-    details = []  # List to hold per-node complexity
-    complexity = 0  # Total cognitive complexity
+    source_lines = func.splitlines(True)
+    complexity, node_complexities = get_function_cognitive_complexity(funcdef)
 
-    # Analyze each top-level node in the function body
-    for node in funcdef.body:
-        node_complexity = get_cognitive_complexity_for_node(node)
-        complexity += node_complexity
+    # Per-node complexity, with the source of each node
+    details = [[node_complexity, NodeSource(source_lines, node.lineno, node.end_lineno)]
+               for node_complexity, node in node_complexities]
+
+    # Add a final row for the total complexity
+    details.append([complexity, "Total"])
+    return complexity, details
+
+
+def get_function_cognitive_complexity(funcdef):
+    """
+    Scores a function node: the complexity of each top-level statement of its body,
+    plus one for every statement containing a recursive call.
+
+    Args:
+        funcdef (ast.FunctionDef | ast.AsyncFunctionDef): The function to analyze.
+
+    Returns:
+        tuple:
+            - int: Total cognitive complexity of the function (nested helpers included).
+            - list: (complexity, node) for each top-level statement of the body.
+    """
+    complexity = 0
+    node_complexities = []
 
-        node_code = astunparse.unparse(node)
+    for node in funcdef.body:
+        node_complexity, recursive = walk_cognitive_complexity(node, funcdef.name)
 
         # Slightly increase complexity if a recursive call is detected
-        if f"{funcdef.name}(" in node_code:
+        if recursive:
             node_complexity += 1
-            complexity += 1
 
-        details.append([node_complexity, node_code])
+        complexity += node_complexity
+        node_complexities.append((node_complexity, node))
 
-    # Add a final row for the total complexity
-    details.append([complexity, "Total"])
-    return complexity, details
+    return complexity, node_complexities
+
+
+# ----------------------------- Module-wide Readability -----------------------------
+
+# Batches smaller than this are analyzed in the calling process (a pool round trip costs more)
+PARALLEL_BATCH_MIN = 8
+
+# Bump when the results of get_module_cognitive_complexity change (invalidates the metric store)
+COGNITIVE_COMPLEXITY_VERSION = 1
+
+
+def get_module_cognitive_complexity(code: str) -> dict:
+    """
+    Scores every function, method and async function of a module in one parse.
+
+    Nested helpers are reported on their own and attributed to the enclosing function
+    (whose score includes them, as in get_cognitive_complexity). Statements outside
+    any function (module level and class bodies) are scored as module-level code.
+
+    Args:
+        code (str): Source code of the module.
+
+    Returns:
+        dict:
+            - total (int): Module-level code plus every function that is not nested in another one
+              (-1 on syntax errors or when there is no function).
+            - max (int): Highest score of a single function.
+            - module (int): Complexity of the module-level code.
+            - functions (list): One dict per function: name (qualified), kind (function, async function, method),
+              parent (qualified name of the enclosing function or None), lineno, end_lineno, complexity.
+            - error (str | None): Error message.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError) as e:
+        return {"total": -1, "max": -1, "module": 0, "functions": [], "error": f"Syntax error: {e}"}
+
+    functions = []
+
+    def collect(node, scope, parent):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = ".".join(scope + [child.name])
+                if isinstance(node, ast.ClassDef):
+                    kind = "method"
+                else:
+                    kind = "async function" if isinstance(child, ast.AsyncFunctionDef) else "function"
+                functions.append({
+                    "name": name,
+                    "kind": kind,
+                    "parent": parent,
+                    "lineno": child.lineno,
+                    "end_lineno": child.end_lineno,
+                    "complexity": get_function_cognitive_complexity(child)[0]
+                })
+                collect(child, scope + [child.name], name)
+            elif isinstance(child, ast.ClassDef):
+                collect(child, scope + [child.name], parent)
+            else:
+                collect(child, scope, parent)
+
+    collect(tree, [], None)
+
+    # Module-level code: statements outside functions, class bodies included
+    module_complexity = 0
+    statements = list(tree.body)
+    while statements:
+        node = statements.pop()
+        if isinstance(node, ast.ClassDef):
+            statements.extend(node.body)
+        elif not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            module_complexity += walk_cognitive_complexity(node, None)[0]
+
+    if not functions:
+        return {"total": -1, "max": -1, "module": module_complexity, "functions": [],
+                "error": "No function definition found"}
+
+    total = module_complexity + sum(f["complexity"] for f in functions if f["parent"] is None)
+    return {
+        "total": total,
+        "max": max(f["complexity"] for f in functions),
+        "module": module_complexity,
+        "functions": functions,
+        "error": None
+    }
+
+
+def get_module_cognitive_complexity_details(result: dict) -> list:
+    """
+    Builds the breakdown of a module-wide analysis as [complexity, description] rows (for tabulate).
+    """
+    if result["error"]:
+        return [[-1, result["error"]]]
+    details = [[f["complexity"], f"{f['kind']} {f['name']} (lines {f['lineno']}-{f['end_lineno']})"]
+               for f in result["functions"]]
+    details.append([result["module"], "Module-level code"])
+    details.append([result["total"], "Total"])
+    return details
+
+
+@lru_cache(maxsize=None)
+def get_analysis_pool(max_workers=None):
+    """
+    Returns the process pool used for batch analysis, created on first use and reused afterwards.
+    The workers are forked, so the calling script is not imported again.
+    """
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("fork"))
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+
+def get_module_cognitive_complexity_batch(codes: list, max_workers=None) -> list:
+    """
+    Scores a batch of candidates (see get_module_cognitive_complexity) across a process pool.
+    Code already analyzed (in this or a previous run) is read from the metric store instead.
+    Small batches, single-core machines and platforms without fork are analyzed in the calling process.
+
+    Args:
+        codes (list): Source code of each candidate.
+        max_workers (int | None): Number of worker processes (default: CPU count).
+
+    Returns:
+        list: One result per candidate, in the same order as `codes`.
+    """
+    def analyze(pending):
+        workers = max_workers or os.cpu_count() or 1
+        if len(pending) < PARALLEL_BATCH_MIN or workers < 2 or "fork" not in multiprocessing.get_all_start_methods():
+            return [get_module_cognitive_complexity(code) for code in pending]
+
+        pool = get_analysis_pool(max_workers)
+        chunksize = max(1, len(pending) // (4 * workers))
+        return list(pool.map(get_module_cognitive_complexity, pending, chunksize=chunksize))
+
+    # The results hold line numbers: the layout of the code is part of the key
+    return metric_store.get_or_compute_batch("cognitive_complexity", COGNITIVE_COMPLEXITY_VERSION, codes, analyze,
+                                             normalize=False)
 
 
 # ----------------------------- Print Readability Results -----------------------------
@@ -0,0 +1,130 @@
+"""
+    Persistent on-disk cache for the outcomes of code execution (tests, compile-and-run checks).
+
+    The same final code is often tested again across evaluation rounds, experiment reruns
+    and debate strategies that converge on the same solution. Entries are keyed by a hash
+    of the normalized submission, the test code, the required libraries and the versions
+    of the interpreter and of those libraries, so a hit can skip the sandbox entirely.
+"""
+
+import os
+import ast
+import sys
+import json
+import hashlib
+import platform
+import tempfile
+from functools import lru_cache
+from importlib import metadata
+
+# Folder holding the cache entries (one JSON file per key)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# Bump when the format of the cached results changes
+CACHE_VERSION = 1
+
+
+def normalize_code(code: str) -> str:
+    """
+    Normalizes source code so that formatting-only differences (comments, blank lines,
+    spacing, quote style) map to the same cache key.
+
+    Args:
+        code (str): Python source code.
+
+    Returns:
+        str: The canonical source (or the whitespace-normalized text if it does not parse).
+    """
+    try:
+        return ast.unparse(ast.parse(code))
+    except (SyntaxError, ValueError):
+        lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+        return "\n".join(lines).strip()
+
+
+@lru_cache(maxsize=None)
+def get_library_version(name: str) -> str:
+    """
+    Returns the installed version of a library given its import name ("-" if unknown,
+    e.g. for modules of the standard library).
+    """
+    top_level = name.split(".")[0]
+    distributions = metadata.packages_distributions().get(top_level, [top_level])
+    for distribution in distributions:
+        try:
+            return metadata.version(distribution)
+        except metadata.PackageNotFoundError:
+            continue
+    return "-"
+
+
+def get_environment_fingerprint(libs=()) -> str:
+    """
+    Describes the execution environment: interpreter, platform and library versions.
+
+    Args:
+        libs (iterable): Import names of the libraries used by the code.
+
+    Returns:
+        str: A stable textual fingerprint.
+    """
+    versions = [f"{lib}=={get_library_version(lib)}" for lib in sorted(set(libs))]
+    return ";".join([sys.version, platform.platform(terse=True)] + versions)
+
+
+def make_key(*parts) -> str:
+    """
+    Builds a cache key by hashing the given parts (strings, numbers, lists, dicts).
+    """
+    digest = hashlib.sha256()
+    digest.update(str(CACHE_VERSION).encode())
+    for part in parts:
+        digest.update(b"\0")
+        digest.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    A persistent key-value store of JSON-serializable results, split in namespaces
+    (e.g. "tests", "compile_run"). Writes are atomic, so concurrent runs can share it.
+    """
+
+    def __init__(self, namespace: str, directory=CACHE_DIR):
+        self.directory = os.path.join(directory, namespace)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def get(self, key: str):
+        """
+        Returns the cached value for `key`, or None on a miss.
+        """
+        try:
+            with open(self.get_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, value):
+        """
+        Stores `value` under `key`, replacing any previous entry.
+        """
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def clear(self):
+        """
+        Removes every entry of the namespace.
+        """
+        import shutil
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,402 @@
+'''
+This file contains a SQLite results database that several experiment processes can write at once:
+    - WAL journal, so readers never block the writer and concurrent writers wait for each other
+      (busy timeout) instead of corrupting the file
+    - Schema for runs, tasks, debate rounds, candidates of each round and metrics (one row per value)
+    - Indexes on task, debate strategy and model, for cross-run queries
+    - Batched inserts, one transaction per batch
+    - Export to the CSV layout of save_task_data_to_csv, and import of existing CSVs
+    - Large texts (prompt, canonical solution, code, documentation, evaluator feedback) are kept
+      once in the blob store (see blob_store); the tables hold their digests
+'''
+
+import os
+import csv
+import json
+import uuid
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from blob_store import get_blob_store, ThreadConnections
+from results_store import METRIC_LINE_PATTERN, ANALYZER_KEY, SONARQUBE_ANALYZER, IN_PROCESS_ANALYZER, \
+    get_metrics_analyzer, parse_evaluation, parse_cognitive_complexity
+
+# ----------------------------- Configuration -----------------------------
+
+# Database shared by the multi-agent and single-LLM runs
+RESULTS_DB_PATH = "results.sqlite"
+
+# Seconds a writer waits for the lock held by another process
+BUSY_TIMEOUT = 60
+
+# Rows inserted per transaction when importing a CSV
+IMPORT_BATCH_SIZE = 500
+
+# Columns of the results CSV, in order
+RESULTS_CSV_FIELDS = [
+    'task_id',
+    'instruct_prompt',
+    'canonical_solution',
+    'code_multiagent_system',
+    'documentation',
+    'cognitive_complexity',
+    'time_complexity',
+    'evaluation_feedback',
+    'number_agents',
+    'metrics_sonarqube',
+    'type_models',
+    'max_rounds',
+    'time',
+    'debate_strategy',
+    'tests_success',
+    'test_fails'
+]
+
+# Fields of the results rows stored in the blob store (the tasks table holds their digests)
+TEXT_FIELDS = {
+    'instruct_prompt': 'instruct_prompt',
+    'canonical_solution': 'canonical_solution',
+    'code_multiagent_system': 'code',
+    'documentation': 'documentation',
+    'evaluation_feedback': 'evaluation_feedback'
+}
+
+# Identifies the runs of this process (together with their configuration)
+SESSION_ID = uuid.uuid4().hex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    source TEXT NOT NULL,
+    type_models TEXT,
+    number_agents INTEGER,
+    max_rounds INTEGER,
+    debate_strategy TEXT
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    result_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL REFERENCES runs (run_id),
+    task_id INTEGER,
+    recorded_at TEXT NOT NULL,
+    -- Digests of the texts in the blob store (see TEXT_FIELDS)
+    instruct_prompt TEXT,
+    canonical_solution TEXT,
+    code TEXT,
+    documentation TEXT,
+    cognitive_complexity TEXT,
+    time_complexity TEXT,
+    evaluation_feedback TEXT,
+    time REAL,
+    tests_success INTEGER,
+    test_fails INTEGER
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    round_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result_id INTEGER NOT NULL REFERENCES tasks (result_id),
+    sequence INTEGER NOT NULL,
+    round_no INTEGER,
+    votes TEXT
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    candidate_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    round_id INTEGER NOT NULL REFERENCES rounds (round_id),
+    agent INTEGER,
+    code TEXT,  -- digest in the blob store
+    cognitive_complexity INTEGER,
+    time_complexity TEXT,
+    median_runtime REAL,
+    peak_memory INTEGER,
+    bugs INTEGER,
+    vulnerabilities INTEGER,
+    code_smells INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    result_id INTEGER NOT NULL REFERENCES tasks (result_id),
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL,
+    text TEXT,
+    PRIMARY KEY (result_id, source, name)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_task ON tasks (task_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_run ON tasks (run_id);
+CREATE INDEX IF NOT EXISTS idx_runs_strategy ON runs (debate_strategy);
+CREATE INDEX IF NOT EXISTS idx_runs_models ON runs (type_models);
+CREATE INDEX IF NOT EXISTS idx_rounds_result ON rounds (result_id);
+CREATE INDEX IF NOT EXISTS idx_candidates_round ON candidates (round_id);
+CREATE INDEX IF NOT EXISTS idx_metrics_name ON metrics (name, source);
+"""
+
+# Metric sources: static analysis ('metrics_sonarqube' field) by SonarQube or by the in-process engine
+# (their measures are not comparable), and evaluator criteria
+STATIC_ANALYSIS = "static_analysis"
+IN_PROCESS_ANALYSIS = "in_process_analysis"
+EVALUATOR = "evaluator"
+
+# Analyzer (see results_store.ANALYZER_KEY) -> metric source of its measures
+ANALYSIS_SOURCES = {SONARQUBE_ANALYZER: STATIC_ANALYSIS, IN_PROCESS_ANALYZER: IN_PROCESS_ANALYSIS}
+
+# ----------------------------- Helpers -----------------------------
+
+
+def get_timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_run_id(source, row, session_id=SESSION_ID) -> str:
+    """
+    Id of the run a row belongs to: one run per process and configuration.
+    """
+    configuration = [session_id, source] + [str(row.get(field)) for field in
+                                             ("type_models", "number_agents", "max_rounds", "debate_strategy")]
+    return hashlib.sha256("\0".join(configuration).encode("utf-8")).hexdigest()[:32]
+
+
+def to_text(value):
+    return None if value is None else str(value)
+
+
+def get_metric_rows(row: dict) -> list:
+    """
+    Metrics of a results row as (source, name, value, text) tuples.
+    """
+    metrics = {}
+    analysis = str(row.get("metrics_sonarqube") or "")
+    analyzer = get_metrics_analyzer(analysis)
+    source = ANALYSIS_SOURCES.get(analyzer, f"{analyzer}_analysis")
+    for name, text in METRIC_LINE_PATTERN.findall(analysis):
+        if name != ANALYZER_KEY:
+            metrics[(source, name)] = (to_number(text), text)
+    scores, _ = parse_evaluation(row.get("evaluation_feedback"))
+    for name, score in scores.items():
+        metrics[(EVALUATOR, name)] = (float(score), str(score))
+    return [(source, name, value, text) for (source, name), (value, text) in metrics.items()]
+
+
+# ----------------------------- Database -----------------------------
+
+
+class ResultsDatabase:
+    """
+    Connection to the results database of one process (one SQLite connection per thread).
+    """
+
+    def __init__(self, path=RESULTS_DB_PATH, blobs=None):
+        self.path = path
+        self.blobs = blobs or get_blob_store()
+        self.connections = ThreadConnections(self.connect)
+        with self.transaction():
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    self.connection.execute(statement)
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Connection of the calling thread."""
+        return self.connections.get()
+
+    def transaction(self):
+        return Transaction(self.connection)
+
+    def close(self):
+        self.connections.close()
+
+    def save_results(self, rows: list, source: str, rounds=None, session_id=SESSION_ID) -> list:
+        """
+        Inserts results rows (dicts with the fields of RESULTS_CSV_FIELDS) in a single transaction.
+
+        Args:
+            rows (list): The results rows.
+            source (str): Name of the results (e.g. the CSV the rows are logged to).
+            rounds (list | None): For each row, its debate rounds (see Debate_strategies.record_round), or None.
+            session_id (str): Id of the process that produced the rows.
+
+        Returns:
+            list: The result_id of each row.
+        """
+        rounds = rounds or [None] * len(rows)
+        # The texts are stored first: a row visible in the database always has its texts
+        texts = [to_text(row.get(field)) for row in rows for field in TEXT_FIELDS]
+        codes = [to_text(candidate.get("code")) for row_rounds in rounds for debate_round in row_rounds or []
+                 for candidate in debate_round.get("candidates", [])]
+        digests = iter(self.blobs.put_many(texts + codes))
+        row_digests = [{field: next(digests) for field in TEXT_FIELDS} for _ in rows]
+
+        result_ids = []
+        with self.transaction():
+            cursor = self.connection.cursor()
+            for i, row in enumerate(rows):
+                text_digests = row_digests[i]
+                run_id = get_run_id(source, row, session_id)
+                cursor.execute(
+                    "INSERT OR IGNORE INTO runs (run_id, started_at, source, type_models, number_agents, "
+                    "max_rounds, debate_strategy) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, get_timestamp(), source, row.get("type_models"), row.get("number_agents"),
+                     row.get("max_rounds"), None if row.get("debate_strategy") is None else str(row["debate_strategy"])))
+                cursor.execute(
+                    "INSERT INTO tasks (run_id, task_id, recorded_at, instruct_prompt, canonical_solution, code, "
+                    "documentation, cognitive_complexity, time_complexity, evaluation_feedback, time, tests_success, "
+                    "test_fails) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, row.get("task_id"), get_timestamp(), text_digests["instruct_prompt"],
+                     text_digests["canonical_solution"], text_digests["code_multiagent_system"],
+                     text_digests["documentation"], to_text(row.get("cognitive_complexity")),
+                     row.get("time_complexity"), text_digests["evaluation_feedback"], to_number(row.get("time")),
+                     row.get("tests_success"), row.get("test_fails")))
+                result_id = cursor.lastrowid
+                result_ids.append(result_id)
+
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO metrics (result_id, source, name, value, text) VALUES (?, ?, ?, ?, ?)",
+                    [(result_id,) + metric for metric in get_metric_rows(row)])
+                total, _ = parse_cognitive_complexity(row.get("cognitive_complexity"))
+                if total is not None:
+                    cursor.execute("INSERT OR REPLACE INTO metrics (result_id, source, name, value, text) "
+                                   "VALUES (?, 'readability', 'cognitive_complexity', ?, ?)",
+                                   (result_id, float(total), str(total)))
+
+                for sequence, debate_round in enumerate(rounds[i] or []):
+                    cursor.execute("INSERT INTO rounds (result_id, sequence, round_no, votes) VALUES (?, ?, ?, ?)",
+                                   (result_id, sequence, debate_round.get("round"),
+                                    json.dumps(debate_round.get("votes"))))
+                    round_id = cursor.lastrowid
+                    cursor.executemany(
+                        "INSERT INTO candidates (round_id, agent, code, cognitive_complexity, time_complexity, "
+                        "median_runtime, peak_memory, bugs, vulnerabilities, code_smells) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(round_id, candidate.get("agent"), next(digests),
+                          candidate.get("cognitive_complexity"), candidate.get("time_complexity"),
+                          candidate.get("median_runtime"), candidate.get("peak_memory"), candidate.get("bugs"),
+                          candidate.get("vulnerabilities"), candidate.get("code_smells"))
+                         for candidate in debate_round.get("candidates", [])])
+        return result_ids
+
+    def get_texts(self, task, resolve=False) -> dict:
+        """
+        Texts of a row of the tasks table, by field of the results CSV.
+
+        Args:
+            task (sqlite3.Row): The row.
+            resolve (bool): Read the texts now; otherwise they are lazy references (blob_store.Blob),
+                read only when accessed.
+        """
+        texts = {}
+        for field, column in TEXT_FIELDS.items():
+            digest = task[column]
+            texts[field] = (None if digest is None else self.blobs.get(digest)) if resolve else self.blobs.ref(digest)
+        return texts
+
+    def import_csv(self, csv_path: str, source=None, batch_size=IMPORT_BATCH_SIZE) -> int:
+        """
+        Imports a results CSV, one transaction per batch of rows.
+
+        Returns:
+            int: Number of imported rows.
+        """
+        source = source or os.path.basename(csv_path)
+        session_id = f"import:{os.path.abspath(csv_path)}"
+        count = 0
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            batch = []
+            for row in csv.DictReader(f):
+                batch.append(row)
+                if len(batch) == batch_size:
+                    count += len(self.save_results(batch, source, session_id=session_id))
+                    batch = []
+            if batch:
+                count += len(self.save_results(batch, source, session_id=session_id))
+        return count
+
+    def export_csv(self, csv_path: str, source=None) -> int:
+        """
+        Exports the results (all of them, or those of one source) in the layout of the results CSV.
+
+        Returns:
+            int: Number of exported rows.
+        """
+        query = ("SELECT tasks.*, runs.type_models, runs.number_agents, runs.max_rounds, runs.debate_strategy "
+                 "FROM tasks JOIN runs USING (run_id)")
+        parameters = ()
+        if source is not None:
+            query += " WHERE runs.source = ?"
+            parameters = (source,)
+        query += " ORDER BY tasks.result_id"
+
+        analyzers = {analysis_source: analyzer for analyzer, analysis_source in ANALYSIS_SOURCES.items()}
+        count = 0
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULTS_CSV_FIELDS)
+            writer.writeheader()
+            for task in self.connection.execute(query, parameters):
+                metrics = self.connection.execute(
+                    "SELECT source, name, text FROM metrics WHERE result_id = ? AND source IN (?, ?) ORDER BY rowid",
+                    (task["result_id"], STATIC_ANALYSIS, IN_PROCESS_ANALYSIS)).fetchall()
+                # SonarQube measures are written without the analyzer line, as before the in-process engine
+                analysis_sources = {analysis_source for analysis_source, _, _ in metrics} - {STATIC_ANALYSIS}
+                analysis = "".join(f"{ANALYZER_KEY}: {analyzers[analysis_source]}\n"
+                                   for analysis_source in analysis_sources)
+                writer.writerow({
+                    **self.get_texts(task, resolve=True),
+                    'task_id': task["task_id"],
+                    'cognitive_complexity': task["cognitive_complexity"],
+                    'time_complexity': task["time_complexity"],
+                    'number_agents': task["number_agents"],
+                    'metrics_sonarqube': analysis + "".join(f"{name}: {text}\n" for _, name, text in metrics),
+                    'type_models': task["type_models"],
+                    'max_rounds': task["max_rounds"],
+                    'time': task["time"],
+                    'debate_strategy': task["debate_strategy"],
+                    'tests_success': task["tests_success"],
+                    'test_fails': task["test_fails"]
+                })
+                count += 1
+        return count
+
+
+class Transaction:
+    """
+    Context manager of a write transaction (BEGIN IMMEDIATE: the write lock is taken up front,
+    so concurrent writers wait for each other instead of failing mid-transaction).
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+@lru_cache(maxsize=None)
+def get_results_db(path=RESULTS_DB_PATH) -> ResultsDatabase:
+    """
+    Returns the connection of this process to the results database, opened on first use.
+    """
+    return ResultsDatabase(path)
+
+
+if __name__ == "__main__":
+    db = get_results_db()
+    for path in ["multi-agent_csv_results.csv", "single-agent_csv_results.csv"]:
+        print(f"{path}: {db.import_csv(path)} rows imported into {db.path}")
@@ -0,0 +1,348 @@
+'''
+This file contains a columnar store (Parquet) for the experiment results, next to the CSV logs:
+    - One typed column per field, per static-analysis metric and per evaluator criterion,
+      instead of "metric: value" strings and raw JSON text
+    - Large text fields (prompt, code, documentation, explanation) are stored once in the blob store
+      (see blob_store); a separate table maps each 'row_id' to their digests, and the texts are read
+      only when they are accessed
+    - Every append writes a new part file (atomically), so runs never rewrite existing data;
+      compact() merges the parts, and append runs it when a table has more than MAX_PARTS files
+    - Existing results CSVs can be converted (convert_csv_results)
+'''
+
+import os
+import re
+import ast
+import json
+import uuid
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from blob_store import get_blob_store
+
+# ----------------------------- Schema -----------------------------
+
+# Part files of a table above which append compacts the store (one part is written per logged task)
+MAX_PARTS = 32
+
+# Static-analysis metrics (SonarQube keys and in-process metrics), one float column each: metric_<key>
+METRIC_KEYS = ["cognitive_complexity", "security_rating", "reliability_rating", "sqale_rating", "bugs",
+               "vulnerabilities", "code_smells", "coverage", "duplicated_lines_density", "ncloc", "loc",
+               "comment_lines", "cyclomatic_complexity", "halstead_volume", "halstead_effort",
+               "maintainability_index"]
+
+# Evaluator criteria (see evaluator.extract_criteria_scores), one integer column each: eval_<criterion>
+EVALUATION_CRITERIA = ["Correctness", "Security", "Maintainability", "Reliability", "Compilation Errors",
+                       "Execution Errors"]
+EVALUATION_COLUMNS = {criterion: f"eval_{criterion.lower().replace(' ', '_')}" for criterion in EVALUATION_CRITERIA}
+
+RESULTS_SCHEMA = pa.schema(
+    [("row_id", pa.string()),
+     ("task_id", pa.int64()),
+     ("number_agents", pa.int64()),
+     ("type_models", pa.string()),
+     ("max_rounds", pa.int64()),
+     ("time", pa.float64()),
+     ("debate_strategy", pa.string()),
+     ("tests_success", pa.int64()),
+     ("test_fails", pa.int64()),
+     ("cognitive_complexity", pa.int64()),
+     ("time_complexity", pa.string()),
+     ("analyzer", pa.string())]
+    + [(f"metric_{key}", pa.float64()) for key in METRIC_KEYS]
+    + [(column, pa.int64()) for column in EVALUATION_COLUMNS.values()]
+)
+
+# Digests of the texts in the blob store
+TEXTS_SCHEMA = pa.schema([
+    ("row_id", pa.string()),
+    ("instruct_prompt", pa.string()),
+    ("canonical_solution", pa.string()),
+    ("code_multiagent_system", pa.string()),
+    ("documentation", pa.string()),
+    ("evaluation_explanation", pa.string()),
+    ("cognitive_complexity_details", pa.string())
+])
+
+# Analyzer that computed the measures of the 'metrics_sonarqube' field, named on its first line ("analyzer: ...");
+# fields without that line come from SonarQube (results logged before the in-process engine)
+ANALYZER_KEY = "analyzer"
+SONARQUBE_ANALYZER = "sonarqube"
+IN_PROCESS_ANALYZER = "static_metrics"
+
+METRIC_LINE_PATTERN = re.compile(r"^\s*([A-Za-z_]+)\s*:\s*(\S+)\s*$", re.M)
+ANALYZER_PATTERN = re.compile(rf"^\s*{ANALYZER_KEY}\s*:\s*(\S+)\s*$", re.M)
+COGNITIVE_TOTAL_PATTERN = re.compile(r"^\s*\(?\s*(-?\d+)")
+
+# ----------------------------- Parsing -----------------------------
+
+
+def parse_metrics_text(text) -> dict:
+    """
+    Parses the "metric: value" lines of the 'metrics_sonarqube' field.
+
+    Returns:
+        dict: Metric key -> float (non-numeric values are skipped).
+    """
+    metrics = {}
+    for key, value in METRIC_LINE_PATTERN.findall(text if isinstance(text, str) else ""):
+        try:
+            metrics[key] = float(value)
+        except ValueError:
+            continue
+    return metrics
+
+
+def get_metrics_analyzer(text):
+    """
+    Analyzer of the measures of a 'metrics_sonarqube' field (see ANALYZER_KEY), None if the field is empty.
+    """
+    if not isinstance(text, str) or not text.strip():
+        return None
+    match = ANALYZER_PATTERN.search(text)
+    return match.group(1) if match else SONARQUBE_ANALYZER
+
+
+def parse_evaluation(text):
+    """
+    Parses the JSON evaluation of the evaluator agent.
+
+    Returns:
+        tuple: (criterion -> int score, explanation); empty scores and None if the text is not valid JSON.
+    """
+    try:
+        evaluation = json.loads(text)
+    except (TypeError, ValueError):
+        return {}, None
+    if not isinstance(evaluation, dict):
+        return {}, None
+
+    scores = {}
+    for criterion in EVALUATION_CRITERIA:
+        try:
+            scores[criterion] = int(evaluation[criterion])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return scores, evaluation.get("Explanation")
+
+
+def parse_cognitive_complexity(value):
+    """
+    Splits the 'cognitive_complexity' field (an int, or the (total, details) tuple of
+    metrics.get_cognitive_complexity, possibly printed as text) into its total and its details,
+    the details in the same text format whichever the form of the field.
+    """
+    if isinstance(value, str):
+        try:
+            value = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            pass
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (None, None) if pd.isna(value) else (int(value), None)
+    if isinstance(value, (tuple, list)) and value:
+        details = value[1] if len(value) == 2 else list(value[1:])
+        return to_int(value[0]), str(details)
+    text = str(value)
+    match = COGNITIVE_TOTAL_PATTERN.match(text)
+    return (int(match.group(1)) if match else None), text
+
+
+def to_int(value):
+    try:
+        return None if pd.isna(value) else int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_float(value):
+    try:
+        return None if pd.isna(value) else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_text(value):
+    return None if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+
+
+def split_row(row: dict):
+    """
+    Converts a results row (the fields of save_task_data_to_csv) into its typed record and its texts.
+
+    Returns:
+        tuple: (record of RESULTS_SCHEMA, record of TEXTS_SCHEMA), sharing a new row_id.
+    """
+    row_id = uuid.uuid4().hex
+    cognitive_total, cognitive_details = parse_cognitive_complexity(row.get("cognitive_complexity"))
+    metrics = parse_metrics_text(row.get("metrics_sonarqube"))
+    scores, explanation = parse_evaluation(row.get("evaluation_feedback"))
+
+    record = {
+        "row_id": row_id,
+        "task_id": to_int(row.get("task_id")),
+        "number_agents": to_int(row.get("number_agents")),
+        "type_models": to_text(row.get("type_models")),
+        "max_rounds": to_int(row.get("max_rounds")),
+        "time": to_float(row.get("time")),
+        "debate_strategy": to_text(row.get("debate_strategy")),
+        "tests_success": to_int(row.get("tests_success")),
+        "test_fails": to_int(row.get("test_fails")),
+        "cognitive_complexity": cognitive_total,
+        "time_complexity": to_text(row.get("time_complexity")),
+        "analyzer": get_metrics_analyzer(row.get("metrics_sonarqube")),
+    }
+    for key in METRIC_KEYS:
+        record[f"metric_{key}"] = metrics.get(key)
+    for criterion in EVALUATION_CRITERIA:
+        record[EVALUATION_COLUMNS[criterion]] = scores.get(criterion)
+
+    texts = {
+        "row_id": row_id,
+        "instruct_prompt": to_text(row.get("instruct_prompt")),
+        "canonical_solution": to_text(row.get("canonical_solution")),
+        "code_multiagent_system": to_text(row.get("code_multiagent_system")),
+        "documentation": to_text(row.get("documentation")),
+        "evaluation_explanation": to_text(explanation),
+        "cognitive_complexity_details": to_text(cognitive_details)
+    }
+    return record, texts
+
+
+# ----------------------------- Store -----------------------------
+
+
+class ResultsStore:
+    """
+    A results store: a folder with a 'results' table (typed columns) and a 'texts' table
+    (digests of the large text fields in the blob store), each one made of Parquet part files.
+    """
+
+    def __init__(self, path: str, blobs=None):
+        self.path = path
+        self.blobs = blobs or get_blob_store()
+        self.results_dir = os.path.join(path, "results")
+        self.texts_dir = os.path.join(path, "texts")
+
+    @staticmethod
+    def write_part(directory: str, table: pa.Table, name=None):
+        """Writes a part file atomically (readers ignore the hidden temporary file)."""
+        os.makedirs(directory, exist_ok=True)
+        name = name or f"part-{uuid.uuid4().hex}.parquet"
+        tmp_path = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, os.path.join(directory, name))
+
+    def append(self, rows: list):
+        """
+        Appends results rows (dicts with the fields of save_task_data_to_csv).
+
+        Returns:
+            list: The row_id of each appended row.
+        """
+        if not rows:
+            return []
+        records, texts = zip(*(split_row(row) for row in rows))
+        fields = TEXTS_SCHEMA.names[1:]
+        digests = iter(self.blobs.put_many([text[field] for text in texts for field in fields]))
+        texts = [{"row_id": text["row_id"], **{field: next(digests) for field in fields}} for text in texts]
+        name = f"part-{uuid.uuid4().hex}.parquet"
+        # The texts are written first: a row visible in the results always has its texts
+        self.write_part(self.texts_dir, pa.Table.from_pylist(texts, schema=TEXTS_SCHEMA), name)
+        self.write_part(self.results_dir, pa.Table.from_pylist(list(records), schema=RESULTS_SCHEMA), name)
+        if len(self.get_parts(self.results_dir)) > MAX_PARTS:
+            self.compact()
+        return [record["row_id"] for record in records]
+
+    @staticmethod
+    def read(directory: str, schema: pa.Schema, columns=None, filters=None) -> pd.DataFrame:
+        if not os.path.isdir(directory) or not any(name.endswith(".parquet") for name in os.listdir(directory)):
+            return schema.empty_table().select(columns or schema.names).to_pandas()
+        return pq.read_table(directory, schema=schema, columns=columns, filters=filters).to_pandas()
+
+    def load(self, columns=None, filters=None) -> pd.DataFrame:
+        """
+        Loads the typed results, reading only the requested columns.
+
+        Args:
+            columns (list | None): Columns to read (default: all the columns of RESULTS_SCHEMA).
+            filters: Optional pyarrow row filters, e.g. [("debate_strategy", "=", "0")].
+
+        Returns:
+            pd.DataFrame: One row per logged task.
+        """
+        return self.read(self.results_dir, RESULTS_SCHEMA, columns, filters)
+
+    def load_texts(self, columns=None, row_ids=None, resolve=False) -> pd.DataFrame:
+        """
+        Loads the large text fields (always with 'row_id'), optionally only for the given rows.
+
+        Args:
+            columns (list | None): Text fields to load (default: all the fields of TEXTS_SCHEMA).
+            row_ids (iterable | None): Rows to load (default: all the rows).
+            resolve (bool): Read the texts now; otherwise the fields are lazy references
+                (blob_store.Blob), read only when accessed.
+        """
+        if columns is not None and "row_id" not in columns:
+            columns = ["row_id"] + list(columns)
+        filters = [("row_id", "in", list(row_ids))] if row_ids is not None else None
+        texts = self.read(self.texts_dir, TEXTS_SCHEMA, columns, filters)
+        read = self.blobs.get if resolve else self.blobs.ref
+        for column in texts.columns.drop("row_id"):
+            texts[column] = [read(digest) if isinstance(digest, str) else None for digest in texts[column]]
+        return texts
+
+    @staticmethod
+    def get_parts(directory: str) -> list:
+        return [name for name in os.listdir(directory) if name.endswith(".parquet")] if os.path.isdir(directory) else []
+
+    def compact(self):
+        """
+        Merges the part files of both tables into a single file each. Concurrent runs compact one at a time,
+        and the parts appended meanwhile are left for the next compaction.
+        """
+        from utility_function import locked_file  # utility_function imports this module
+
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, ".compact.lock"), "a") as lock_file, locked_file(lock_file):
+            for directory, schema in [(self.results_dir, RESULTS_SCHEMA), (self.texts_dir, TEXTS_SCHEMA)]:
+                parts = self.get_parts(directory)
+                if len(parts) < 2:
+                    continue
+                table = pa.concat_tables([pq.read_table(os.path.join(directory, name), schema=schema)
+                                          for name in parts])
+                self.write_part(directory, table)
+                for name in parts:
+                    os.remove(os.path.join(directory, name))
+
+
+def get_store_path(csv_path: str) -> str:
+    """
+    Path of the results store kept next to a results CSV ('x.csv' -> 'x_store').
+    """
+    return (csv_path[:-len(".csv")] if csv_path.endswith(".csv") else csv_path) + "_store"
+
+
+def convert_csv_results(csv_path: str, store_path=None) -> ResultsStore:
+    """
+    Converts a results CSV (see save_task_data_to_csv) into a results store.
+
+    Args:
+        csv_path (str): Path to the results CSV.
+        store_path (str | None): Path of the store (default: next to the CSV, see get_store_path).
+
+    Returns:
+        ResultsStore: The store holding the rows of the CSV.
+    """
+    store = ResultsStore(store_path or get_store_path(csv_path))
+    if len(store.load(["row_id"])):
+        raise ValueError(f"The results store {store.path} is not empty.")
+    df = pd.read_csv(csv_path)
+    store.append(df.to_dict("records"))
+    return store
+
+
+if __name__ == "__main__":
+    for path in ["multi-agent_csv_results.csv", "single-agent_csv_results.csv"]:
+        converted = convert_csv_results(path)
+        print(f"{path} -> {converted.path}: {len(converted.load(['row_id']))} rows")
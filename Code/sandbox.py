@@ -0,0 +1,491 @@
+"""
+    Sandboxed execution of candidate solutions against their unittest suites.
+
+    Every (candidate, test suite) pair is copied into its own scratch workspace and
+    run in a separate interpreter with a minimal environment, so BigCodeBench tests
+    that write files into the working directory cannot interfere with each other.
+    Jobs are dispatched to a bounded pool of workers, so testing all the agents'
+    candidates (or a whole batch of tasks) takes about as long as the slowest suite.
+
+    Plain compile-and-run checks skip the interpreter start-up altogether: they are
+    executed by warm worker processes (see sandbox_worker.py) that fork a child per job.
+    All scratch files live on a RAM-backed filesystem when one is available.
+"""
+
+import os
+import sys
+import json
+import signal
+import shutil
+import tempfile
+import atexit
+import threading
+import subprocess
+from queue import LifoQueue, Empty
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+# === CONFIGURATION ===
+
+# Wall-clock timeout (seconds) for a whole test suite and for each single test case
+DEFAULT_TIMEOUT = 20
+DEFAULT_TEST_TIMEOUT = 10
+
+# CPU time (seconds) and address space (bytes) granted to each sandboxed job
+DEFAULT_CPU_LIMIT = 30
+DEFAULT_MEMORY_LIMIT = 2 * 1024 * 1024 * 1024
+
+# Test runner executed inside each sandbox, and warm worker for plain code execution
+RUNNER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_runner.py")
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Libraries imported once by each warm worker, so that forked jobs find them already loaded
+WORKER_PRELOAD = ["numpy", "pandas", "matplotlib.pyplot"]
+
+# Maximum number of idle warm workers kept alive, and characters of output kept per job
+WORKER_POOL_SIZE = 2
+OUTPUT_LIMIT = 100000
+
+# RAM-backed filesystems used for scratch files, in order of preference
+RAM_FILESYSTEMS = ["/dev/shm"]
+
+# Seconds to wait for the last results once the child has exited
+READER_GRACE_PERIOD = 5
+
+# Environment variables inherited by the sandboxed interpreter (everything else is dropped)
+INHERITED_ENV_VARS = ["PATH", "SYSTEMROOT", "LANG", "LC_ALL", "PYTHONPATH", "VIRTUAL_ENV", "CONDA_PREFIX"]
+
+
+def get_default_workers():
+    """
+    Returns the default number of parallel sandbox workers (one per CPU core).
+    """
+    return max(1, os.cpu_count() or 1)
+
+
+# === WORKSPACE AND ENVIRONMENT ===
+
+@lru_cache(maxsize=None)
+def get_scratch_root() -> str:
+    """
+    Returns the folder where sandbox workspaces are created: a RAM-backed filesystem
+    (tmpfs) if one is writable, the system temporary folder otherwise.
+    """
+    for path in RAM_FILESYSTEMS:
+        if os.path.isdir(path) and os.access(path, os.W_OK | os.X_OK):
+            return path
+    return tempfile.gettempdir()
+
+
+def create_workspace(code: str, test_code: str) -> str:
+    """
+    Creates an isolated scratch folder containing the submission and its test suite.
+
+    Args:
+        code (str): The candidate solution.
+        test_code (str): Test suite code in unittest format.
+
+    Returns:
+        str: Path of the new workspace folder.
+    """
+    workspace = tempfile.mkdtemp(prefix="agent_eval_", dir=get_scratch_root())
+
+    with open(os.path.join(workspace, "submission.py"), "w", encoding="utf-8") as f:
+        f.write(code)
+
+    with open(os.path.join(workspace, "test_case.py"), "w", encoding="utf-8") as f:
+        f.write("from submission import task_func\n" + test_code)
+
+    return workspace
+
+
+def get_isolated_env(workspace: str) -> dict:
+    """
+    Builds a minimal environment for a sandboxed interpreter: HOME and the temporary
+    directory point inside the workspace, and no bytecode is written next to the sources.
+
+    Args:
+        workspace (str): Path of the job workspace.
+
+    Returns:
+        dict: Environment variables for the child process.
+    """
+    env = {var: os.environ[var] for var in INHERITED_ENV_VARS if var in os.environ}
+    env.update({
+        "HOME": workspace,
+        "USERPROFILE": workspace,
+        "TMPDIR": workspace,
+        "TEMP": workspace,
+        "TMP": workspace,
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "PYTHONHASHSEED": "0",
+        "PYTHONIOENCODING": "utf-8",
+        "MPLBACKEND": "Agg",  # plotting tasks must not open windows
+        "OMP_NUM_THREADS": "1",  # parallelism comes from the pool, not from the libraries
+        "OPENBLAS_NUM_THREADS": "1",
+        "MKL_NUM_THREADS": "1"
+    })
+    return env
+
+
+def get_resource_limiter(cpu_limit, memory_limit):
+    """
+    Returns a function that applies CPU-time and memory limits to the child process
+    right before it starts. Limits are only supported on POSIX systems: on Windows
+    the function returns None and the wall-clock timeout is the only safeguard.
+
+    Args:
+        cpu_limit (int | None): Maximum CPU time in seconds.
+        memory_limit (int | None): Maximum address space in bytes.
+
+    Returns:
+        callable | None: A `preexec_fn` for `subprocess`, or None.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    def limit_resources():
+        if cpu_limit:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+        if memory_limit:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    return limit_resources
+
+
+def kill_process_tree(process):
+    """
+    Kills a sandboxed child together with any process it spawned (its whole session on POSIX).
+
+    Args:
+        process (subprocess.Popen): The sandboxed child.
+    """
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    elif process.poll() is None:
+        process.kill()
+    process.wait()
+
+
+# === RESULT COLLECTION ===
+
+def read_channel(stream, records):
+    """
+    Reads the JSON lines sent by sandbox_runner.py until the child closes the channel.
+
+    Args:
+        stream: Readable text stream (pipe or result file).
+        records (list): List the decoded records are appended to.
+    """
+    with stream:
+        for line in stream:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue  # truncated last line of a killed child
+
+
+def get_kill_reason(returncode, timed_out, timeout, cpu_limit):
+    """
+    Explains why a sandboxed child did not terminate normally.
+
+    Args:
+        returncode (int | None): Exit code of the child (negative for signals on POSIX).
+        timed_out (bool): True if the suite exceeded its wall-clock timeout.
+        timeout (int): The wall-clock timeout in seconds.
+        cpu_limit (int | None): The CPU time limit in seconds.
+
+    Returns:
+        tuple: (kill reason code, human-readable message), or (None, None) for a normal exit.
+    """
+    if timed_out:
+        return "timeout", f"Test execution timed out (wall-clock limit of {timeout}s)."
+    if returncode is None or returncode >= 0:
+        return None, None
+    if hasattr(signal, "SIGXCPU") and returncode == -signal.SIGXCPU:
+        return "cpu_limit", f"Test execution killed: CPU time limit of {cpu_limit}s exceeded."
+    if returncode == -getattr(signal, "SIGKILL", 9):
+        return "memory_limit", "Test execution killed (likely out of memory)."
+    name = signal.Signals(-returncode).name if -returncode in signal.valid_signals() else str(-returncode)
+    return f"signal:{name}", f"Test execution killed by signal {name}."
+
+
+def summarize_records(records, error=None, kill_reason=None) -> dict:
+    """
+    Aggregates the per-test records of a sandboxed run.
+
+    Args:
+        records (list): Records sent by the runner (per-test records plus the final "done" record).
+        error (str | None): Sandbox-level problem, e.g. a timeout.
+        kill_reason (str | None): Why the child was killed ("timeout", "cpu_limit", "memory_limit", ...).
+
+    Returns:
+        dict: passed, tests_run, tests_passed, tests_failed, tests_skipped, tests_timed_out,
+        per-test details, error and kill_reason.
+    """
+    tests = [record for record in records if "outcome" in record]
+    completed = any(record.get("done") for record in records)
+    outcomes = [test["outcome"] for test in tests]
+
+    tests_passed = outcomes.count("success") + outcomes.count("expected_failure")
+    tests_failed = (outcomes.count("failure") + outcomes.count("error") + outcomes.count("timeout") +
+                    outcomes.count("unexpected_success"))
+    tests_skipped = outcomes.count("skipped")
+
+    if error is None and not completed:
+        error = "Test runner ended without reporting results."
+
+    return {
+        "passed": error is None and tests_failed == 0,
+        "tests_run": tests_passed + tests_failed + tests_skipped,
+        "tests_passed": tests_passed,
+        "tests_failed": tests_failed,
+        "tests_skipped": tests_skipped,
+        "expected_failures": outcomes.count("expected_failure"),
+        "unexpected_successes": outcomes.count("unexpected_success"),
+        "tests_timed_out": outcomes.count("timeout"),
+        "tests": tests,
+        "error": error,
+        "kill_reason": kill_reason
+    }
+
+
+# === JOB EXECUTION ===
+
+def run_test_job(code: str, test_code: str, timeout=DEFAULT_TIMEOUT, test_timeout=DEFAULT_TEST_TIMEOUT,
+                 cpu_limit=DEFAULT_CPU_LIMIT, memory_limit=DEFAULT_MEMORY_LIMIT, failfast=False) -> dict:
+    """
+    Runs a single candidate against its test suite inside a fresh workspace.
+
+    The suite is driven by sandbox_runner.py, which sends structured per-test results
+    back over a pipe; the child's stdout and stderr are discarded. The workspace is
+    always removed at the end.
+
+    Args:
+        code (str): The candidate solution.
+        test_code (str): Test suite code in unittest format.
+        timeout (int): Wall-clock timeout in seconds for the whole suite.
+        test_timeout (float | None): Wall-clock timeout in seconds for each test case.
+        cpu_limit (int | None): CPU time limit in seconds.
+        memory_limit (int | None): Memory limit in bytes.
+        failfast (bool): Stop at the first failing test (cheap gating checks).
+
+    Returns:
+        dict: See summarize_records.
+    """
+    workspace = create_workspace(code, test_code)
+    records = []
+    error = None
+    timed_out = False
+    process = None
+
+    # POSIX children inherit the write end of a pipe; on Windows results go through a file
+    use_pipe = os.name == "posix"
+    reader = None
+    if use_pipe:
+        read_fd, write_fd = os.pipe()
+        target, pass_fds = f"fd:{write_fd}", (write_fd,)
+        reader = threading.Thread(target=read_channel, args=(os.fdopen(read_fd, encoding="utf-8"), records),
+                                  daemon=True)
+        reader.start()
+    else:
+        target, pass_fds = os.path.join(workspace, ".results.jsonl"), ()
+
+    command = [sys.executable, RUNNER_PATH, "test_case", target]
+    if test_timeout:
+        command += ["--test-timeout", str(test_timeout)]
+    if failfast:
+        command.append("--failfast")
+
+    try:
+        try:
+            process = subprocess.Popen(
+                command,
+                cwd=workspace,
+                env=get_isolated_env(workspace),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                pass_fds=pass_fds,
+                start_new_session=use_pipe,
+                preexec_fn=get_resource_limiter(cpu_limit, memory_limit)
+            )
+        finally:
+            if use_pipe:
+                os.close(write_fd)  # only the child keeps the write end open
+
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            timed_out = True
+    except Exception as e:
+        error = f"Exception occurred during testing: {e}"
+    finally:
+        returncode = process.poll() if process is not None else None
+        if process is not None:
+            kill_process_tree(process)
+        if reader is not None:
+            reader.join(READER_GRACE_PERIOD)
+        elif os.path.exists(target):
+            with open(target, encoding="utf-8") as f:
+                read_channel(f, records)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    kill_reason, message = get_kill_reason(returncode, timed_out, timeout, cpu_limit)
+    return summarize_records(records, error or message, kill_reason)
+
+
+def run_tests_parallel(jobs, max_workers=None, timeout=DEFAULT_TIMEOUT, test_timeout=DEFAULT_TEST_TIMEOUT,
+                       cpu_limit=DEFAULT_CPU_LIMIT, memory_limit=DEFAULT_MEMORY_LIMIT, failfast=False) -> list:
+    """
+    Runs many (candidate, test suite) pairs at once, each in its own sandbox.
+
+    Every job is a separate interpreter, so a pool of threads waiting on the child
+    processes is enough to keep all the CPU cores busy.
+
+    Args:
+        jobs (list): List of (code, test_code) tuples.
+        max_workers (int | None): Maximum number of concurrent jobs (default: CPU count).
+        timeout (int): Wall-clock timeout in seconds for each suite.
+        test_timeout (float | None): Wall-clock timeout in seconds for each test case.
+        cpu_limit (int | None): CPU time limit in seconds for each job.
+        memory_limit (int | None): Memory limit in bytes for each job.
+        failfast (bool): Stop each suite at its first failing test.
+
+    Returns:
+        list: One result dictionary per job, in the same order as `jobs`.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    workers = min(max_workers or get_default_workers(), len(jobs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_test_job, code, test_code, timeout, test_timeout, cpu_limit, memory_limit, failfast)
+            for code, test_code in jobs
+        ]
+        return [future.result() for future in futures]
+
+
+# === WARM WORKERS FOR CODE EXECUTION ===
+
+class WarmWorkerPool:
+    """
+    Keeps a few sandbox_worker.py processes alive between jobs. Every worker handles one
+    job at a time; extra workers are started on demand when all of them are busy.
+    """
+
+    def __init__(self, size=WORKER_POOL_SIZE):
+        self.size = size
+        self.idle = LifoQueue()
+
+    def start_worker(self):
+        return subprocess.Popen(
+            [sys.executable, WORKER_PATH] + WORKER_PRELOAD,
+            cwd=get_scratch_root(),
+            env=get_isolated_env(get_scratch_root()),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8"
+        )
+
+    def acquire(self):
+        while True:
+            try:
+                worker = self.idle.get_nowait()
+            except Empty:
+                return self.start_worker()
+            if worker.poll() is None:
+                return worker
+
+    def release(self, worker):
+        if worker.poll() is None and self.idle.qsize() < self.size:
+            self.idle.put(worker)
+        else:
+            self.discard(worker)
+
+    @staticmethod
+    def discard(worker):
+        if worker.poll() is None:
+            worker.kill()
+        worker.wait()
+
+    def close(self):
+        while True:
+            try:
+                self.discard(self.idle.get_nowait())
+            except Empty:
+                return
+
+
+worker_pool = WarmWorkerPool()
+atexit.register(worker_pool.close)
+
+
+def run_code(source: str, timeout=DEFAULT_TIMEOUT, cpu_limit=DEFAULT_CPU_LIMIT,
+             memory_limit=DEFAULT_MEMORY_LIMIT) -> dict:
+    """
+    Executes a Python program as __main__ in a fresh workspace, through a warm worker.
+
+    On POSIX the job runs in a child forked from a pooled worker, so there is no
+    interpreter start-up cost; elsewhere a new worker is started for every job.
+
+    Args:
+        source (str): The program (it should already be known to compile).
+        timeout (int): Wall-clock timeout in seconds.
+        cpu_limit (int | None): CPU time limit in seconds.
+        memory_limit (int | None): Memory limit in bytes.
+
+    Returns:
+        dict: returncode, stdout, stderr and, if the job was killed, kill_reason.
+    """
+    workspace = tempfile.mkdtemp(prefix="agent_run_", dir=get_scratch_root())
+    job = json.dumps({
+        "source": source,
+        "workspace": workspace,
+        "env": get_isolated_env(workspace),
+        "timeout": timeout,
+        "cpu_limit": cpu_limit,
+        "memory_limit": memory_limit,
+        "output_limit": OUTPUT_LIMIT
+    })
+
+    try:
+        if hasattr(os, "fork"):
+            worker = worker_pool.acquire()
+            reply = ""
+            try:
+                worker.stdin.write(job + "\n")
+                worker.stdin.flush()
+                reply = worker.stdout.readline()
+            except OSError:
+                pass
+            finally:
+                if reply:
+                    worker_pool.release(worker)
+                else:
+                    worker_pool.discard(worker)
+        else:
+            worker = worker_pool.start_worker()
+            try:
+                reply, _ = worker.communicate(job + "\n", timeout=timeout + READER_GRACE_PERIOD)
+            except subprocess.TimeoutExpired:
+                worker_pool.discard(worker)
+                return {"returncode": None, "stdout": "", "stderr": f"Execution timed out after {timeout}s.",
+                        "kill_reason": "timeout"}
+            reply = reply.strip().splitlines()[-1] if reply.strip() else ""
+
+        if not reply:
+            return {"returncode": None, "stdout": "", "stderr": "Sandbox worker died unexpectedly.",
+                    "kill_reason": "worker_crash"}
+        return json.loads(reply)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
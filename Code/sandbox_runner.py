@@ -0,0 +1,173 @@
+"""
+    Test runner executed inside a sandboxed child process (see sandbox.py).
+
+    It loads the unittest module of the workspace and reports one compact JSON
+    record per test (outcome, duration, exception type, truncated traceback) to the
+    parent over a pipe, so the parent never has to capture and parse stdout.
+    Each test case has its own wall-clock timeout, and in fail-fast mode the run
+    stops at the first failure.
+
+    Usage:
+        python sandbox_runner.py <test module> <fd:N | result file path> [--test-timeout S] [--failfast]
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import unittest
+import faulthandler
+
+# Maximum number of characters of each traceback sent back to the parent
+TRACEBACK_LIMIT = 2000
+
+
+class TestTimeout(BaseException):
+    """
+    Raised inside a test case that exceeds its wall-clock timeout.
+    It derives from BaseException so that `except Exception` in the submission cannot swallow it.
+    """
+
+
+def raise_test_timeout(signum, frame):
+    raise TestTimeout("Test case exceeded its time limit.")
+
+
+class StructuredTestResult(unittest.TestResult):
+    """
+    unittest result that streams a JSON line for every test outcome
+    and enforces the per-test wall-clock timeout.
+    """
+
+    def __init__(self, channel, test_timeout=None):
+        super().__init__()
+        self.channel = channel
+        self.test_timeout = test_timeout
+        self.test_start = time.perf_counter()
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.test_start = time.perf_counter()
+        if self.test_timeout:
+            if hasattr(signal, "setitimer"):
+                signal.setitimer(signal.ITIMER_REAL, self.test_timeout)
+            else:
+                # No SIGALRM (Windows): a stuck test terminates the whole run instead
+                faulthandler.dump_traceback_later(self.test_timeout, exit=True)
+
+    def stopTest(self, test):
+        if self.test_timeout:
+            if hasattr(signal, "setitimer"):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+            else:
+                faulthandler.cancel_dump_traceback_later()
+        super().stopTest(test)
+
+    def send(self, test, outcome, err=None, reason=None):
+        record = {
+            "id": test.id(),
+            "outcome": outcome,
+            "duration": round(time.perf_counter() - self.test_start, 6)
+        }
+        if err is not None:
+            record["exc_type"] = err[0].__name__
+            record["traceback"] = self._exc_info_to_string(err, test)[-TRACEBACK_LIMIT:]
+        if reason is not None:
+            record["reason"] = str(reason)[:TRACEBACK_LIMIT]
+        self.channel.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.channel.flush()
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.send(test, "success")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self.send(test, "failure", err)
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        if issubclass(err[0], TestTimeout):
+            self.send(test, "timeout", err, reason=f"wall-clock limit of {self.test_timeout}s exceeded")
+        elif issubclass(err[0], MemoryError):
+            self.send(test, "error", err, reason="memory limit exceeded")
+        else:
+            self.send(test, "error", err)
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.send(test, "skipped", reason=reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self.send(test, "expected_failure", err)
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self.send(test, "unexpected_success")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            if issubclass(err[0], test.failureException):
+                self.send(subtest, "failure", err)
+            elif issubclass(err[0], TestTimeout):
+                self.send(subtest, "timeout", err, reason=f"wall-clock limit of {self.test_timeout}s exceeded")
+            else:
+                self.send(subtest, "error", err)
+
+
+class ImportFailure:
+    """
+    Placeholder test reported when the test module cannot be imported.
+    """
+    failureException = AssertionError
+
+    def __init__(self, module_name):
+        self.module_name = module_name
+
+    def id(self):
+        return self.module_name
+
+
+def open_channel(target):
+    """
+    Opens the channel to the parent: an inherited pipe descriptor ("fd:N") or a file path.
+    """
+    if target.startswith("fd:"):
+        return os.fdopen(int(target[3:]), "w", encoding="utf-8")
+    return open(target, "w", encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("module")
+    parser.add_argument("target")
+    parser.add_argument("--test-timeout", type=float, default=None)
+    parser.add_argument("--failfast", action="store_true")
+    args = parser.parse_args()
+    module_name = args.module
+
+    # Import the submission and its tests from the workspace, never from this folder
+    sys.path[0] = os.getcwd()
+
+    if args.test_timeout and hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, raise_test_timeout)
+
+    with open_channel(args.target) as channel:
+        result = StructuredTestResult(channel, args.test_timeout)
+        result.failfast = args.failfast
+        try:
+            suite = unittest.defaultTestLoader.loadTestsFromName(module_name)
+        except Exception:
+            # The submission or its tests cannot even be imported (e.g. syntax errors)
+            result.addError(ImportFailure(module_name), sys.exc_info())
+        else:
+            suite.run(result)
+        channel.write(json.dumps({"done": True, "tests_run": result.testsRun}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
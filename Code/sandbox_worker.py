@@ -0,0 +1,170 @@
+"""
+    Warm worker process executing Python code on behalf of sandbox.py.
+
+    The worker starts once, pre-imports the heavy libraries used by the generated code,
+    and then serves jobs read as JSON lines from stdin: each job is run in a process
+    forked from the worker (so it starts in milliseconds with everything already
+    imported) under CPU-time and memory limits, and the outcome is written back as a
+    JSON line on stdout. Where fork is not available (Windows) the job runs inline and
+    the parent starts a fresh worker for every job.
+
+    Usage:
+        python sandbox_worker.py [module to preload ...]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import select
+import signal
+import linecache
+import traceback
+import contextlib
+
+
+def execute_source(job) -> dict:
+    """
+    Executes the job's source as the __main__ module inside the job workspace,
+    capturing what it prints.
+
+    Args:
+        job (dict): source, workspace, env, output_limit.
+
+    Returns:
+        dict: returncode, stdout and stderr (truncated to output_limit characters).
+    """
+    os.chdir(job["workspace"])
+    sys.path[0] = job["workspace"]
+    os.environ.clear()
+    os.environ.update(job["env"])
+    sys.argv = ["solution.py"]
+
+    # Make the source visible to tracebacks without writing it to disk
+    source = job["source"]
+    linecache.cache["solution.py"] = (len(source), None, source.splitlines(True), "solution.py")
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    returncode = 0
+
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile(source, "solution.py", "exec"), {"__name__": "__main__"})
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                returncode = e.code
+            elif e.code is not None:
+                print(e.code, file=sys.stderr)
+                returncode = 1
+        except BaseException as e:
+            # Hide this function's frame: report the traceback as if solution.py ran as a script
+            traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+            returncode = 1
+
+    limit = job["output_limit"]
+    return {"returncode": returncode, "stdout": stdout.getvalue()[:limit], "stderr": stderr.getvalue()[:limit]}
+
+
+def apply_limits(job):
+    """
+    Applies the job's CPU-time and memory limits to the current process (POSIX only).
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    if job["cpu_limit"]:
+        resource.setrlimit(resource.RLIMIT_CPU, (job["cpu_limit"], job["cpu_limit"] + 1))
+    if job["memory_limit"]:
+        resource.setrlimit(resource.RLIMIT_AS, (job["memory_limit"], job["memory_limit"]))
+
+
+def run_forked(job) -> dict:
+    """
+    Runs a job in a forked child and waits for it at most `timeout` seconds.
+
+    Args:
+        job (dict): The job description (see sandbox.run_code).
+
+    Returns:
+        dict: The outcome sent by the child, or a returncode/stderr describing how it died.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+
+    if pid == 0:  # child
+        os.close(read_fd)
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):  # output written below the Python level is discarded
+            os.dup2(devnull, fd)
+        try:
+            apply_limits(job)
+            outcome = execute_source(job)
+        except BaseException:
+            outcome = {"returncode": 1, "stdout": "", "stderr": traceback.format_exc()}
+        with os.fdopen(write_fd, "w", encoding="utf-8") as channel:
+            channel.write(json.dumps(outcome))
+        os._exit(0)
+
+    os.close(write_fd)
+    deadline = time.monotonic() + job["timeout"]
+    chunks = []
+    timed_out = False
+
+    with os.fdopen(read_fd, "rb") as channel:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            ready, _, _ = select.select([channel], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(channel.fileno(), 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+    _, status = os.waitpid(pid, 0)
+
+    if timed_out:
+        return {"returncode": None, "stdout": "", "stderr": f"Execution timed out after {job['timeout']}s.",
+                "kill_reason": "timeout"}
+    try:
+        return json.loads(b"".join(chunks).decode("utf-8"))
+    except ValueError:
+        exitcode = os.waitstatus_to_exitcode(status)
+        if exitcode >= 0:
+            return {"returncode": exitcode, "stdout": "", "stderr": "Process exited without reporting its output."}
+        if exitcode == -signal.SIGXCPU:
+            reason = "cpu_limit"
+        elif exitcode == -signal.SIGKILL:
+            reason = "memory_limit"
+        else:
+            reason = f"signal:{signal.Signals(-exitcode).name}"
+        return {"returncode": exitcode, "stdout": "", "stderr": f"Execution killed ({reason}).", "kill_reason": reason}
+
+
+def main():
+    for module in sys.argv[1:]:
+        try:
+            __import__(module)
+        except Exception:
+            pass  # preloading is only an optimization
+
+    can_fork = hasattr(os, "fork")
+    for line in sys.stdin:
+        job = json.loads(line)
+        outcome = run_forked(job) if can_fork else execute_source(job)
+        sys.stdout.write(json.dumps(outcome) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+'''
+This file contains a local stand-in for a SonarQube server and its scanner, to run the SonarQube
+pipeline of utility_function without a real installation:
+    - The server answers the web API used by the pipeline (/api/ce/task, /api/measures/component,
+      /api/measures/component_tree, /api/projects/delete); the measures of an analysis become visible
+      only when its background task has finished, as on a real server
+    - The scanner analyzes the Python files of the current directory with the in-process metric engine
+      (see static_metrics), uploads the measures and writes .scannerwork/report-task.txt
+Usage:
+    python sonarqube_stub.py serve [port]
+    SONAR_HOST=http://localhost:9000 SONAR_SCANNER_CMD="python $PWD/sonarqube_stub.py scan" python main_one_LLM.py
+The scanner runs in the temporary project directory, so the path of the script must be absolute
+(serve prints the command to use).
+'''
+
+import os
+import sys
+import json
+import time
+import uuid
+import threading
+import urllib.request
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from static_metrics import get_static_metrics
+
+# ----------------------------- Configuration -----------------------------
+
+DEFAULT_PORT = 9000
+
+# Time (seconds) the background task of an analysis stays pending before its measures are published
+TASK_DELAY = 0.5
+
+# Scanner command (SONAR_SCANNER_CMD) running this file from any directory
+SCANNER_CMD = f'"{sys.executable}" "{os.path.abspath(__file__)}" scan'
+
+# Measures of a project aggregated as sums (the others are the worst value among its files)
+SUMMED_METRICS = {"cognitive_complexity", "bugs", "vulnerabilities", "code_smells", "ncloc"}
+
+# ----------------------------- Server -----------------------------
+
+
+class SonarQubeStub(ThreadingHTTPServer):
+    """
+    HTTP server holding the analyses uploaded by the stub scanner.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port=DEFAULT_PORT, task_delay=TASK_DELAY):
+        super().__init__(("127.0.0.1", port), SonarQubeStubHandler)
+        self.task_delay = task_delay
+        self.tasks = {}  # task id -> {"componentKey", "files", "ready_at"}
+        self.projects = {}  # project key -> {path: {metric: value}}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        """Serves the requests in a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, project_key, files):
+        with self.lock:
+            task_id = uuid.uuid4().hex
+            self.tasks[task_id] = {"componentKey": project_key, "files": files,
+                                   "ready_at": time.monotonic() + self.task_delay}
+            return task_id
+
+    def get_task_status(self, task_id):
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None
+            if time.monotonic() < task["ready_at"]:
+                return "IN_PROGRESS"
+            if task["files"] is not None:
+                self.projects[task["componentKey"]] = task["files"]
+                task["files"] = None
+            return "SUCCESS"
+
+    def get_project(self, project_key):
+        with self.lock:
+            return self.projects.get(project_key)
+
+    def delete_project(self, project_key):
+        with self.lock:
+            return self.projects.pop(project_key, None) is not None
+
+
+def aggregate_measures(files, metric_keys):
+    """
+    Measures of a whole project from the measures of its files.
+    """
+    measures = {}
+    for metric in metric_keys:
+        values = [float(file[metric]) for file in files.values() if metric in file]
+        if not values:
+            continue
+        if metric in SUMMED_METRICS:
+            measures[metric] = str(int(sum(values)))
+        elif metric.endswith("_rating"):
+            measures[metric] = f"{max(values):.1f}"
+        else:
+            measures[metric] = f"{sum(values) / len(values):.1f}"
+    return measures
+
+
+def to_measures(values, metric_keys):
+    return [{"metric": metric, "value": values[metric]} for metric in metric_keys if metric in values]
+
+
+class SonarQubeStubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        metric_keys = [key for key in query.get("metricKeys", "").split(",") if key]
+
+        if url.path == "/api/ce/task":
+            status = self.server.get_task_status(query.get("id"))
+            if status is None:
+                return self.send_json({"errors": [{"msg": "Task not found"}]}, 404)
+            return self.send_json({"task": {"id": query["id"], "status": status}})
+
+        project = self.server.get_project(query.get("component"))
+        if project is None:
+            return self.send_json({"errors": [{"msg": "Component not found"}]}, 404)
+
+        if url.path == "/api/measures/component":
+            measures = to_measures(aggregate_measures(project, metric_keys), metric_keys)
+            return self.send_json({"component": {"key": query["component"], "measures": measures}})
+
+        if url.path == "/api/measures/component_tree":
+            page, page_size = int(query.get("p", 1)), int(query.get("ps", 100))
+            paths = sorted(project)
+            components = [{"key": f"{query['component']}:{path}", "path": path, "qualifier": "FIL",
+                           "measures": to_measures(project[path], metric_keys)}
+                          for path in paths[(page - 1) * page_size:page * page_size]]
+            return self.send_json({"paging": {"pageIndex": page, "pageSize": page_size, "total": len(paths)},
+                                   "components": components})
+
+        self.send_json({"errors": [{"msg": "Unknown web service"}]}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if url.path == "/api/projects/delete":
+            # Parameters in the query string or form-encoded in the body, as accepted by SonarQube
+            query = {key: values[0] for key, values in parse_qs(url.query or body.decode()).items()}
+            if not self.server.delete_project(query.get("project")):
+                return self.send_json({"errors": [{"msg": "Project not found"}]}, 404)
+            self.send_response(204)
+            self.end_headers()
+            return
+        if url.path != "/api/stub/analysis":
+            return self.send_json({"errors": [{"msg": "Unknown web service"}]}, 404)
+        analysis = json.loads(body)
+        self.send_json({"taskId": self.server.submit(analysis["projectKey"], analysis["files"])})
+
+
+# ----------------------------- Scanner -----------------------------
+
+
+def read_properties(path):
+    with open(path) as f:
+        return dict(line.strip().split("=", 1) for line in f if "=" in line)
+
+
+def scan(project_dir="."):
+    """
+    Analyzes the Python files of a project directory (configured by sonar-project.properties)
+    and uploads the measures to the stub server, like sonar-scanner does.
+    """
+    properties = read_properties(os.path.join(project_dir, "sonar-project.properties"))
+    files = {}
+    for root, _, names in os.walk(project_dir):
+        for name in names:
+            if name.endswith(".py"):
+                path = os.path.join(root, name)
+                with open(path) as f:
+                    files[os.path.relpath(path, project_dir).replace(os.sep, "/")] = get_static_metrics(f.read())
+
+    host = properties["sonar.host.url"].rstrip("/")
+    request = urllib.request.Request(f"{host}/api/stub/analysis", method="POST",
+                                     data=json.dumps({"projectKey": properties["sonar.projectKey"],
+                                                      "files": files}).encode(),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        task_id = json.loads(response.read())["taskId"]
+
+    os.makedirs(os.path.join(project_dir, ".scannerwork"), exist_ok=True)
+    with open(os.path.join(project_dir, ".scannerwork", "report-task.txt"), "w") as f:
+        f.write(f"projectKey={properties['sonar.projectKey']}\nserverUrl={host}\nceTaskId={task_id}\n"
+                f"ceTaskUrl={host}/api/ce/task?id={task_id}\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "scan":
+        scan()
+    elif len(sys.argv) > 1 and sys.argv[1] == "serve":
+        server = SonarQubeStub(int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT)
+        print(f"SonarQube stand-in listening on {server.url}, scanner command: {SCANNER_CMD}")
+        server.serve_forever()
+    else:
+        print(__doc__)
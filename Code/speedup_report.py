@@ -0,0 +1,221 @@
+'''
+This file contains an offline stage comparing the efficiency of the generated code with the
+BigCodeBench canonical solution, for every row (task and configuration) of a results CSV:
+    - Rebuilds the complete canonical solution from the code prompt inside 'instruct_prompt'
+    - Times 'code_multiagent_system' and the canonical solution with the same harness and inputs
+    - Records the runtime ratio, the peak-memory ratio and the empirical complexity class of both
+    - Flags generated code whose declared time complexity ('time_complexity') disagrees with its empirical class
+    - Writes the report next to the CSV, so multi-agent and single-LLM runs can be compared
+'''
+
+import ast
+import re
+import math
+import pandas as pd
+
+from timing_harness import time_candidates_parallel
+from complexity_estimation import find_function, generate_calls, estimate_time_complexity
+
+# ----------------------------- Configuration -----------------------------
+
+# Input size generated from the signature of task_func when some parameters have no default
+REPORT_INPUT_SIZE = 100
+
+# Repeated measurements per input, minimum duration (seconds) of each measurement, timeout of a run (seconds)
+REPORT_REPEAT = 9
+REPORT_MIN_TIME = 0.02
+REPORT_TIMEOUT = 60
+
+# Code prompt embedded in the BigCodeBench instruction
+CODE_PROMPT_PATTERN = re.compile(r"You should write self-contained code starting with:\s*```(?:python)?\n(.*?)```", re.S)
+
+# Columns of the results row identifying the run (the same task is logged once per strategy and model)
+ROW_COLUMNS = ["task_id", "debate_strategy", "type_models"]
+RESULT_COLUMNS = ["runtime_generated", "runtime_canonical", "runtime_ratio",
+                  "peak_memory_generated", "peak_memory_canonical", "peak_memory_ratio",
+                  "class_generated", "class_canonical", "declared_generated", "declared_agrees", "error"]
+REPORT_COLUMNS = ROW_COLUMNS + RESULT_COLUMNS
+
+# ----------------------------- Canonical Solution -----------------------------
+
+
+def get_code_prompt(instruct_prompt: str):
+    """
+    Extracts the code prompt (imports + task_func header) from a BigCodeBench instruction.
+
+    Returns:
+        str | None: The code prompt, or None if the instruction does not contain one.
+    """
+    match = CODE_PROMPT_PATTERN.search(instruct_prompt or "")
+    return match.group(1) if match else None
+
+
+def get_canonical_code(instruct_prompt: str, canonical_solution: str):
+    """
+    Rebuilds the complete canonical solution: BigCodeBench stores only the body of task_func.
+
+    Args:
+        instruct_prompt (str): Instruction of the task, containing the code prompt.
+        canonical_solution (str): Body of the canonical task_func.
+
+    Returns:
+        str | None: The complete code, or None if the code prompt is missing.
+    """
+    code_prompt = get_code_prompt(instruct_prompt)
+    if code_prompt is None:
+        return None
+    return code_prompt.rstrip() + "\n" + canonical_solution
+
+
+# ----------------------------- Benchmark -----------------------------
+
+
+def get_report_inputs(code: str):
+    """
+    Chooses the inputs both solutions are run on: the default arguments of task_func when
+    every parameter has one (the usual case in BigCodeBench), otherwise inputs generated
+    from its signature.
+
+    Args:
+        code (str): The canonical solution (its signature defines the task).
+
+    Returns:
+        list: Inputs as (args, kwargs) pairs (empty if they cannot be built).
+    """
+    try:
+        funcdef = find_function(ast.parse(code), "task_func")
+    except SyntaxError:
+        return []
+    if funcdef is None:
+        return []
+
+    arguments = funcdef.args
+    required = len(arguments.posonlyargs + arguments.args) - len(arguments.defaults)
+    required += sum(default is None for default in arguments.kw_defaults)
+    if required == 0:
+        return [([], {})]
+    return generate_calls(code, REPORT_INPUT_SIZE, "task_func")[1]
+
+
+def get_ratio(numerator, denominator):
+    if numerator is None or not denominator:
+        return None
+    return numerator / denominator
+
+
+def compare_with_canonical(generated_code: str, canonical_code: str, declared=None) -> dict:
+    """
+    Benchmarks the generated code against the canonical solution on the same inputs.
+
+    Args:
+        generated_code (str): Complete generated code.
+        canonical_code (str): Complete canonical solution.
+        declared (str): Time complexity declared for the generated code (optional).
+
+    Returns:
+        dict: The results of a row of the report (see RESULT_COLUMNS). The runtime ratio is
+        generated / canonical, so values below 1 mean the generated code is faster; 'declared_agrees'
+        is None when nothing was declared or the empirical class is not reliable enough.
+    """
+    row = dict.fromkeys(RESULT_COLUMNS)
+
+    calls = get_report_inputs(canonical_code)
+    if not calls:
+        row["error"] = "Cannot build the inputs of task_func"
+        return row
+
+    reports = time_candidates_parallel([generated_code, canonical_code], calls, "task_func",
+                                       repeat=REPORT_REPEAT, min_time=REPORT_MIN_TIME, timeout=REPORT_TIMEOUT)
+
+    errors = []
+    for name, report in zip(["generated", "canonical"], reports):
+        results = report["results"]
+        failed = [result["error"] for result in results if result["error"]]
+        if report["error"] or failed or not results:
+            errors.append(f"{name}: {report['error'] or (failed[0] if failed else 'no measurements')}")
+            continue
+        row[f"runtime_{name}"] = sum(result["median"] for result in results)
+        row[f"peak_memory_{name}"] = max(result["peak_memory"] for result in results)
+
+    row["runtime_ratio"] = get_ratio(row["runtime_generated"], row["runtime_canonical"])
+    row["peak_memory_ratio"] = get_ratio(row["peak_memory_generated"], row["peak_memory_canonical"])
+
+    estimate = estimate_time_complexity(generated_code, "task_func", declared=declared)
+    row["class_generated"], row["declared_generated"], row["declared_agrees"] = \
+        estimate["empirical_class"], declared, estimate["agrees"]
+    row["class_canonical"] = estimate_time_complexity(canonical_code, "task_func")["empirical_class"]
+
+    row["error"] = "; ".join(errors) or None
+    return row
+
+
+def geometric_mean(values):
+    values = [value for value in values if value is not None and value > 0 and not math.isnan(value)]
+    if not values:
+        return None
+    return math.exp(sum(math.log(value) for value in values) / len(values))
+
+
+def build_speedup_report(csv_path: str, output_path=None) -> pd.DataFrame:
+    """
+    Builds the speedup report of a results CSV (multi-agent or single-LLM).
+
+    Args:
+        csv_path (str): Path to the results CSV.
+        output_path (str): Path of the report (default: the CSV path with a '_speedup' suffix).
+
+    Returns:
+        pd.DataFrame: The report, one row per row of the CSV, identified by ROW_COLUMNS.
+    """
+    df = pd.read_csv(csv_path)
+
+    required = {"task_id", "instruct_prompt", "canonical_solution", "code_multiagent_system"}
+    if not required.issubset(df.columns):
+        raise ValueError(f"CSV must contain the columns {sorted(required)}.")
+
+    rows = []
+    for _, task in df.iterrows():
+        canonical_code = get_canonical_code(task["instruct_prompt"], task["canonical_solution"])
+        generated_code = task["code_multiagent_system"]
+
+        if canonical_code is None:
+            row = dict.fromkeys(RESULT_COLUMNS)
+            row["error"] = "Code prompt not found in instruct_prompt"
+        elif not isinstance(generated_code, str) or generated_code.strip() in ("", "-1"):
+            row = dict.fromkeys(RESULT_COLUMNS)
+            row["error"] = "No accepted code"
+        else:
+            declared = task.get("time_complexity")
+            row = compare_with_canonical(generated_code, canonical_code,
+                                         declared if isinstance(declared, str) else None)
+
+        row.update({column: task.get(column) for column in ROW_COLUMNS})
+        print(f"Task {row['task_id']} (strategy {row['debate_strategy']}): runtime ratio {row['runtime_ratio']}, "
+              f"peak memory ratio {row['peak_memory_ratio']}, "
+              f"classes {row['class_generated']} / {row['class_canonical']}"
+              + (" [!] declared time complexity disagrees" if row["declared_agrees"] is False else "")
+              + (f" [!] {row['error']}" if row["error"] else ""))
+        rows.append(row)
+
+    report = pd.DataFrame(rows, columns=REPORT_COLUMNS)
+
+    if output_path is None:
+        output_path = csv_path[:-len(".csv")] + "_speedup.csv" if csv_path.endswith(".csv") else csv_path + "_speedup"
+    report.to_csv(output_path, index=False)
+
+    runtime_mean = geometric_mean(report["runtime_ratio"].tolist())
+    memory_mean = geometric_mean(report["peak_memory_ratio"].tolist())
+    same_class = (report["class_generated"] == report["class_canonical"]) & report["class_generated"].notna()
+    print(f"\nSpeedup report saved to {output_path}")
+    print(f"Geometric mean runtime ratio (generated / canonical): {runtime_mean}")
+    print(f"Geometric mean peak memory ratio (generated / canonical): {memory_mean}")
+    print(f"Same empirical complexity class: {int(same_class.sum())}/{len(report)} tasks")
+    print(f"Declared time complexity disagrees with the empirical class: "
+          f"{int(report['declared_agrees'].eq(False).sum())}/{int(report['declared_agrees'].notna().sum())} tasks")
+
+    return report
+
+
+if __name__ == "__main__":
+    for path in ["multi-agent_csv_results.csv", "single-agent_csv_results.csv"]:
+        build_speedup_report(path)
@@ -0,0 +1,239 @@
+'''
+This file contains an in-process engine for the maintainability metrics of a solution snippet,
+a fast offline alternative to the SonarQube analysis:
+    - Halstead volume and effort (operators and operands from the token stream)
+    - Cyclomatic complexity (decision points of the AST)
+    - LOC, NCLOC and comment lines (docstrings count as comments, as in SonarQube)
+    - Maintainability index and the maintainability rating derived from it
+    - Duplicated-line density (repeated windows of normalized code lines)
+    - Cognitive complexity (module-wide, see metrics.get_module_cognitive_complexity)
+    - Bugs, vulnerabilities and code smells, with the reliability and security ratings (see code_rules)
+The result has the same shape as the SonarQube measures (metric key -> string value).
+'''
+
+import io
+import ast
+import math
+import keyword
+import tokenize
+
+from metrics import get_module_cognitive_complexity
+from code_rules import check_code_rules
+
+# ----------------------------- Configuration -----------------------------
+
+# Bump when the computed metrics change (invalidates the metric store)
+STATIC_METRICS_VERSION = 1
+
+# Minimum number of consecutive code lines a duplicated block must span
+DUPLICATION_MIN_LINES = 4
+
+# Lower bound of the maintainability index (0-100) for each rating, from A (1.0) to D (4.0); below is E (5.0)
+MAINTAINABILITY_RATING_BOUNDS = [(85, "1.0"), (65, "2.0"), (40, "3.0"), (20, "4.0")]
+
+# Nodes adding one path to the cyclomatic complexity
+DECISION_NODES = (ast.If, ast.IfExp, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.Assert,
+                  ast.comprehension)
+
+# Tokens that are neither operators nor operands
+IGNORED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT,
+                  tokenize.ENCODING, tokenize.ENDMARKER}
+
+# ----------------------------- Halstead -----------------------------
+
+
+def get_halstead_metrics(tokens: list) -> dict:
+    """
+    Computes the Halstead metrics of a token stream: keywords and punctuation are operators,
+    names, numbers and strings are operands.
+
+    Args:
+        tokens (list): Tokens of the code (tokenize.TokenInfo).
+
+    Returns:
+        dict: vocabulary, length, volume, difficulty and effort.
+    """
+    operators, operands = [], []
+    for token in tokens:
+        if token.type in IGNORED_TOKENS:
+            continue
+        if token.type == tokenize.OP or keyword.iskeyword(token.string):
+            operators.append(token.string)
+        else:
+            operands.append(token.string)
+
+    distinct_operators, distinct_operands = len(set(operators)), len(set(operands))
+    vocabulary = distinct_operators + distinct_operands
+    length = len(operators) + len(operands)
+    volume = length * math.log2(vocabulary) if vocabulary > 1 else 0.0
+    difficulty = distinct_operators / 2 * len(operands) / distinct_operands if distinct_operands else 0.0
+    return {
+        "vocabulary": vocabulary,
+        "length": length,
+        "volume": volume,
+        "difficulty": difficulty,
+        "effort": difficulty * volume
+    }
+
+
+# ----------------------------- Cyclomatic Complexity -----------------------------
+
+
+def get_cyclomatic_complexity(tree: ast.AST) -> int:
+    """
+    Computes the cyclomatic complexity of a module: one path per function (or one for the
+    module when it has no function), plus one per decision point, comprehension filter,
+    match case and extra boolean operand.
+    """
+    functions = 0
+    decisions = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            functions += 1
+        elif isinstance(node, ast.BoolOp):
+            decisions += len(node.values) - 1
+        elif isinstance(node, ast.match_case):
+            decisions += 1
+        if isinstance(node, DECISION_NODES):
+            decisions += 1
+        if isinstance(node, ast.comprehension):
+            decisions += len(node.ifs)
+    return max(functions, 1) + decisions
+
+
+# ----------------------------- Lines -----------------------------
+
+
+def get_docstring_lines(tree: ast.AST) -> set:
+    """
+    Returns the line numbers taken by docstrings (module, classes and functions).
+    """
+    lines = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and node.body:
+            first = node.body[0]
+            if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) \
+                    and isinstance(first.value.value, str):
+                lines.update(range(first.lineno, first.end_lineno + 1))
+    return lines
+
+
+def get_line_metrics(code: str, tokens: list, tree: ast.AST) -> dict:
+    """
+    Counts the physical lines, the lines of code (NCLOC) and the comment lines.
+
+    Returns:
+        dict: loc, ncloc, comment_lines and code_lines (line numbers holding code).
+    """
+    docstring_lines = get_docstring_lines(tree)
+    code_lines, comment_lines = set(), set(docstring_lines)
+    for token in tokens:
+        if token.type == tokenize.COMMENT:
+            comment_lines.add(token.start[0])
+        elif token.type not in IGNORED_TOKENS and token.start[0] not in docstring_lines:
+            code_lines.update(range(token.start[0], token.end[0] + 1))
+    return {
+        "loc": len(code.splitlines()),
+        "ncloc": len(code_lines),
+        "comment_lines": len(comment_lines),
+        "code_lines": sorted(code_lines)
+    }
+
+
+def get_duplicated_lines(code: str, code_lines: list) -> int:
+    """
+    Counts the code lines belonging to a block of at least DUPLICATION_MIN_LINES consecutive
+    code lines that appears more than once (after stripping indentation and inline spacing).
+    """
+    source_lines = code.splitlines()
+    normalized = [" ".join(source_lines[number - 1].split()) for number in code_lines]
+
+    windows = {}
+    for start in range(len(normalized) - DUPLICATION_MIN_LINES + 1):
+        window = tuple(normalized[start:start + DUPLICATION_MIN_LINES])
+        windows.setdefault(window, []).append(start)
+
+    duplicated = set()
+    for starts in windows.values():
+        if len(starts) > 1:
+            for start in starts:
+                duplicated.update(range(start, start + DUPLICATION_MIN_LINES))
+    return len(duplicated)
+
+
+# ----------------------------- Maintainability -----------------------------
+
+
+def get_maintainability_index(volume: float, cyclomatic: int, ncloc: int, comment_lines: int) -> float:
+    """
+    Computes the maintainability index, rescaled to 0-100 (comment-weighted SEI formula).
+    """
+    if ncloc == 0:
+        return 100.0
+    comments = 100 * comment_lines / (ncloc + comment_lines)
+    index = (171 - 5.2 * math.log(max(volume, 1)) - 0.23 * cyclomatic - 16.2 * math.log(ncloc)
+             + 50 * math.sin(math.sqrt(2.4 * math.radians(comments))))
+    return min(100.0, max(0.0, index * 100 / 171))
+
+
+def get_maintainability_rating(maintainability_index: float) -> str:
+    """
+    Maps the maintainability index to a rating in the SonarQube format ("1.0" = A ... "5.0" = E).
+    """
+    for bound, rating in MAINTAINABILITY_RATING_BOUNDS:
+        if maintainability_index >= bound:
+            return rating
+    return "5.0"
+
+
+# ----------------------------- Analysis -----------------------------
+
+
+def get_static_metrics(code: str) -> dict:
+    """
+    Computes the maintainability metrics of a solution snippet in the calling process.
+
+    Args:
+        code (str): Python source code to analyze.
+
+    Returns:
+        dict: Metric key -> value as a string, with the SonarQube keys (cognitive_complexity, security_rating,
+        reliability_rating, sqale_rating, bugs, vulnerabilities, code_smells, duplicated_lines_density, ncloc)
+        plus loc, comment_lines, cyclomatic_complexity, halstead_volume, halstead_effort and maintainability_index.
+        Empty if the code does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (SyntaxError, ValueError, tokenize.TokenError) as e:
+        print(f"[!] Static analysis failed: {e}")
+        return {}
+
+    halstead = get_halstead_metrics(tokens)
+    cyclomatic = get_cyclomatic_complexity(tree)
+    lines = get_line_metrics(code, tokens, tree)
+    duplicated = get_duplicated_lines(code, lines["code_lines"])
+    maintainability_index = get_maintainability_index(halstead["volume"], cyclomatic,
+                                                      lines["ncloc"], lines["comment_lines"])
+
+    cognitive = get_module_cognitive_complexity(code)
+    cognitive_complexity = cognitive["total"] if cognitive["total"] >= 0 else cognitive["module"]
+    issues = check_code_rules(code, tree)
+
+    return {
+        "cognitive_complexity": str(cognitive_complexity),
+        "security_rating": issues["security_rating"],
+        "reliability_rating": issues["reliability_rating"],
+        "sqale_rating": get_maintainability_rating(maintainability_index),
+        "bugs": str(issues["bugs"]),
+        "vulnerabilities": str(issues["vulnerabilities"]),
+        "code_smells": str(issues["code_smells"]),
+        "duplicated_lines_density": f"{100 * duplicated / lines['ncloc'] if lines['ncloc'] else 0:.1f}",
+        "ncloc": str(lines["ncloc"]),
+        "loc": str(lines["loc"]),
+        "comment_lines": str(lines["comment_lines"]),
+        "cyclomatic_complexity": str(cyclomatic),
+        "halstead_volume": f"{halstead['volume']:.2f}",
+        "halstead_effort": f"{halstead['effort']:.2f}",
+        "maintainability_index": f"{maintainability_index:.2f}"
+    }
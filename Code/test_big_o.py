@@ -0,0 +1,62 @@
+import pytest
+
+from big_o import compare_complexities, get_dominance_ranks, normalize_complexity, parse_complexity
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("O(nlog2n)", "O(n log n)"),
+    ("O(nlog_2n)", "O(n log n)"),
+    ("O(n log2 n)", "O(n log n)"),
+    ("O(exp(n))", "O(e^n)"),
+    ("O(e^n)", "O(e^n)"),
+    ("O(n^k)", "O(n^k)"),
+    ("O(b^d)", "O(b^d)"),
+    ("O(log log n)", "O(log log n)"),
+    ("O(n log(log n))", "O(n log log n)"),
+    ("O(V + E)", "O(e + v)"),
+    ("O(E^2)", "O(e^2)"),
+])
+def test_normalize(text, expected):
+    assert normalize_complexity(text) == expected
+
+
+def test_exponentials():
+    assert compare_complexities("O(exp(n))", "O(e^n)") == 0
+    assert compare_complexities("O(2^n)", "O(e^n)") == -1
+    assert compare_complexities("O(n^3)", "O(exp(n))") == -1
+
+
+def test_nested_logarithms():
+    assert compare_complexities("O(log log n)", "O(log n)") == -1
+    assert compare_complexities("O(log log n)", "O(1)") == 1
+
+
+def test_symbolic_exponents():
+    # The order of n^k against a fixed power depends on k
+    assert compare_complexities("O(n^k)", "O(n^2)") is None
+    assert parse_complexity("O(n^k + n^k)") == parse_complexity("O(n^k)")
+    assert compare_complexities("O(b^d)", "O(b^d + 1)") == 0
+
+
+@pytest.mark.parametrize("text", ["O(10^1000)", "O(2^1000000)", "O(" + "(" * 5000 + "n" + ")" * 5000 + ")"])
+def test_unparseable_on_overflow_or_deep_nesting(text):
+    assert normalize_complexity(text) == text.lower()
+    assert compare_complexities(text, "O(n)") is None
+    assert get_dominance_ranks({0: text, 1: "O(n)"}) == {0: 2, 1: 0}
+
+
+def test_power_is_right_associative():
+    assert normalize_complexity("O(n^2^2)") == "O(n^4)"
+    assert normalize_complexity("O(2^n^2)") != "O(4^n)"
+    assert compare_complexities("O(2^n^2)", "O(4^n)") is None
+
+
+def test_base_close_to_one_stays_exponential():
+    assert normalize_complexity("O(1.0000001^n)") == "O(1.0000001^n)"
+    assert compare_complexities("O(1.0000001^n)", "O(1)") == 1
+    assert compare_complexities("O(1.0000001^n)", "O(1.0000002^n)") == -1
+
+
+def test_unparseable_ranked_last():
+    ranks = get_dominance_ranks({0: "O(n +)", 1: "O(2^n)", 2: "O(n)", 3: None})
+    assert ranks[2] < ranks[1] < ranks[0] == ranks[3]
@@ -0,0 +1,35 @@
+from code_rules import check_code_rules
+
+
+def get_rules(code):
+    return check_code_rules(code)["rules"]
+
+
+def test_import_used_in_parameter_annotation():
+    code = "import numpy as np\n\ndef task_func(x: np.ndarray):\n    return x\n"
+    assert "unused-import" not in get_rules(code)
+
+
+def test_import_used_in_keyword_only_and_variadic_annotations():
+    code = ("import pandas as pd\nimport numpy as np\nfrom typing import Any\n\n"
+            "def task_func(*args: Any, key: pd.DataFrame = None, **kwargs: np.ndarray):\n"
+            "    return args, key, kwargs\n")
+    assert "unused-import" not in get_rules(code)
+
+
+def test_import_used_in_return_and_string_annotations():
+    code = ("from typing import List\nimport pandas as pd\n\n"
+            "def task_func(x: 'pd.DataFrame') -> List[int]:\n    return list(x)\n")
+    assert "unused-import" not in get_rules(code)
+
+
+def test_import_used_in_variable_annotation():
+    code = "import numpy as np\n\ndef task_func():\n    x: np.ndarray = None\n    return x\n"
+    assert "unused-import" not in get_rules(code)
+
+
+def test_unused_import_still_reported():
+    code = "import numpy as np\nimport os\n\ndef task_func(x: np.ndarray):\n    return x\n"
+    result = check_code_rules(code)
+    assert result["rules"] == {"unused-import": 1}
+    assert result["issues"][0]["message"] == "Import 'os' is never used"
@@ -0,0 +1,233 @@
+'''
+This file contains a sandboxed micro-timing harness for candidate code:
+    - The function under test is named explicitly (e.g. task_func) and runs in a separate process
+    - The number of iterations per measurement is auto-ranged, after a warm-up
+    - Candidates that modify their inputs get a deep copy of them for every call, made outside the timed region
+    - What the candidate prints is discarded, so the report is the only output of the run
+    - Measurements are repeated to give the median with a confidence interval
+    - The peak memory allocated by one call is traced separately (tracemalloc), outside the timed runs
+    - Several candidates can be timed at once, each pinned to its own CPU core
+'''
+
+import json
+import math
+import os
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+from sandbox import run_code, get_default_workers
+
+# ----------------------------- Configuration -----------------------------
+
+# Number of repeated measurements per input (each one runs `number` iterations)
+DEFAULT_REPEAT = 15
+
+# Minimum duration (seconds) of a single measurement; the iteration count is raised until reached
+DEFAULT_MIN_TIME = 0.05
+
+# z-score of the confidence level used for the median interval (95%)
+CONFIDENCE_Z = 1.96
+
+# Wall-clock timeout (seconds) for a whole timing run
+DEFAULT_TIMEOUT = 120
+
+TIMING_PROGRAM = """
+import gc
+import os
+import sys
+import copy
+import json
+import time
+import tracemalloc
+
+SOURCE, FUNC_NAME, CALLS = {source!r}, {func_name!r}, {calls!r}
+REPEAT, MIN_TIME, CORE, TRACE_MEMORY = {repeat!r}, {min_time!r}, {core!r}, {trace_memory!r}
+
+if CORE is not None and hasattr(os, "sched_setaffinity"):
+    try:
+        os.sched_setaffinity(0, {{CORE}})
+    except OSError:
+        pass
+
+# Only the report goes to the captured stdout: the candidate's prints could push it past the output limit
+report = sys.stdout
+sys.stdout = open(os.devnull, "w")
+
+namespace = {{"__name__": "candidate"}}
+exec(compile(SOURCE, "solution.py", "exec"), namespace)
+func = namespace.get(FUNC_NAME)
+if not callable(func):
+    print(json.dumps({{"error": f"Function {{FUNC_NAME}} not found", "results": []}}), file=report)
+    raise SystemExit(0)
+
+
+def warm_up(args, kwargs):
+    # First call (imports, caches, lazy initialization), on a copy: tells whether the function modifies its inputs
+    call_args, call_kwargs = copy.deepcopy((args, kwargs))
+    func(*call_args, **call_kwargs)
+    try:
+        return bool((call_args, call_kwargs) != (args, kwargs))
+    except Exception:
+        return True
+
+
+def prepare(args, kwargs, number, fresh):
+    # Functions modifying their inputs get a fresh copy per call; the others share them, as copying costs microseconds
+    if fresh:
+        return [copy.deepcopy((args, kwargs)) for _ in range(number)]
+    return [(args, kwargs)] * number
+
+
+def measure(calls):
+    timer = time.perf_counter
+    start = timer()
+    for args, kwargs in calls:
+        func(*args, **kwargs)
+    return timer() - start
+
+
+def measure_peak_memory(args, kwargs):
+    args, kwargs = copy.deepcopy((args, kwargs))
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+results = []
+for args, kwargs in CALLS:
+    try:
+        fresh = warm_up(args, kwargs)
+        number = 1
+        while True:  # auto-range: 1, 2, 5, 10, 20, 50, ... iterations
+            elapsed = measure(prepare(args, kwargs, number, fresh))
+            if elapsed >= MIN_TIME:
+                break
+            number = number * 5 // 2 if str(number)[0] == "2" else number * 2
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            samples = [measure(prepare(args, kwargs, number, fresh)) / number for _ in range(REPEAT)]
+        finally:
+            if gc_enabled:
+                gc.enable()
+        peak_memory = measure_peak_memory(args, kwargs) if TRACE_MEMORY else None
+        results.append({{"number": number, "samples": samples, "peak_memory": peak_memory, "error": None}})
+    except Exception as e:
+        results.append({{"number": 0, "samples": [], "peak_memory": None, "error": f"{{type(e).__name__}}: {{e}}"}})
+
+print(json.dumps({{"error": None, "results": results}}), file=report)
+"""
+
+# ----------------------------- Statistics -----------------------------
+
+
+def median_confidence_interval(samples, z=CONFIDENCE_Z):
+    """
+    Distribution-free confidence interval of the median, from the order statistics of the samples.
+
+    Args:
+        samples (list): Measured times.
+        z (float): z-score of the confidence level.
+
+    Returns:
+        tuple: (lower bound, upper bound)
+    """
+    ordered = sorted(samples)
+    n = len(ordered)
+    half_width = z * math.sqrt(n) / 2
+    lower = max(0, math.floor(n / 2 - half_width))
+    upper = min(n - 1, math.ceil(n / 2 + half_width) - 1)
+    return ordered[lower], ordered[upper]
+
+
+def summarize_samples(samples):
+    """
+    Summarizes per-call times: median with confidence interval, mean, standard deviation, minimum.
+    """
+    low, high = median_confidence_interval(samples)
+    return {
+        "median": statistics.median(samples),
+        "ci_low": low,
+        "ci_high": high,
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "min": min(samples),
+        "repeat": len(samples)
+    }
+
+
+# ----------------------------- Timing -----------------------------
+
+
+def time_function(code: str, calls: list, func_name="task_func", repeat=DEFAULT_REPEAT,
+                  min_time=DEFAULT_MIN_TIME, core=None, timeout=DEFAULT_TIMEOUT, trace_memory=True):
+    """
+    Times a function of the candidate code on each of the given inputs, in a sandbox process.
+
+    Args:
+        code (str): Complete candidate code (imports + code).
+        calls (list): Inputs as (args, kwargs) pairs of Python literals.
+        func_name (str): Name of the function under test.
+        repeat (int): Number of repeated measurements per input.
+        min_time (float): Minimum duration of a single measurement (seconds).
+        core (int | None): CPU core the process is pinned to (Linux only).
+        timeout (int): Wall-clock timeout of the whole run (seconds).
+        trace_memory (bool): Also measure the peak memory allocated by one call (bytes).
+
+    Returns:
+        dict: 'error' (None on success) and 'results': one dict per input with the
+        per-call statistics (see summarize_samples), 'number' of iterations, 'peak_memory' and 'error'.
+    """
+    calls = [(list(args), dict(kwargs)) for args, kwargs in calls]
+    program = TIMING_PROGRAM.format(source=code, func_name=func_name, calls=calls,
+                                    repeat=repeat, min_time=min_time, core=core, trace_memory=trace_memory)
+    outcome = run_code(program, timeout=timeout)
+
+    lines = outcome["stdout"].strip().splitlines()
+    if outcome["returncode"] != 0 or not lines:
+        stderr_lines = outcome["stderr"].strip().splitlines()
+        return {"error": stderr_lines[-1] if stderr_lines else "Timing run failed.", "results": []}
+
+    try:
+        report = json.loads(lines[-1])
+        for result in report["results"]:
+            if result["samples"]:
+                result.update(summarize_samples(result.pop("samples")))
+    except (json.JSONDecodeError, KeyError):
+        return {"error": "Timing run produced no measurements.", "results": []}
+    return report
+
+
+def time_candidates_parallel(codes: list, calls: list, func_name="task_func", max_workers=None, **kwargs):
+    """
+    Times several candidates on the same inputs at once, each one in its own process
+    pinned to a separate CPU core (when there are enough cores).
+
+    Args:
+        codes (list): Complete code of each candidate.
+        calls (list): Inputs as (args, kwargs) pairs of Python literals.
+        func_name (str | list): Name of the function under test, or one name per candidate.
+        max_workers (int | None): Maximum number of candidates timed at once (default: CPU count).
+        **kwargs: Further options of time_function (repeat, min_time, timeout, trace_memory).
+
+    Returns:
+        list: One time_function report per candidate, in the same order as `codes`.
+    """
+    if not codes:
+        return []
+    func_names = func_name if isinstance(func_name, list) else [func_name] * len(codes)
+
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+    workers = min(max_workers or get_default_workers(), len(codes))
+    pin = len(cores) >= workers > 1  # pinning only helps when every job gets its own core
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(time_function, code, calls, name,
+                            core=cores[i % workers] if pin else None, **kwargs)
+            for i, (code, name) in enumerate(zip(codes, func_names))
+        ]
+        return [future.result() for future in futures]
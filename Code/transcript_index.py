@@ -0,0 +1,390 @@
+'''
+This file contains a streaming parser for the console transcripts of the experiments (the stdout
+captures under Analysis/) and a SQLite index of the events it extracts:
+    - The transcripts are read line by line, never as a whole: dataset dump, user prompts, responses,
+      voting rounds and votes, agreements, evaluator scores, final scores, test outcomes, execution times,
+      configuration (Infos files)
+    - Each event keeps its task, attempt (one per evaluation of the debate output), round and agent
+    - Transcripts that grow (runs still writing) are parsed from where the previous indexing stopped;
+      changed transcripts are parsed again, unchanged ones are skipped
+    - Round counts, vote histories, scores and latencies of all the runs are plain SQL queries
+Usage:
+    python transcript_index.py index ../Analysis
+    python transcript_index.py rounds | votes | scores | latency
+'''
+
+import os
+import re
+import sys
+import json
+import sqlite3
+import hashlib
+import pandas as pd
+
+from results_store import EVALUATION_CRITERIA
+
+# ----------------------------- Configuration -----------------------------
+
+# Index shared by all the transcripts
+TRANSCRIPT_INDEX_PATH = "transcripts.sqlite"
+
+# Seconds a writer waits for the lock held by another process
+BUSY_TIMEOUT = 60
+
+# Characters of a line kept in the text of an event (prompts and responses are not copied whole)
+TEXT_PREVIEW = 200
+
+# Events inserted per statement
+INSERT_BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    transcript_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    -- Bytes and lines parsed up to the last complete line, SHA-256 of those bytes, parser state there
+    parsed_offset INTEGER NOT NULL,
+    parsed_lines INTEGER NOT NULL,
+    parsed_digest TEXT NOT NULL,
+    parser_state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    transcript_id INTEGER NOT NULL REFERENCES transcripts (transcript_id),
+    line_no INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    task INTEGER,
+    attempt INTEGER,
+    round INTEGER,
+    agent INTEGER,
+    label TEXT,
+    value REAL,
+    text TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_kind ON events (kind, transcript_id);
+CREATE INDEX IF NOT EXISTS idx_events_transcript ON events (transcript_id, line_no);
+CREATE INDEX IF NOT EXISTS idx_transcripts_folder ON transcripts (folder);
+"""
+
+# ----------------------------- Parser -----------------------------
+
+# (kind, pattern, label) of the lines that are events; named groups: agent, label, value, text
+LINE_PATTERNS = [
+    ("dataset_task", re.compile(r"^\{'instruct_prompt': (?P<text>.*)$"), None),
+    ("user_prompt", re.compile(r"^User prompt: (?P<text>.*)$"), None),
+    ("response", re.compile(r"^Response developer (?P<agent>\d+): (?P<text>.*)$"), "developer"),
+    ("response", re.compile(r"^Response self-refined developer (?P<agent>\d+): (?P<text>.*)$"), "self-refined"),
+    ("response", re.compile(r"^Improved model (?P<agent>\d+) response: (?P<text>.*)$"), "improved"),
+    ("response", re.compile(r"^Response instant_runoff_voting : (?P<text>.*)$"), "instant_runoff_voting"),
+    ("response", re.compile(r"^Response$"), "single"),
+    ("round", re.compile(r"^Round (?P<value>\d+) - Voting$"), None),
+    ("vote", re.compile(r"^Feedback model (?P<agent>\d+): (?P<text>.*)$"), None),
+    ("agreement", re.compile(r"^(?P<text>Agreement.*)$"), None),
+    ("voting_error", re.compile(r"^VOTING ERROR FOR SOLUTION NUMBER (?P<value>-?\d+)"), None),
+    ("winner", re.compile(r"^Selected winner by .*: Candidate (?P<value>\d+)$"), "tie-break"),
+    ("tie", re.compile(r"^Tie between the following candidates"), None),
+    ("evaluation", re.compile(r"^Evaluation(?: - Round (?P<value>\d+))?$"), None),
+    ("score", re.compile(r"^Final code quality score: (?P<value>-?[\d.]+)$"), None),
+    ("execution_time", re.compile(r"^Execution time for (?P<label>.+): (?P<value>[\d.]+)s$"), None),
+    ("tests", re.compile(r"^(?P<text>All tests passed!|Some tests failed\.)$"), None),
+    ("correctness", re.compile(r"^Real correctness: (?P<text>.*)$"), None),
+    ("end", re.compile(r"^(?P<text>End (?:debate )?with .*?)(?::? (?P<value>-?[\d.]+))?$"), None),
+    ("exit", re.compile(r"^Process finished with exit code (?P<value>-?\d+)$"), None),
+    ("info", re.compile(r"^(?P<label>Programmer model adopted|Evaluator model adopted|Agents number|Maximum rounds)"
+                        r"\s*:\s*(?P<text>.*)$"), None),
+]
+
+COMMAND_PATTERN = re.compile(r'(?P<text>[^"\\/\s]+\.py)"?\s*$')
+
+# Criterion lines of the JSON output of the evaluator agent
+CRITERION_PATTERN = re.compile(r'^\s*"(?P<label>' + "|".join(map(re.escape, EVALUATION_CRITERIA)) +
+                               r')"\s*:\s*(?P<value>-?\d+)')
+
+
+def to_float(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+class TranscriptParser:
+    """
+    Line-by-line parser of a transcript. Its state is a small dict, so that parsing can stop after
+    any line and resume later (see TranscriptIndex.index_file).
+    """
+
+    def __init__(self, state=None):
+        self.state = dict(state or {"line_no": 0, "task": None, "attempt": None, "round": None,
+                                    "mode": None, "dataset_tasks": 0})
+
+    def event(self, kind, agent=None, label=None, value=None, text=None) -> tuple:
+        state = self.state
+        return (state["line_no"], kind, state["task"], state["attempt"], state["round"],
+                None if agent is None else int(agent), label, value,
+                None if text is None else text[:TEXT_PREVIEW])
+
+    def feed(self, line: str) -> list:
+        """
+        Parses the next line (without its line terminator).
+
+        Returns:
+            list: The events of the line, as (line_no, kind, task, attempt, round, agent, label, value, text).
+        """
+        state = self.state
+        state["line_no"] += 1
+
+        # The evaluator prompt embeds an example output: only the JSON that follows the evaluated response counts
+        if line.startswith("EVALUATION PROMPT"):
+            state["mode"] = "evaluation_prompt"
+            return []
+        if state["mode"] == "evaluation_prompt":
+            if line.startswith("## AI-generated Response"):
+                state["mode"] = "evaluated_response"
+            return []
+        if state["mode"] == "evaluated_response" and line.startswith("{"):
+            state["mode"] = "evaluation_output"
+        if state["mode"] == "evaluation_output":
+            if line.startswith("}"):
+                state["mode"] = None
+            match = CRITERION_PATTERN.match(line)
+            return [self.event("evaluation_score", label=match["label"], value=float(match["value"]))] if match else []
+
+        if state["line_no"] == 1 and ".py" in line:
+            match = COMMAND_PATTERN.search(line)
+            return [self.event("command", text=match["text"] if match else line)]
+
+        for kind, pattern, label in LINE_PATTERNS:
+            match = pattern.match(line)
+            if match is None:
+                continue
+            groups = match.groupdict()
+            if kind == "dataset_task":
+                state["dataset_tasks"] += 1
+                return [self.event(kind, value=state["dataset_tasks"] - 1, text=groups["text"])]
+            if kind == "user_prompt":
+                state["task"] = 0 if state["task"] is None else state["task"] + 1
+                state["attempt"], state["round"] = 0, None
+            elif kind == "round":
+                state["round"] = int(groups["value"])
+            elif kind == "evaluation":
+                state["mode"] = None
+
+            if kind == "tests":
+                value = float(groups["text"].startswith("All"))
+            else:
+                value = to_float(groups["value"] if groups.get("value") is not None else groups.get("text"))
+            event = self.event(kind, agent=groups.get("agent"), label=groups.get("label") or label, value=value,
+                               text=groups.get("text"))
+            if kind == "score":
+                # The debate restarts after an evaluation that is not good enough
+                state["attempt"] = 1 if state["attempt"] is None else state["attempt"] + 1
+                state["round"] = None
+            return [event]
+        return []
+
+
+def parse_transcript(file):
+    """
+    Streams the events of a transcript.
+
+    Args:
+        file: The transcript, opened in text mode (or any iterable of lines).
+
+    Yields:
+        tuple: Each event (see TranscriptParser.feed).
+    """
+    parser = TranscriptParser()
+    for line in file:
+        yield from parser.feed(line.rstrip("\r\n"))
+
+
+# ----------------------------- Index -----------------------------
+
+
+class TranscriptIndex:
+    """
+    Connection to the transcript index of one process.
+    """
+
+    def __init__(self, path=TRANSCRIPT_INDEX_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("BEGIN IMMEDIATE")
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                self.connection.execute(statement)
+        self.connection.execute("COMMIT")
+
+    def close(self):
+        self.connection.close()
+
+    def get_resume_point(self, transcript, path: str, size: int):
+        """
+        Where to resume parsing a transcript indexed before: after the lines already parsed if they are unchanged.
+
+        Returns:
+            tuple: (offset, lines, hash of the bytes up to the offset, parser state), or None to parse it again.
+        """
+        offset = transcript["parsed_offset"]
+        if size < offset:
+            return None
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            remaining = offset
+            while remaining:
+                block = f.read(min(remaining, 1 << 20))
+                if not block:
+                    return None
+                digest.update(block)
+                remaining -= len(block)
+        if digest.hexdigest() != transcript["parsed_digest"]:
+            return None
+        return offset, transcript["parsed_lines"], digest, json.loads(transcript["parser_state"])
+
+    def index_file(self, path: str, root: str) -> int:
+        """
+        Indexes a transcript, reading only what was not indexed yet.
+
+        Args:
+            path (str): Path to the transcript.
+            root (str): Folder the stored path is relative to (its name included).
+
+        Returns:
+            int: Number of new events.
+        """
+        relative_path = os.path.relpath(path, os.path.dirname(os.path.normpath(root))).replace(os.sep, "/")
+        stat = os.stat(path)
+        cursor = self.connection.cursor()
+        cursor.row_factory = sqlite3.Row
+        transcript = cursor.execute("SELECT * FROM transcripts WHERE path = ?", (relative_path,)).fetchone()
+        if transcript is not None and transcript["size"] == stat.st_size and transcript["mtime_ns"] == stat.st_mtime_ns:
+            return 0
+
+        resume_point = self.get_resume_point(transcript, path, stat.st_size) if transcript is not None else None
+        offset, lines, digest, state = resume_point or (0, 0, hashlib.sha256(), None)
+        parser = TranscriptParser(state)
+
+        count = 0
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            if transcript is None:
+                folder, name = relative_path.rsplit("/", 1) if "/" in relative_path else ("", relative_path)
+                transcript_id = self.connection.execute(
+                    "INSERT INTO transcripts (path, folder, name, size, mtime_ns, parsed_offset, parsed_lines, "
+                    "parsed_digest, parser_state) VALUES (?, ?, ?, 0, 0, 0, 0, '', '{}')",
+                    (relative_path, folder, name)).lastrowid
+            else:
+                transcript_id = transcript["transcript_id"]
+            # Events of lines parsed again: an unterminated last line, or everything for a changed transcript
+            self.connection.execute("DELETE FROM events WHERE transcript_id = ? AND line_no > ?", (transcript_id, lines))
+
+            events = []
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for raw in f:
+                    events.extend(parser.feed(raw.decode("utf-8", errors="replace").rstrip("\r\n")))
+                    # An unterminated last line may still be written: parse it, but resume before it next time
+                    if raw.endswith(b"\n"):
+                        offset += len(raw)
+                        lines += 1
+                        digest.update(raw)
+                        state = dict(parser.state)
+                    if len(events) >= INSERT_BATCH_SIZE:
+                        count += self.insert_events(transcript_id, events)
+                        events = []
+            count += self.insert_events(transcript_id, events)
+
+            self.connection.execute(
+                "UPDATE transcripts SET size = ?, mtime_ns = ?, parsed_offset = ?, parsed_lines = ?, parsed_digest = ?, "
+                "parser_state = ? WHERE transcript_id = ?",
+                (stat.st_size, stat.st_mtime_ns, offset, lines, digest.hexdigest(), json.dumps(state or {}),
+                 transcript_id))
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return count
+
+    def insert_events(self, transcript_id: int, events: list) -> int:
+        self.connection.executemany(
+            "INSERT INTO events (transcript_id, line_no, kind, task, attempt, round, agent, label, value, text) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", [(transcript_id,) + event for event in events])
+        return len(events)
+
+    def index_directory(self, root: str) -> int:
+        """
+        Indexes every transcript under a folder (e.g. Analysis/).
+
+        Returns:
+            int: Number of new events.
+        """
+        count = 0
+        for directory, _, names in os.walk(root):
+            for name in sorted(names):
+                count += self.index_file(os.path.join(directory, name), root)
+        return count
+
+    # ----------------------------- Queries -----------------------------
+
+    def query(self, sql: str, parameters=()) -> pd.DataFrame:
+        return pd.read_sql_query(sql, self.connection, params=parameters)
+
+    def get_round_counts(self) -> pd.DataFrame:
+        """
+        Voting rounds of each debate (one row per transcript, task and attempt).
+        """
+        return self.query(
+            "SELECT folder, name, task, attempt, COUNT(*) AS rounds, MAX(round) AS last_round "
+            "FROM events JOIN transcripts USING (transcript_id) WHERE kind = 'round' "
+            "GROUP BY transcript_id, task, attempt ORDER BY folder, name, task, attempt")
+
+    def get_vote_history(self, folder=None) -> pd.DataFrame:
+        """
+        Every vote (the agent, and the voted solution as 'vote' when it is a number), in order.
+        """
+        sql = ("SELECT folder, name, task, attempt, round, agent, value AS vote, text FROM events "
+               "JOIN transcripts USING (transcript_id) WHERE kind = 'vote'")
+        parameters = ()
+        if folder is not None:
+            sql += " AND folder = ?"
+            parameters = (folder,)
+        return self.query(sql + " ORDER BY folder, name, line_no", parameters)
+
+    def get_scores(self) -> pd.DataFrame:
+        """
+        Final code quality score of each attempt, with the scores of the evaluator criteria.
+        """
+        scores = self.query(
+            "SELECT folder, name, task, attempt, kind, label AS criterion, value FROM events "
+            "JOIN transcripts USING (transcript_id) WHERE kind IN ('score', 'evaluation_score')")
+        scores["criterion"] = scores["criterion"].where(scores["kind"] != "score", "Final score")
+        return scores.pivot_table(index=["folder", "name", "task", "attempt"], columns="criterion",
+                                  values="value", aggfunc="last").reset_index()
+
+    def get_latencies(self) -> pd.DataFrame:
+        """
+        Distribution of the execution times ('Execution time for ...' lines) by folder and system.
+        """
+        latencies = self.query(
+            "SELECT folder, label AS system, value AS seconds FROM events "
+            "JOIN transcripts USING (transcript_id) WHERE kind = 'execution_time'")
+        latencies["seconds"] = latencies["seconds"].astype(float)
+        return latencies.groupby(["folder", "system"])["seconds"].describe(percentiles=[0.5, 0.9, 0.99]).reset_index()
+
+
+if __name__ == "__main__":
+    index = TranscriptIndex()
+    if len(sys.argv) > 2 and sys.argv[1] == "index":
+        print(f"{index.index_directory(sys.argv[2])} new events indexed into {index.path}")
+    elif len(sys.argv) > 1 and sys.argv[1] in ("rounds", "votes", "scores", "latency"):
+        queries = {"rounds": index.get_round_counts, "votes": index.get_vote_history, "scores": index.get_scores,
+                   "latency": index.get_latencies}
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(queries[sys.argv[1]]())
+    else:
+        print(__doc__)
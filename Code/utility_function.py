@@ -2,16 +2,33 @@
     Helper functions used in debate strategies for multi-agent evaluation systems.
 """
 
-from metrics import extract_time_complexity
-import pandas as pd
-import py_compile
+from metrics import extract_time_complexity, get_analysis_pool, PARALLEL_BATCH_MIN
+from sandbox import run_test_job, run_tests_parallel, run_code
+from result_cache import ResultCache, make_key, normalize_code, get_environment_fingerprint
+from metric_cache import metric_cache
+from big_o import normalize_complexity, get_dominance_ranks
+from metric_store import metric_store
+from static_metrics import get_static_metrics, STATIC_METRICS_VERSION
+from code_rules import RULES_VERSION
+from results_store import ResultsStore, get_store_path, ANALYZER_KEY, SONARQUBE_ANALYZER, IN_PROCESS_ANALYZER
+from results_db import get_results_db, RESULTS_CSV_FIELDS
+import traceback
 import os
+import io
 import json
-import uuid
 import csv
+import hashlib
+import multiprocessing
 import requests
 import subprocess
 import shutil
+import shlex
+import tempfile
+import time
+import uuid
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 
 def extract_documentation(response_json):
@@ -77,9 +94,24 @@ def remove_duplicates(list_local):
     return result
 
 
+def get_declared_time_complexity(ai_response):
+    """
+        Returns the time complexity declared in a response, memoized by response.
+
+        Parameters:
+        - ai_response (str): JSON response with the 'time_complexity' field.
+
+        Returns:
+        - The normalized time complexity string.
+    """
+    key = metric_cache.make_key("time_complexity", ai_response)
+    return metric_cache.get_or_compute(key, lambda: extract_time_complexity(ai_response))
+
+
 def equals_time_complexity(solutions):
     """
-        Checks whether all solutions share the same time complexity.
+        Checks whether all solutions share the same time complexity
+        (equivalent spellings such as O(n log n) and O(N*log(N)) are equal).
 
         Parameters:
         - solutions (list of str): A list of code snippets or solution descriptions.
@@ -90,7 +122,7 @@ def equals_time_complexity(solutions):
 
     list_local = []
     for var in solutions:
-        list_local.append(extract_time_complexity(var))
+        list_local.append(normalize_complexity(get_declared_time_complexity(var)))
     print("Extracted time complexities: ")
     print(list_local)
     set_local = set(list_local)
@@ -136,6 +168,37 @@ def get_random_element(list_local):
     return random.choice(list_local)
 
 
+def get_fastest_element(candidates, benchmarks, time_complexities=None):
+    """
+        Deterministically selects one candidate from a tie, preferring the best declared
+        time complexity, then the lowest measured median runtime, then the lowest peak memory,
+        then the lowest index. Candidates without measurements come after the measured ones.
+
+        Parameters:
+        - candidates (list): Indices of the tied solutions.
+        - benchmarks (dict): Benchmark of each solution index (see Debate_strategies.benchmark_candidates).
+        - time_complexities (dict): Declared time complexity of each solution index (optional).
+
+        Returns:
+        - The selected index or None if the list is empty.
+    """
+
+    if not candidates:
+        return None
+
+    ranks = get_dominance_ranks({i: time_complexities[i] for i in candidates if i in time_complexities}) \
+        if time_complexities else {}
+
+    def key(i):
+        rank = ranks.get(i, len(candidates))
+        benchmark = (benchmarks or {}).get(i)
+        if not benchmark:
+            return rank, 1, float("inf"), float("inf"), int(i)
+        return rank, 0, benchmark["median"], benchmark["peak_memory"], int(i)
+
+    return min(candidates, key=key)
+
+
 def get_k_responses(response, feedback):
     """
         Retrieves specific elements from the response list based on feedback indices.
@@ -179,7 +242,44 @@ def get_formatted_code_solution(ai_response):
         return None
 
 
-def get_formatted_responses(responses, cognitive_complexity):
+def format_benchmark(benchmark):
+    """
+        Formats the measured runtime and peak memory of a solution for the debate prompt.
+
+        Parameters:
+        - benchmark (dict or None): Benchmark of the solution (see Debate_strategies.benchmark_candidates).
+
+        Returns:
+        - The MEDIAN RUNTIME and PEAK MEMORY lines.
+    """
+    if not benchmark:
+        return "\nMEDIAN RUNTIME: not measured\nPEAK MEMORY: not measured"
+    return (f"\nMEDIAN RUNTIME: {benchmark['median'] * 1e3:.4g} ms "
+            f"(95% CI {benchmark['ci_low'] * 1e3:.4g}-{benchmark['ci_high'] * 1e3:.4g} ms, "
+            f"{benchmark['inputs']} test input(s))"
+            f"\nPEAK MEMORY: {benchmark['peak_memory'] / 1024:.1f} KiB")
+
+
+def format_code_issues(code_issues):
+    """
+        Formats the bugs, vulnerabilities and code smells found in a solution for the debate prompt.
+
+        Parameters:
+        - code_issues (dict or None): Issues of the solution (see code_rules.check_code_rules).
+
+        Returns:
+        - The STATIC ANALYSIS line, followed by one line per issue.
+    """
+    if not code_issues or code_issues["error"]:
+        return "\nSTATIC ANALYSIS: not available"
+    text = (f"\nSTATIC ANALYSIS: {code_issues['bugs']} bug(s), {code_issues['vulnerabilities']} vulnerability(ies), "
+            f"{code_issues['code_smells']} code smell(s)")
+    for issue in code_issues["issues"]:
+        text += f"\n    - line {issue['line']}: {issue['message']} ({issue['type']}, {issue['severity']})"
+    return text
+
+
+def get_formatted_responses(responses, cognitive_complexity, benchmarks=None, code_issues=None):
     """
         Formats and annotates each solution with its cognitive and time complexity,
         producing a human-readable string block for each candidate.
@@ -187,28 +287,29 @@ def get_formatted_responses(responses, cognitive_complexity):
         Args:
             responses: Dictionary of code responses (JSON format).
             cognitive_complexity: Dictionary of cognitive complexity values.
+            benchmarks: Optional dictionary of measured runtime and peak memory of each solution.
+            code_issues: Optional dictionary of the bugs, vulnerabilities and code smells of each solution.
 
         Returns:
             Dictionary mapping each solution index to its formatted string.
         """
-    extracted_formatted_responses = {}
-    extracted_time_complexity = {}
-
     formatted_responses = {}
 
     string = "\n------\n"
 
     keys = responses.keys()
 
+    # Blocks of unchanged candidates are reused across debate rounds
     for i in keys:
-        extracted_formatted_responses[i] = get_formatted_code_solution(responses[i])
-        extracted_time_complexity[i] = extract_time_complexity(responses[i])
-
-    for i in keys:
-        formatted_responses[i] = (string + "SOLUTION: \n" + extracted_formatted_responses[i] +
-                                  "\nUNIQUE NUMBER OF SOLUTION: " + str(i) +
-                                  "\nTIME COMPLEXITY: " + extracted_time_complexity[i] +
-                                  "\nCOGNITIVE COMPLEXITY: " + str(cognitive_complexity[i]))
+        benchmark = format_benchmark(benchmarks.get(i)) if benchmarks is not None else ""
+        issues = format_code_issues(code_issues.get(i)) if code_issues is not None else ""
+        key = metric_cache.make_key("formatted_response", responses[i], i, cognitive_complexity[i],
+                                    benchmark, issues)
+        formatted_responses[i] = metric_cache.get_or_compute(key, lambda: (
+            string + "SOLUTION: \n" + get_formatted_code_solution(responses[i]) +
+            "\nUNIQUE NUMBER OF SOLUTION: " + str(i) +
+            "\nTIME COMPLEXITY: " + normalize_complexity(get_declared_time_complexity(responses[i])) +
+            "\nCOGNITIVE COMPLEXITY: " + str(cognitive_complexity[i]) + benchmark + issues))
 
     return formatted_responses
 
@@ -246,65 +347,127 @@ def get_feedback_value(json_data):
 
 # === COMPILE & RUN CODE IN TEMP FILE ===
 
-def save_and_test_code(full_code_str):
+# Persistent caches of execution outcomes (see result_cache.py)
+compile_run_cache = ResultCache("compile_run")
+test_results_cache = ResultCache("tests")
+
+
+def save_and_test_code(full_code_str, use_cache=True):
     """
-        Saves the provided Python code to a temp file, compiles it, and executes it.
+        Compiles the provided Python code in memory and executes it in a sandbox.
+
+        Clean outcomes are stored in the persistent result cache, so the same code is never
+        compiled and run twice in the same environment (timeouts, kills and crashes are not cached).
 
         Parameters:
         - full_code_str (str): Complete Python code to compile and run.
+        - use_cache (bool): Reuse a cached outcome for the same code, if available.
 
         Prints:
         - Compilation success or syntax error.
         - Runtime output or exception traceback.
+
+        Returns:
+        - True if the code compiled and ran without errors, False otherwise.
     """
 
-    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as tmp_file:
-        tmp_file.write(full_code_str)
-        tmp_filepath = tmp_file.name
+    key = make_key("compile_run", normalize_code(full_code_str), get_environment_fingerprint())
+    outcome = compile_run_cache.get(key) if use_cache else None
 
-    print(f"\n[INFO] Code saved to temporary file: {tmp_filepath}")
+    if outcome is not None:
+        print("\n[INFO] Compilation and execution outcome taken from cache")
+    else:
+        outcome = compile_and_run_code(full_code_str)
+        if not outcome.get("kill_reason") and outcome["returncode"] is not None:  # kills depend on the machine load
+            compile_run_cache.put(key, outcome)
 
-    # Prova a compilare
-    try:
-        py_compile.compile(tmp_filepath, doraise=True)
-        print(f"✓ Byte-code successfully generated for {os.path.basename(tmp_filepath)}")
-    except py_compile.PyCompileError as err:
+    if not outcome["compiled"]:
         print("🛑 SYNTAX ERROR during compilation:\n")
-        print(err.msg)
-        return
+        print(outcome["error"])
+        return False
 
-    # Execute the file in subprocess
-    completed = subprocess.run(
-        [sys.executable, tmp_filepath],
-        text=True,
-        capture_output=True
-    )
+    print("✓ Byte-code successfully generated (in memory)")
 
-    if completed.returncode == 0:
+    if outcome["returncode"] == 0:
         print("\n💬 PROGRAM OUTPUT ↓↓↓\n")
-        print(completed.stdout)
+        print(outcome["stdout"])
     else:
         print("\n🔥 RUNTIME EXCEPTION ↓↓↓\n")
-        print(completed.stderr)
+        print(outcome["stderr"])
 
-    # Delete temporary file
-    os.unlink(tmp_filepath)
+    return outcome["returncode"] == 0
 
 
-import tempfile
-import sys
-import re
+def compile_and_run_code(full_code_str) -> dict:
+    """
+        Compiles the code to bytecode in memory and executes it in a pooled sandbox child.
+
+        No source or bytecode file is written to disk: the syntax check is a plain
+        compile(), and the sandbox workspace lives on a RAM-backed filesystem when available.
+
+        Parameters:
+        - full_code_str (str): Complete Python code to compile and run.
+
+        Returns:
+        - Dictionary with 'compiled', 'error' (syntax error message), 'returncode', 'stdout', 'stderr'
+          and 'kill_reason' (why the sandbox killed the run, or None).
+    """
+
+    try:
+        compile(full_code_str, "solution.py", "exec")
+    except (SyntaxError, ValueError) as err:
+        error = "".join(traceback.format_exception_only(type(err), err))
+        return {"compiled": False, "error": error, "returncode": None, "stdout": "", "stderr": "", "kill_reason": None}
+
+    outcome = run_code(full_code_str)
+
+    return {
+        "compiled": True,
+        "error": None,
+        "returncode": outcome["returncode"],
+        "stdout": outcome["stdout"],
+        "stderr": outcome["stderr"],
+        "kill_reason": outcome.get("kill_reason")
+    }
+
 
 # === UNIT TEST EXECUTION & REPORTING ===
 
 
-def evaluate_code_with_tests(code: str, test_code: str) -> dict:
+def print_test_report(result):
+    """
+        Prints the outcome of each failed, errored or skipped test of a sandboxed run.
+
+        Parameters:
+        - result (dict): Test result returned by the sandbox.
+    """
+    for test in result["tests"]:
+        if test["outcome"] in ("success", "expected_failure"):
+            continue
+        print(f"[{test['outcome'].upper()}] {test['id']} ({test['duration']:.3f}s) {test.get('exc_type', '')}")
+        if "traceback" in test:
+            print(test["traceback"])
+        if "reason" in test:
+            print(f"Reason: {test['reason']}")
+
+    if result["error"]:
+        print(f"[!] {result['error']}")
+
+
+def evaluate_code_with_tests(code: str, test_code: str, failfast=False, libs=(), use_cache=True) -> dict:
     """
         Compiles and runs a given Python solution with its unittest-based test suite.
 
+        The suite runs in an isolated sandbox workspace (see sandbox.py), with CPU-time,
+        memory and per-test wall-clock limits.
+
         Parameters:
         - code (str): The user’s submitted code.
         - test_code (str): Test suite code in unittest format.
+        - failfast (bool): Stop at the first failing test. Use it for cheap pass/fail gating
+          (e.g. inside the debate loop) and keep full runs for the final report.
+        - libs (list): Libraries required by the task; their versions are part of the cache key.
+        - use_cache (bool): Reuse a cached outcome for the same code, tests and environment.
 
         Returns:
         - Dictionary with test results:
@@ -312,74 +475,167 @@ def evaluate_code_with_tests(code: str, test_code: str) -> dict:
             - tests_run: Number of tests executed.
             - tests_passed: Number of successful tests.
             - tests_failed: Number of failed or errored tests.
+            - tests_skipped: Number of skipped tests.
+            - kill_reason: Why the sandbox was killed ("timeout", "cpu_limit", "memory_limit", ...) or None.
     """
     print("[*] Starting code evaluation with tests...")
-    temp_dir = tempfile.mkdtemp(prefix="agent_eval_")
-    print(f"[*] Temporary folder created: {temp_dir}")
 
-    passed = False
-    tests_run = 0
-    tests_failed = 0
-    tests_passed = 0
-    output = ""
+    key = make_key("tests", normalize_code(code), test_code, failfast, get_environment_fingerprint(libs))
+    result = test_results_cache.get(key) if use_cache else None
 
-    try:
-        submission_path = os.path.join(temp_dir, "submission.py")
-        with open(submission_path, "w", encoding="utf-8") as f:
-            f.write(code)
+    if result is not None:
+        print("[*] Test results taken from cache")
+    else:
+        result = run_test_job(code, test_code, failfast=failfast)
+        if result["error"] is None:  # timeouts and kills may depend on the machine load
+            test_results_cache.put(key, result)
 
-        test_path = os.path.join(temp_dir, "test_case.py")
-        with open(test_path, "w", encoding="utf-8") as f:
-            f.write("from submission import task_func\n" + test_code)
+    print_test_report(result)
+    print(f"[✔️] Tests run: {result['tests_run']}, Passed: {result['tests_passed']}, Failed: {result['tests_failed']}")
 
-        result = subprocess.run(
-            [sys.executable, "-m", "unittest", "test_case"],
-            cwd=temp_dir,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            timeout=20
-        )
+    return {
+        "passed": result["passed"],
+        "tests_run": result["tests_run"],
+        "tests_passed": result["tests_passed"],
+        "tests_failed": result["tests_failed"],
+        "tests_skipped": result["tests_skipped"],
+        "kill_reason": result["kill_reason"]
+    }
 
-        output = result.stdout.decode() + result.stderr.decode()
-        print("OUTPUT TESTS\n\n---" + output)
 
-    except subprocess.TimeoutExpired:
-        output += "\n[!] Test execution timed out."
-        print(output)
-    except Exception as e:
-        output += f"\n[!] Exception occurred during testing: {e}"
-        print(output)
-    finally:
-        match_run = re.search(r"Ran (\d+) tests?", output)
-        if match_run:
-            tests_run = int(match_run.group(1))
-
-        match_failed = re.search(r"FAILED \(failures=(\d+)(?:, errors=(\d+))?", output)
-        if match_failed:
-            failures = int(match_failed.group(1))
-            errors = int(match_failed.group(2)) if match_failed.group(2) else 0
-            tests_failed = failures + errors
-        else:
-            match_errors = re.search(r"FAILED \(errors=(\d+)\)", output)
-            if match_errors:
-                tests_failed = int(match_errors.group(1))
+def evaluate_candidates_with_tests(jobs, max_workers=None, failfast=False) -> list:
+    """
+        Runs many candidate solutions against their test suites in parallel,
+        each one in its own sandbox workspace.
 
-        tests_passed = tests_run - tests_failed
-        passed = tests_failed == 0
+        Parameters:
+        - jobs (list): List of (code, test_code) tuples, e.g. every agent's candidate
+          for the same task or the final answers of a batch of tasks.
+        - max_workers (int): Maximum number of concurrent test suites (default: CPU count).
+        - failfast (bool): Stop each suite at its first failing test.
 
-        shutil.rmtree(temp_dir)
-        print(f"[✔️] Tests run: {tests_run}, Passed: {tests_passed}, Failed: {tests_failed}")
+        Returns:
+        - List of test result dictionaries (same keys as evaluate_code_with_tests), in job order.
+    """
+    print(f"[*] Running {len(jobs)} test suites in parallel...")
+    results = run_tests_parallel(jobs, max_workers=max_workers, failfast=failfast)
 
-    return {
-        "passed": passed,
-        "tests_run": tests_run,
-        "tests_passed": tests_passed,
-        "tests_failed": tests_failed
-    }
+    for i, result in enumerate(results):
+        print(f"\n--- Job {i} ---")
+        print_test_report(result)
+        print(f"[✔️] Tests run: {result['tests_run']}, Passed: {result['tests_passed']}, Failed: {result['tests_failed']}")
+
+    return [{
+        "passed": result["passed"],
+        "tests_run": result["tests_run"],
+        "tests_passed": result["tests_passed"],
+        "tests_failed": result["tests_failed"],
+        "tests_skipped": result["tests_skipped"],
+        "kill_reason": result["kill_reason"]
+    } for result in results]
+
+
+def get_bigcodebench_test_code(libs, test):
+    """
+        Builds the test suite of a BigCodeBench task, prefixed by the imports of its libraries.
+
+        Parameters:
+        - libs (list): Libraries required by the task.
+        - test (str): Unit tests of the task.
+
+        Returns:
+        - The test code to run against a candidate solution.
+    """
+    imports_str = ""
+    for value in libs:
+        imports_str += "import " + value + "\n"
+    return imports_str + test
+
+
+def get_declared_test_inputs(responses):
+    """
+        Collects the distinct 'test_inputs' declared in candidate responses (schema_inputs format).
+
+        Parameters:
+        - responses (list): JSON responses of the candidates.
+
+        Returns:
+        - A list of (args, kwargs) pairs.
+    """
+    test_inputs = []
+    for response in responses:
+        try:
+            inputs = json.loads(response).get("test_inputs", [])
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        for test_input in inputs:
+            if isinstance(test_input, dict):
+                call = (test_input.get("args", []), test_input.get("kwargs", {}))
+                if call not in test_inputs:
+                    test_inputs.append(call)
+    return test_inputs
+
+
+def get_smoke_test_code(responses):
+    """
+        Builds a unittest suite from the 'test_inputs' declared in candidate responses
+        (schema_inputs format). Each input becomes a test that calls task_func with it
+        and only checks that no exception is raised.
+
+        Parameters:
+        - responses (list): JSON responses of the candidates.
+
+        Returns:
+        - The test code, or None if no candidate declares test inputs.
+    """
+    test_inputs = get_declared_test_inputs(responses)
+
+    if not test_inputs:
+        return None
+
+    test_code = "import unittest\n\nclass TestDeclaredInputs(unittest.TestCase):\n"
+    for i, (args, kwargs) in enumerate(test_inputs):
+        test_code += f"    def test_input_{i}(self):\n        task_func(*{args!r}, **{kwargs!r})\n\n"
+    return test_code
 
 
 # === CSV LOGGING FOR EXPERIMENT RESULTS ===
 
+# Also log every row to the columnar results store next to the CSV (see results_store)
+SAVE_RESULTS_STORE = True
+
+# Also log every row, with its debate rounds, to the SQLite results database (see results_db)
+SAVE_RESULTS_DB = True
+
+
+@contextmanager
+def locked_file(file):
+    """
+        Holds an exclusive lock on an open file, so that concurrent processes append to it one at a time.
+
+        Parameters:
+        - file: The open file object.
+        """
+    if os.name == "nt":
+        import msvcrt
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield file
+        finally:
+            file.flush()
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield file
+        finally:
+            file.flush()
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
 def save_task_data_to_csv(
         filepath: str,
         task_id,
@@ -397,112 +653,359 @@ def save_task_data_to_csv(
         time,
         debate_strategy,
         tests_success,
-        test_fails
+        test_fails,
+        rounds=None
 ):
     """
         Appends experiment data to a CSV file for analysis and tracking.
 
-        Creates the file with headers if it does not already exist.
+        Creates the file with headers if it does not already exist (decided under a file lock, so
+        concurrent runs do not write the header twice or interleave rows). When SAVE_RESULTS_STORE is set,
+        the row is also appended, with typed metric columns, to the results store next to the CSV;
+        when SAVE_RESULTS_DB is set, it is also inserted in the results database with its debate rounds.
 
         Parameters:
         - filepath (str): CSV file path to write to.
+        - rounds (list): Optional debate rounds of the task (see Debate_strategies.debate_rounds).
         - All other parameters represent recorded metrics for a test run.
         """
 
-    # Check if the file exists
-    file_exists = os.path.isfile(filepath)
-
-    with open(filepath, mode='a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = [
-            'task_id',
-            'instruct_prompt',
-            'canonical_solution',
-            'code_multiagent_system',
-            'documentation',
-            'cognitive_complexity',
-            'time_complexity',
-            'evaluation_feedback',
-            'number_agents',
-            'metrics_sonarqube',
-            'type_models',
-            'max_rounds',
-            'time',
-            'debate_strategy',
-            'tests_success',
-            'test_fails'
-        ]
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        # Write fields only if the file doesn't exist
-        if not file_exists:
+    row = {
+        'task_id': task_id,
+        'instruct_prompt': instruct_prompt,
+        'canonical_solution': canonical_solution,
+        'code_multiagent_system': code_multiagent_system,
+        'documentation': documentation,
+        'cognitive_complexity': cognitive_complexity,
+        'time_complexity': time_complexity,
+        'evaluation_feedback': evaluation,
+        'metrics_sonarqube': metrics_sonarqube,
+        'number_agents': no_agents,
+        'type_models': type_models,
+        'max_rounds': max_rounds,
+        'time': time,
+        'debate_strategy': debate_strategy,
+        'tests_success': tests_success,
+        'test_fails': test_fails
+    }
+
+    # The lock is held on a separate file, so that update_csv_sonarqube_metrics can replace the CSV while holding it
+    with open(f"{filepath}.lock", mode='a') as lock_file, locked_file(lock_file), \
+            open(filepath, mode='a', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=RESULTS_CSV_FIELDS)
+
+        # Write fields only if the file is empty
+        csvfile.seek(0, os.SEEK_END)
+        if csvfile.tell() == 0:
             writer.writeheader()
 
         # Write data
-        writer.writerow({
-            'task_id': task_id,
-            'instruct_prompt': instruct_prompt,
-            'canonical_solution': canonical_solution,
-            'code_multiagent_system': code_multiagent_system,
-            'documentation': documentation,
-            'cognitive_complexity': cognitive_complexity,
-            'time_complexity': time_complexity,
-            'evaluation_feedback': evaluation,
-            'metrics_sonarqube': metrics_sonarqube,
-            'number_agents': no_agents,
-            'type_models': type_models,
-            'max_rounds': max_rounds,
-            'time': time,
-            'debate_strategy': debate_strategy,
-            'tests_success': tests_success,
-            'test_fails': test_fails
-        })
+        writer.writerow(row)
+
+    if SAVE_RESULTS_STORE:
+        ResultsStore(get_store_path(filepath)).append([row])
+
+    if SAVE_RESULTS_DB:
+        get_results_db().save_results([row], os.path.basename(filepath), rounds=[rounds])
 
 
 # === SONARQUBE INTEGRATION FOR CODE QUALITY ANALYSIS ===
 
 # === CONFIGURATION ===
-SONAR_HOST = "http://localhost:9000"
-SONAR_TOKEN = "MY_TOKEN"
-SONAR_SCANNER_CMD = "C:\\sonar-scanner-7.1.0.4889-windows-x64\\bin\\sonar-scanner.bat"
-project_key = "MY_PROJECT_KEY"
+SONAR_HOST = os.environ.get("SONAR_HOST", "http://localhost:9000")
+SONAR_TOKEN = os.environ.get("SONAR_TOKEN", "MY_TOKEN")
+SONAR_SCANNER_CMD = os.environ.get("SONAR_SCANNER_CMD",
+                                   "C:\\sonar-scanner-7.1.0.4889-windows-x64\\bin\\sonar-scanner.bat")
+project_key = "MY_PROJECT_KEY"  # prefix of the key of every analysis (each run gets its own project, deleted after)
+
+# Measures requested to SonarQube for each analyzed file
+SONAR_METRIC_KEYS = [
+    "cognitive_complexity",
+    "security_rating",
+    "reliability_rating",
+    "sqale_rating",  # maintainability rating
+    "bugs",
+    "vulnerabilities",
+    "code_smells",
+    "coverage",
+    "duplicated_lines_density",
+    "ncloc"
+]
+
+# Maximum number of solutions analyzed by a single scanner run, and page size of the component tree API
+SONAR_BATCH_SIZE = 200
+SONAR_PAGE_SIZE = 500
+
+# Maximum number of scanner runs at once
+SONAR_MAX_CONCURRENT_SCANS = 2
+
+# Polling of the background task that computes the measures after a scan (seconds)
+SONAR_TASK_POLL_INTERVAL = 1.0
+SONAR_TASK_TIMEOUT = 300
+
+# Timeout of a single HTTP request to SonarQube (seconds)
+SONAR_REQUEST_TIMEOUT = 30
+
+# Run the SonarQube scanner (slow, needs a running server) instead of the in-process metric engine
+USE_SONARQUBE = False
+
+# Bump when the SonarQube configuration or rules change (invalidates the metric store)
+SONAR_ANALYZER_VERSION = 1
+
+
+def analyze_code_metrics(code: str, use_sonarqube=USE_SONARQUBE) -> dict:
+    """
+        Computes the code quality metrics of the given code, in-process by default (see static_metrics)
+        or through SonarQube as the optional slow path. Code analyzed before is read from the metric store.
+
+        Parameters:
+        - code (str): Python source code to analyze.
+        - use_sonarqube (bool): Analyze the code with SonarQube instead of the in-process engine.
+
+        Returns:
+        - Dictionary of metrics (metric key -> value), empty if the analysis failed.
+        """
+    if not use_sonarqube:
+        # Lines of code and comment density depend on the layout: it is part of the key
+        return metric_store.get_or_compute("static_metrics", [STATIC_METRICS_VERSION, RULES_VERSION], code,
+                                           get_static_metrics, normalize=False)
+
+    _, metrics = analyze_code_sonarqube(code)
+    return metrics if isinstance(metrics, dict) else {}
+
+
+def format_metrics_text(metrics: dict, use_sonarqube=USE_SONARQUBE) -> str:
+    """
+        Formats metrics for the 'metrics_sonarqube' field of the results CSV: a first line naming the analyzer
+        (see results_store.ANALYZER_KEY), so that SonarQube and in-process measures are never compared,
+        then one "metric: value" line per measure.
+
+        Parameters:
+        - metrics (dict): Metrics of analyze_code_metrics.
+        - use_sonarqube (bool): The metrics were computed by SonarQube.
+
+        Returns:
+        - The field text, empty if there are no metrics (the analysis failed: update_csv_sonarqube_metrics retries).
+        """
+    if not metrics:
+        return ""
+    analyzer = SONARQUBE_ANALYZER if use_sonarqube else IN_PROCESS_ANALYZER
+    return f"{ANALYZER_KEY}: {analyzer}\n" + "".join(f"{metric}: {value}\n" for metric, value in metrics.items())
+
+
+@lru_cache(maxsize=None)
+def get_sonar_session() -> requests.Session:
+    """
+        Returns the HTTP session shared by all the requests to SonarQube (pooled keep-alive connections).
+        """
+    session = requests.Session()
+    session.auth = (SONAR_TOKEN, "")
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, 2 * SONAR_MAX_CONCURRENT_SCANS))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_sonar_store_version() -> list:
+    """
+        Version of the SonarQube analyses in the metric store (measures of different servers are kept apart).
+        """
+    return [SONAR_ANALYZER_VERSION, SONAR_HOST]
+
+
+def get_run_project_key() -> str:
+    """
+        Returns a new project key, so that concurrent or back-to-back analyses never read each other's measures.
+        The project is deleted once its measures are read (see delete_sonar_project).
+        """
+    return f"{project_key}_{uuid.uuid4().hex}"
+
+
+def delete_sonar_project(run_key: str):
+    """
+        Deletes the SonarQube project of an analysis, so that the server does not keep one project per analysis.
+
+        Parameters:
+        - run_key (str): Project key of the analysis.
+        """
+    try:
+        r = get_sonar_session().post(f"{SONAR_HOST}/api/projects/delete", data={"project": run_key},
+                                     timeout=SONAR_REQUEST_TIMEOUT)
+        r.raise_for_status()
+    except Exception as e:
+        print(f"[!] SonarQube project {run_key} not deleted: {e}")
 
 
 def analyze_code_sonarqube(code: str) -> tuple[str, dict]:
     """
         Analyzes the given code using SonarQube and retrieves its metrics.
+        Code analyzed before is not scanned again: its metrics are read from the metric store.
 
         Parameters:
         - code (str): Python source code to analyze.
 
         Returns:
-        - Tuple containing the project key and a dictionary of SonarQube metrics.
+        - Tuple containing the project key (None for stored metrics) and a dictionary of SonarQube metrics.
         """
+    store_key = metric_store.make_key("sonarqube", get_sonar_store_version(), code, normalize=False)
+    stored = metric_store.get(store_key)
+    if stored is not None:
+        return None, stored
 
-    tmp_dir = f"./temp_sonar_{uuid.uuid4().hex[:6]}"
-    os.makedirs(tmp_dir, exist_ok=True)
+    run_key = get_run_project_key()
 
-    # Salva codice
-    code_path = os.path.join(tmp_dir, "solution.py")
-    with open(code_path, "w") as f:
-        f.write(code)
+    tmp_dir = tempfile.mkdtemp(prefix="temp_sonar_", dir=".")
+    try:
+        # Salva codice
+        with open(os.path.join(tmp_dir, "solution.py"), "w") as f:
+            f.write(code)
 
+        task_id = run_sonar_scanner(tmp_dir, run_key)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if task_id is None:
+        return run_key, -1
+    try:
+        if not wait_for_sonar_task(task_id):
+            return run_key, -1
+        other_measures = get_all_sonar_metrics(run_key)
+    finally:
+        delete_sonar_project(run_key)
+    metric_store.put(store_key, other_measures)
+    return run_key, other_measures
+
+
+def run_sonar_scanner(project_dir: str, run_key: str):
+    """
+        Writes the SonarQube configuration of a temporary project and runs the scanner on it.
+
+        Parameters:
+        - project_dir (str): Directory containing the source files to analyze.
+        - run_key (str): Project key of this analysis.
+
+        Returns:
+        - The id of the background task computing the measures (from the scanner report), or None on failure.
+        """
     # Configurazione sonar
-    with open(os.path.join(tmp_dir, "sonar-project.properties"), "w") as f:
+    with open(os.path.join(project_dir, "sonar-project.properties"), "w") as f:
         f.write(f"""
-sonar.projectKey={project_key}
+sonar.projectKey={run_key}
 sonar.sources=.
 sonar.host.url={SONAR_HOST}
 sonar.login={SONAR_TOKEN}
         """)
 
     try:
-        subprocess.run([SONAR_SCANNER_CMD], cwd=tmp_dir, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except subprocess.CalledProcessError as e:
+        subprocess.run(shlex.split(SONAR_SCANNER_CMD, posix=os.name != "nt"), cwd=project_dir, check=True,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except (subprocess.CalledProcessError, OSError) as e:
         print(f"[!] Sonar analysis failed: {e}")
-        return project_key, -1
+        return None
+
+    # The scanner only uploads the report: the measures are computed by a background task on the server
+    try:
+        with open(os.path.join(project_dir, ".scannerwork", "report-task.txt")) as f:
+            report = dict(line.strip().split("=", 1) for line in f if "=" in line)
+        return report["ceTaskId"]
+    except (OSError, KeyError) as e:
+        print(f"[!] Sonar report task not found: {e}")
+        return None
+
+
+def wait_for_sonar_task(task_id: str) -> bool:
+    """
+        Waits until the SonarQube background task of an analysis has finished.
+
+        Parameters:
+        - task_id (str): Id of the task (ceTaskId of the scanner report).
+
+        Returns:
+        - True if the task succeeded (the measures are available), False otherwise.
+        """
+    url = f"{SONAR_HOST}/api/ce/task"
+    deadline = time.monotonic() + SONAR_TASK_TIMEOUT
+    while True:
+        try:
+            r = get_sonar_session().get(url, params={"id": task_id}, timeout=SONAR_REQUEST_TIMEOUT)
+            r.raise_for_status()
+            status = r.json()["task"]["status"]
+        except Exception as e:
+            print(f"[!] SonarQube task status fetch failed: {e}")
+            return False
+
+        if status == "SUCCESS":
+            return True
+        if status in ("FAILED", "CANCELED"):
+            print(f"[!] SonarQube task {task_id} ended with status {status}")
+            return False
+        if time.monotonic() > deadline:
+            print(f"[!] SonarQube task {task_id} not finished after {SONAR_TASK_TIMEOUT} s")
+            return False
+        time.sleep(SONAR_TASK_POLL_INTERVAL)
+
+
+def analyze_codes_sonarqube_batch(codes: list) -> list:
+    """
+        Analyzes many code snippets with a single SonarQube scanner run: each snippet is written
+        as a separate file of one temporary project, and the per-file measures are fetched afterwards.
+
+        Parameters:
+        - codes (list): Python source code of each snippet.
+
+        Returns:
+        - List with the dictionary of SonarQube metrics of each snippet, in the same order as `codes`
+          (empty dictionaries if the analysis failed).
+        """
+    if not codes:
+        return []
+    run_key = get_run_project_key()
+
+    tmp_dir = tempfile.mkdtemp(prefix="temp_sonar_", dir=".")
+    try:
+        paths = []
+        for i, code in enumerate(codes):
+            paths.append(f"solution_{i}.py")
+            with open(os.path.join(tmp_dir, paths[-1]), "w") as f:
+                f.write(code)
+
+        task_id = run_sonar_scanner(tmp_dir, run_key)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
-    other_measures = get_all_sonar_metrics(project_key)
-    return project_key, other_measures
+    if task_id is None:
+        return [{} for _ in codes]
+    try:
+        if not wait_for_sonar_task(task_id):
+            return [{} for _ in codes]
+        file_metrics = get_sonar_file_metrics(run_key)
+    finally:
+        delete_sonar_project(run_key)
+    return [file_metrics.get(path, {}) for path in paths]
+
+
+def analyze_codes_sonarqube_concurrent(codes: list, max_workers=SONAR_MAX_CONCURRENT_SCANS) -> list:
+    """
+        Analyzes many code snippets with SonarQube, running the scans of several batches at once
+        (at most `max_workers` scanner processes, each one on its own project).
+        Only code never analyzed before is scanned; the other metrics are read from the metric store.
+
+        Parameters:
+        - codes (list): Python source code of each snippet.
+        - max_workers (int): Maximum number of scanner runs at once.
+
+        Returns:
+        - List with the dictionary of SonarQube metrics of each snippet, in the same order as `codes`.
+        """
+    def scan(pending):
+        batches = [pending[start:start + SONAR_BATCH_SIZE] for start in range(0, len(pending), SONAR_BATCH_SIZE)]
+        if len(batches) <= 1:
+            return analyze_codes_sonarqube_batch(pending)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return [metrics for batch in executor.map(analyze_codes_sonarqube_batch, batches) for metrics in batch]
+
+    return metric_store.get_or_compute_batch("sonarqube", get_sonar_store_version(), codes, scan, normalize=False)
 
 
 def get_cognitive_complexity_sonarqube(project_key: str) -> int:
@@ -520,9 +1023,8 @@ def get_cognitive_complexity_sonarqube(project_key: str) -> int:
         "component": project_key,
         "metricKeys": "cognitive_complexity"
     }
-    auth = (SONAR_TOKEN, "")
     try:
-        r = requests.get(url, params=params, auth=auth)
+        r = get_sonar_session().get(url, params=params, timeout=SONAR_REQUEST_TIMEOUT)
         data = r.json()
         return int(data["component"]["measures"][0]["value"])
     except Exception as e:
@@ -542,25 +1044,12 @@ def get_all_sonar_metrics(project_key: str) -> dict:
         """
 
     url = f"{SONAR_HOST}/api/measures/component"
-    metric_keys = ",".join([
-        "cognitive_complexity",
-        "security_rating",
-        "reliability_rating",
-        "sqale_rating",  # maintainability rating
-        "bugs",
-        "vulnerabilities",
-        "code_smells",
-        "coverage",
-        "duplicated_lines_density",
-        "ncloc"
-    ])
     params = {
         "component": project_key,
-        "metricKeys": metric_keys
+        "metricKeys": ",".join(SONAR_METRIC_KEYS)
     }
-    auth = (SONAR_TOKEN, "")
     try:
-        r = requests.get(url, params=params, auth=auth)
+        r = get_sonar_session().get(url, params=params, timeout=SONAR_REQUEST_TIMEOUT)
         r.raise_for_status()
         data = r.json()
 
@@ -574,30 +1063,254 @@ def get_all_sonar_metrics(project_key: str) -> dict:
         return {}
 
 
-def update_csv_sonarqube_metrics(csv_path):
+def get_sonar_file_metrics(project_key: str) -> dict:
+    """
+        Retrieves the code quality metrics of every file of the given project from SonarQube
+        (component tree API, one request per page of files).
+
+        Parameters:
+        - project_key (str): Identifier of the analyzed project in SonarQube.
+
+        Returns:
+        - Dictionary mapping the path of each file (relative to the project) to its metrics.
+        """
+    url = f"{SONAR_HOST}/api/measures/component_tree"
+    file_metrics = {}
+    page = 1
+    try:
+        while True:
+            params = {
+                "component": project_key,
+                "metricKeys": ",".join(SONAR_METRIC_KEYS),
+                "qualifiers": "FIL",
+                "ps": SONAR_PAGE_SIZE,
+                "p": page
+            }
+            r = get_sonar_session().get(url, params=params, timeout=SONAR_REQUEST_TIMEOUT)
+            r.raise_for_status()
+            data = r.json()
+
+            for component in data.get("components", []):
+                file_metrics[component["path"]] = {measure["metric"]: measure["value"]
+                                                   for measure in component.get("measures", [])
+                                                   if "value" in measure}
+
+            paging = data.get("paging", {})
+            if page * paging.get("pageSize", SONAR_PAGE_SIZE) >= paging.get("total", 0):
+                return file_metrics
+            page += 1
+    except Exception as e:
+        print(f"[!] SonarQube metrics fetch failed: {e}")
+        return file_metrics
+
+
+def analyze_codes_metrics(codes: list, use_sonarqube=USE_SONARQUBE, max_workers=None) -> list:
+    """
+        Computes the code quality metrics of many code snippets at once (see analyze_code_metrics):
+        in-process across the worker processes of the batch analyses (see metrics.get_analysis_pool),
+        or through concurrent SonarQube scans. Code analyzed before is read from the metric store.
+
+        Parameters:
+        - codes (list): Python source code of each snippet.
+        - use_sonarqube (bool): Analyze the code with SonarQube instead of the in-process engine.
+        - max_workers (int): Number of worker processes of the in-process analysis (default: CPU count).
+
+        Returns:
+        - List with the dictionary of metrics of each snippet, in the same order as `codes`.
+        """
+    if use_sonarqube:
+        return analyze_codes_sonarqube_concurrent(codes)
+
+    def analyze(pending):
+        workers = max_workers or os.cpu_count() or 1
+        if len(pending) < PARALLEL_BATCH_MIN or workers < 2 or "fork" not in multiprocessing.get_all_start_methods():
+            return [get_static_metrics(code) for code in pending]
+
+        chunksize = max(1, len(pending) // (4 * workers))
+        return list(get_analysis_pool(max_workers).map(get_static_metrics, pending, chunksize=chunksize))
+
+    return metric_store.get_or_compute_batch("static_metrics", [STATIC_METRICS_VERSION, RULES_VERSION], codes,
+                                             analyze, normalize=False)
+
+
+# Rows analyzed and checkpointed at a time by update_csv_sonarqube_metrics
+METRICS_UPDATE_CHUNK_SIZE = SONAR_BATCH_SIZE * SONAR_MAX_CONCURRENT_SCANS
+
+
+def read_csv_rows(file):
+    """
+    Reads the records of a CSV file (opened with newline=''), with the raw text of each one.
+
+    Yields:
+        tuple: (list of fields, raw text of the record, including its line terminator).
+    """
+    raw_lines = []
+
+    def lines():
+        for line in file:
+            raw_lines.append(line)
+            yield line
+
+    # The reader pulls lines only until a record is complete: the lines read so far are exactly that record
+    for row in csv.reader(lines()):
+        raw = "".join(raw_lines)
+        raw_lines.clear()
+        yield row, raw
+
+
+def format_csv_row(row: list, raw: str) -> str:
+    """
+    Serializes a CSV record, keeping the line terminator of its raw text.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\r\n" if raw.endswith("\r\n") else "\n").writerow(row)
+    return buffer.getvalue()
+
+
+def load_update_checkpoint(csv_path: str, checkpoint_path: str, output_path: str):
+    """
+    Loads the checkpoint of an interrupted update_csv_sonarqube_metrics, if the rows it covers are unchanged.
+
+    Returns:
+        tuple: (checkpoint, SHA-256 of the CSV up to the checkpoint), or None if there is no valid checkpoint.
+    """
+    try:
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if os.path.getsize(output_path) < checkpoint["output_size"] or \
+                os.path.getsize(csv_path) < checkpoint["input_offset"]:
+            return None
+
+        digest = hashlib.sha256()
+        with open(csv_path, "rb") as f:
+            remaining = checkpoint["input_offset"]
+            while remaining:
+                block = f.read(min(remaining, 1 << 20))
+                digest.update(block)
+                remaining -= len(block)
+    except (OSError, ValueError, KeyError):
+        return None
+    return (checkpoint, digest) if digest.hexdigest() == checkpoint["input_digest"] else None
+
+
+def save_update_checkpoint(checkpoint_path: str, checkpoint: dict):
+    """
+    Writes a checkpoint atomically (a reader sees either the previous checkpoint or the new one).
+    """
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, checkpoint_path)
+
+
+def update_csv_sonarqube_metrics(csv_path, chunk_size=METRICS_UPDATE_CHUNK_SIZE):
     """
     Updates the 'metrics_sonarqube' column in a CSV file containing code snippets.
-    Metrics are computed only if the field is null/NaN.
+    Metrics are computed only if the field is empty.
+
+    The file is streamed in chunks of rows, so memory does not depend on its size. The missing metrics
+    of a chunk are computed at once (see analyze_codes_metrics), the chunk is appended to
+    '<csv_path>.updating' and a checkpoint ('<csv_path>.checkpoint') records the progress atomically.
+    An interrupted update resumes after the last checkpointed row. The rows present at the start (their size
+    is read under the lock of save_task_data_to_csv, so they are complete) are streamed without the lock;
+    the rows appended meanwhile are processed, and the CSV replaced, under the lock.
 
     Args:
         csv_path (str): Path to the CSV file.
+        chunk_size (int): Rows analyzed and checkpointed at a time.
     """
-    # Load the CSV
-    df = pd.read_csv(csv_path)
-
-    # Check required columns
-    if 'code_multiagent_system' not in df.columns or 'metrics_sonarqube' not in df.columns:
-        raise ValueError("CSV must contain the columns 'code_multiagent_system' and 'metrics_sonarqube'.")
-
-    # Compute metrics only for rows where 'metrics_sonarqube' is null
-    for idx, row in df[df['metrics_sonarqube'].isna()].iterrows():
-        code = row['code_multiagent_system']
-        _, metrics = analyze_code_sonarqube(code)
-        metrics_sq_str = ""
-        for metric, value in metrics.items():
-            print(f"{metric}: {value}")
-            metrics_sq_str += f"{metric}: {value}\n"
-        df.at[idx, 'metrics_sonarqube'] = metrics_sq_str
-
-    # Save the updated CSV
-    df.to_csv(csv_path, index=False)
+    output_path, checkpoint_path = f"{csv_path}.updating", f"{csv_path}.checkpoint"
+    with open(f"{csv_path}.lock", "a") as lock_file, locked_file(lock_file):
+        snapshot_size = os.path.getsize(csv_path)
+    if snapshot_size == 0:
+        return
+
+    resumed = load_update_checkpoint(csv_path, checkpoint_path, output_path)
+    if resumed:
+        checkpoint, digest = resumed
+        print(f"[i] Resuming the metrics update of {csv_path} after row {checkpoint['rows']}")
+    else:
+        checkpoint, digest = {"input_offset": 0, "input_digest": None, "output_size": 0, "rows": 0, "header": None}, \
+            hashlib.sha256()
+
+    source = open(csv_path, "rb")
+    output = open(output_path, "r+b" if resumed else "wb")
+    try:
+        # Drop what was written after the last checkpoint
+        output.truncate(checkpoint["output_size"])
+        output.seek(checkpoint["output_size"])
+        source.seek(checkpoint["input_offset"])
+        text = io.TextIOWrapper(source, encoding="utf-8", newline="")
+        rows = read_csv_rows(text)
+
+        if checkpoint["header"] is None:
+            header, raw = next(rows, ([], ""))
+            checkpoint["header"] = header
+            digest.update(raw.encode("utf-8"))
+            checkpoint["input_offset"] += len(raw.encode("utf-8"))
+            output.write(raw.encode("utf-8"))
+
+        # Check required columns
+        if 'code_multiagent_system' not in checkpoint["header"] or 'metrics_sonarqube' not in checkpoint["header"]:
+            raise ValueError("CSV must contain the columns 'code_multiagent_system' and 'metrics_sonarqube'.")
+        code_index = checkpoint["header"].index('code_multiagent_system')
+        metrics_index = checkpoint["header"].index('metrics_sonarqube')
+
+        def process(chunk):
+            if not chunk:
+                return
+            # Compute metrics only for rows where 'metrics_sonarqube' is empty
+            pending = [i for i, (row, _) in enumerate(chunk) if len(row) > max(code_index, metrics_index)
+                       and not row[metrics_index].strip()]
+            all_metrics = dict(zip(pending, analyze_codes_metrics([chunk[i][0][code_index] for i in pending])))
+
+            for i, (row, raw) in enumerate(chunk):
+                if all_metrics.get(i):
+                    row[metrics_index] = format_metrics_text(all_metrics[i])
+                    raw_out = format_csv_row(row, raw)
+                else:
+                    raw_out = raw
+                raw_bytes = raw.encode("utf-8")
+                digest.update(raw_bytes)
+                checkpoint["input_offset"] += len(raw_bytes)
+                output.write(raw_out.encode("utf-8"))
+            checkpoint["rows"] += len(chunk)
+            print(f"[i] {csv_path}: {checkpoint['rows']} rows processed, {len(all_metrics)} analyzed in this chunk")
+
+        def save_checkpoint():
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint["output_size"] = output.tell()
+            checkpoint["input_digest"] = digest.hexdigest()
+            save_update_checkpoint(checkpoint_path, checkpoint)
+
+        # Past the snapshot a row may still be being appended: those rows are read under the lock only
+        chunk, offset = [], checkpoint["input_offset"]
+        while offset < snapshot_size:
+            row, raw = next(rows, (None, None))
+            if row is None:
+                break
+            offset += len(raw.encode("utf-8"))
+            chunk.append((row, raw))
+            if len(chunk) == chunk_size:
+                process(chunk)
+                save_checkpoint()
+                chunk = []
+        process(chunk)
+
+        with open(f"{csv_path}.lock", "a") as lock_file, locked_file(lock_file):
+            # Rows appended by running experiments while the file was read
+            process(list(read_csv_rows(text)))
+            output.flush()
+            os.fsync(output.fileno())
+            text.close()
+            output.close()
+            os.replace(output_path, csv_path)
+    finally:
+        source.close()
+        output.close()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)